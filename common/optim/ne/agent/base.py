@@ -2,8 +2,13 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from functools import cached_property
 from typing import Annotated as An
+from typing import Any
 
+import numpy as np
+import torch
+from jaxtyping import Float32, Float64
 from tensordict import TensorDict
 from torch import Tensor
 from torchrl.envs import EnvBase
@@ -73,12 +78,18 @@ class BaseAgent(ABC):
             during the current evaluation.
         curr_eval_num_steps (int): The number of steps taken by the
             agent during the current evaluation.
-        saved_env (torchrl.envs.EnvBase): The
-            `torchrl <https://pytorch.org/rl/>`_ environment instance to
-            resume from (only set if
+        curr_eval_num_saved_steps (int): The maximum number of steps
+            the agent was spared during the current evaluation by its
+            early termination (see
+            :meth:`~.BaseReinforcementSpace.terminates_early`).
+        saved_env (torchrl.envs.EnvBase | torch.Tensor | Any): The
+            `torchrl <https://pytorch.org/rl/>`_ environment instance,
+            or the environment snapshot (see
+            :meth:`~.BaseBatchedEnv.save`), to resume from (only set if
             :paramref:`~.BaseAgentConfig.env_transfer` is ``True``).
-        saved_env_out (tensordict.Tensordict): The latest output
-            from the environment to resume from (only set if
+        saved_env_out (tensordict.Tensordict | torch.Tensor): The
+            latest output (or observation) from the environment to
+            resume from (only set if
             :paramref:`~.BaseAgentConfig.env_transfer` is ``True``).
         curr_episode_score (float): The current episode score (only set
             if :paramref:`~.BaseAgentConfig.env_transfer` is ``True``).
@@ -88,6 +99,22 @@ class BaseAgent(ABC):
         continual_fitness (float): The agent's fitness in addition to
             all of its predecessors' fitnesses (only set if
             :paramref:`~.BaseAgentConfig.fit_transfer` is ``True``).
+        lineage_base (int): The position of the agent in the
+            population during the last lineage rebase (``-1`` if the
+            agent was never rebased). Only maintained when
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange` is
+            ``"lineage"``.
+        lineage (list[int]): The mutation seeds applied to the agent
+            since its last lineage rebase. Only maintained when
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange` is
+            ``"lineage"``.
+        generator (torch.Generator): The agent's random number
+            generator. It is seeded with the agent's mutation seed
+            right before each mutation (see :func:`~.mutate_agent`)
+            and is to be used for all of the agent's randomness
+            (mutation, action sampling, etc.) so that agents do not
+            depend on the global random state. It is not pickled since
+            it is reseeded before any use following a transfer.
     """
 
     def __init__(
@@ -100,29 +127,201 @@ class BaseAgent(ABC):
         self.config = config
         self.role = "generator" if pop_idx == 0 else "discriminator"
         self.is_other_role_in_other_pop = pops_are_merged
+        self.lineage_base = -1
+        self.lineage: list[int] = []
+        self.generator = torch.Generator()
         self.initialize_eval_attributes()
 
+    def __getstate__(self: "BaseAgent") -> dict[str, Any]:
+        state = self.__dict__.copy()
+        # See the `generator` attribute.
+        del state["generator"]
+        return state
+
+    def __setstate__(self: "BaseAgent", state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self.generator = torch.Generator()
+
     def initialize_eval_attributes(self: "BaseAgent") -> None:
         """Initializes attributes used during evaluation."""
         self.total_num_steps = 0
-        self.curr_eval_score: float = 0
+        self.curr_eval_score: float = 0.0
         self.curr_eval_num_steps = 0
+        self.curr_eval_num_saved_steps = 0
         if self.config.env_transfer:
             self.saved_env: EnvBase
             self.saved_env_out: TensorDict
-            self.curr_episode_score: float = 0
+            self.curr_episode_score: float = 0.0
             self.curr_episode_num_steps = 0
         if self.config.fit_transfer:
-            self.continual_fitness: float = 0
+            self.continual_fitness: float = 0.0
+
+    def get_state(self: "BaseAgent") -> dict[str, Any]:
+        """Returns the agent's non-parameter state.
+
+        Subclasses holding additional state that is not a function of
+        their parameters (e.g. running statistics) should extend this
+        method and :meth:`set_state`.
+
+        Returns:
+            A dictionary mapping attribute names to their values.
+        """
+        state: dict[str, Any] = {
+            "total_num_steps": self.total_num_steps,
+            "curr_eval_score": self.curr_eval_score,
+            "curr_eval_num_steps": self.curr_eval_num_steps,
+        }
+        if self.config.env_transfer:
+            state["saved_env"] = self.saved_env
+            state["saved_env_out"] = self.saved_env_out
+            state["curr_episode_score"] = self.curr_episode_score
+            state["curr_episode_num_steps"] = self.curr_episode_num_steps
+        if self.config.fit_transfer:
+            state["continual_fitness"] = self.continual_fitness
+        return state
+
+    def set_state(self: "BaseAgent", state: dict[str, Any]) -> None:
+        """Loads a non-parameter state.
+
+        Args:
+            state: See return value of :meth:`get_state`.
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def get_state_buffer(self: "BaseAgent") -> Float64[np.ndarray, " n"]:
+        """Returns :meth:`get_state` packed into a flat array.
+
+        The layout of the array is fixed for a given population, which
+        lets it be exchanged through buffer-based MPI communication.
+        State values need to be numbers, tensors or (nested)
+        dictionaries of those.
+
+        Returns:
+            The agent's non-parameter state.
+        """
+        return np.concatenate(
+            [
+                np.asarray(value, dtype=np.float64).ravel()
+                for value in _flatten_state(state=self.get_state())
+            ],
+        )
+
+    def set_state_buffer(
+        self: "BaseAgent",
+        state_buffer: Float64[np.ndarray, " n"],
+    ) -> None:
+        """Loads a state packed with :meth:`get_state_buffer`.
+
+        Args:
+            state_buffer: See return value of :meth:`get_state_buffer`.
+        """
+        start = 0
+
+        def unpack(value: Any) -> Any:  # noqa: ANN401
+            nonlocal start
+            if isinstance(value, dict):
+                return {name: unpack(value=v) for name, v in value.items()}
+            size = value.numel() if isinstance(value, Tensor) else 1
+            chunk = state_buffer[start : start + size]
+            start += size
+            if isinstance(value, Tensor):
+                return torch.from_numpy(chunk.reshape(value.shape)).to(
+                    dtype=value.dtype,
+                )
+            return type(value)(chunk[0])
+
+        self.set_state(state=unpack(value=self.get_state()))
+
+    @abstractmethod
+    def get_params(self: "BaseAgent") -> Float32[Tensor, " num_params"]:
+        """Returns the agent's parameters as a flat tensor.
+
+        The returned tensor can be a view of the agent's parameters
+        (e.g. a flat parameter buffer), in which case ``"buffer"``
+        exchanges do not copy the parameters.
+
+        Returns:
+            The agent's flattened parameters.
+        """
+
+    @abstractmethod
+    def set_params(
+        self: "BaseAgent",
+        params: Float32[Tensor, " num_params"],
+    ) -> None:
+        """Copies :paramref:`params` into the agent's parameters.
+
+        Args:
+            params: See return value of :meth:`get_params`.
+        """
 
     @abstractmethod
     def mutate(self: "BaseAgent") -> None:
-        """Applies random mutation(s) to the agent."""
+        """Applies random mutation(s) to the agent.
+
+        Randomness must be drawn from :attr:`generator`. When
+        :paramref:`~.NeuroevolutionSubtaskConfig.exchange` is
+        ``"lineage"``, the mutation must only depend on the agent's
+        parameters and on :attr:`generator` so that it can be replayed
+        on other processes.
+        """
+
+    @cached_property
+    def num_params(self: "BaseAgent") -> int:
+        """The size of :meth:`get_params`'s output.
+
+        Computed on first access only, as :meth:`get_params` can
+        return a copy of the agent's parameters.
+        """
+        return len(self.get_params())
+
+    @abstractmethod
+    def mutate_with_noise(
+        self: "BaseAgent",
+        noise: Float32[Tensor, " num_params"],
+    ) -> None:
+        """Mutates the agent with pre-generated noise.
+
+        Called instead of :meth:`mutate` when
+        :paramref:`~.NeuroevolutionSubtaskConfig.noise_table_size` is
+        non-zero.
+
+        Args:
+            noise: A slice of the :class:`.NoiseTable` of size
+                :attr:`num_params`.
+        """
 
     @abstractmethod
     def reset(self: "BaseAgent") -> None:
         """Resets the agent's memory state."""
 
+    @classmethod
+    def call_batch(
+        cls: type["BaseAgent"],
+        agents: list["BaseAgent"],
+        x: Tensor,
+    ) -> Tensor:
+        """Runs :paramref:`agents` for one timestep given :paramref:`x`.
+
+        Runs the agents one after the other by default. Subclasses can
+        override this method to run all agents in one batched forward
+        pass.
+
+        Args:
+            agents: The agents to run.
+            x: One input observation per agent.
+
+        Returns:
+            The agents' stacked outputs.
+        """
+        return torch.stack(
+            [
+                agent(x=agent_x)
+                for agent, agent_x in zip(agents, x, strict=True)
+            ],
+        )
+
     @abstractmethod
     def __call__(self: "BaseAgent", x: Tensor) -> Tensor:
         """Runs the agent for one timestep given :paramref:`x`.
@@ -133,3 +332,30 @@ class BaseAgent(ABC):
         Returns:
             The agent's output.
         """
+
+
+def _flatten_state(state: dict[str, Any]) -> list[Any]:
+    """Returns the leaf values of a (nested) state dictionary.
+
+    Args:
+        state: See return value of :meth:`BaseAgent.get_state`.
+
+    Returns:
+        The leaf values, in insertion order.
+
+    Raises:
+        TypeError: If a leaf value is neither a number nor a tensor.
+    """
+    values: list[Any] = []
+    for name, value in state.items():
+        if isinstance(value, dict):
+            values += _flatten_state(state=value)
+        elif isinstance(value, Tensor | bool | int | float):
+            values.append(value)
+        else:
+            error_msg = (
+                f"State value `{name}` of type `{type(value)}` cannot be "
+                "packed into a buffer."
+            )
+            raise TypeError(error_msg)
+    return values
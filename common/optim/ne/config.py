@@ -10,7 +10,7 @@ from hydra_zen import make_config
 from common.optim.config import OptimizationSubtaskConfig
 from common.optim.ne.agent import BaseAgentConfig
 from common.optim.ne.space import BaseSpaceConfig
-from common.utils.beartype import ge
+from common.utils.beartype import ge, one_of
 from common.utils.hydra_zen import generate_config, generate_config_partial
 
 
@@ -27,6 +27,30 @@ class NeuroevolutionSubtaskConfig(OptimizationSubtaskConfig):
             `0` means no save point except for the last generation.
         save_first_gen: Whether to save the state of the experiment
             after the first generation (usually for plotting purposes).
+        save_queue_size: Maximum number of save points waiting to be
+            written to disk by the background :class:`.CheckpointWriter`
+            (evolution only blocks on a save point when the queue is
+            full). ``0`` means that save points are written to disk
+            before evolution resumes.
+        save_mode: What save points hold. ``"full"`` save points hold
+            every agent's parameters. ``"lineage"`` save points (only
+            supported for agents saved with the ``"columnar"`` layout,
+            see :mod:`~.utils.readwrite`) instead hold the position of
+            every agent's ancestor & the mutation seeds applied since
+            the previous ``"full"`` save point, from which agents are
+            materialized upon loading. Only the first save point of a
+            run & save points at least :paramref:`save_full_interval`
+            generations after the previous ``"full"`` save point are
+            then ``"full"``.
+        save_full_interval: Minimum number of generations between
+            ``"full"`` save points when :paramref:`save_mode` is
+            ``"lineage"``, which bounds the number of mutations to
+            replay to materialize an agent.
+        materialization_cache_size: Maximum number of agent parameter
+            vectors kept in memory while materializing agents from
+            ``"lineage"`` save points (see
+            :class:`.MaterializationCache`), which avoids replaying the
+            mutations that agents share with their relatives.
         pop_merge: Whether to merge both generator and discriminator
             populations into a single population. This means that each
             agent will be evaluated on both its generative and
@@ -44,18 +68,225 @@ class NeuroevolutionSubtaskConfig(OptimizationSubtaskConfig):
             until the environment terminates (``eval_num_steps = 0`` is
             not supported for ``env_transfer = True``).
         logging: Whether to log the experiment to Weights & Biases.
+        metrics_queue_size: Maximum number of steps (generations)
+            of metrics waiting to be logged to W&B by the primary
+            process' background :class:`.MetricsLogger`. When the
+            queue is full, a step's metrics are coalesced with the
+            next step's (only the latest value of each metric is kept)
+            rather than have evolution wait on W&B. ``0`` means that
+            metrics are logged before evolution resumes.
+        metrics_sink: Whether to also append the logged metrics, one
+            JSON object per step, to a local ``metrics.jsonl`` file in
+            :paramref:`~.BaseSubtaskConfig.output_dir`, which does
+            not depend on W&B. Every step is written before evolution
+            resumes, even when W&B steps are coalesced.
+        exchange: How selected agents are transferred to the processes
+            in possession of the non-selected agents they replace.
+            ``"agent"`` sends the entire pickled agent. ``"lineage"``
+            only sends the agent's mutation seeds since its last
+            rebase (see :paramref:`lineage_rebase_interval`) along
+            with its non-parameter state, and the receiving process
+            replays the mutations to reproduce the agent's parameters.
+            ``"buffer"`` sends the agent's flat parameters (see
+            :meth:`~.BaseAgent.get_params`) and non-parameter state
+            (see :meth:`~.BaseAgent.get_state_buffer`) through
+            buffer-based MPI communication, which skips pickling
+            altogether (with ``env_transfer = True``, environments
+            need to be saved as snapshots, see
+            :meth:`~.BaseBatchedEnv.save`) and exchanges agents
+            between processes of the same node through shared memory
+            (see :class:`.SharedAgentBuffers`). Agents exchanged
+            within a process are always copied in memory.
+        lineage_rebase_interval: Number of generations between each
+            lineage rebase when :paramref:`exchange` is
+            ``"lineage"``. A rebase gathers the parameters of all
+            agents on all processes and resets the agents' lineages,
+            which bounds the number of mutations to replay upon
+            reception. ``0`` means that lineages are only rebased at
+            the start of the run.
+        eval_mode: How a process evaluates the agents it maintains
+            on CPU. ``"serial"`` evaluates them one after the other
+            through :meth:`~.BaseSpace.evaluate`. ``"batched"``
+            evaluates them together through
+            :meth:`~.BaseSpace.evaluate_batch`, which steps one
+            environment slot per agent and batches the agents' forward
+            passes (see :meth:`~.BaseAgent.call_batch`). Agents that
+            draw from the global random number generator (e.g. to
+            sample discrete actions) interleave their draws, which
+            yields different (but equally distributed) results than
+            ``"serial"``. ``"threaded"`` evaluates them concurrently
+            on :paramref:`eval_num_threads` threads (see
+            :class:`.EvaluationThreadPool`), which yields the same
+            results as ``"serial"`` for agents drawing from their own
+            :attr:`~.BaseAgent.generator`. ``"balanced"`` evaluates
+            them one after the other but lets processes out of agents
+            to evaluate take over the evaluation of agents other
+            processes have yet to start evaluating (see
+            :class:`.WorkStealingScheduler`), which balances the load
+            when evaluation times vary between agents (e.g. with
+            episodes of varying lengths). It yields the same results
+            as ``"serial"`` for agents drawing from their own
+            :attr:`~.BaseAgent.generator`.
+        eval_num_threads: Number of threads evaluating agents when
+            :paramref:`eval_mode` is ``"threaded"``.
+        noise_table_size: Number of values in the :class:`.NoiseTable`
+            that mutations are drawn from. The table is generated once
+            per node from :paramref:`~.BaseSubtaskConfig.seed` and a
+            mutation adds a slice of it (at an offset derived from the
+            mutation seed) to the agent's parameters (see
+            :meth:`~.BaseAgent.mutate_with_noise`). ``0`` means that no
+            table is used and that agents are mutated through
+            :meth:`~.BaseAgent.mutate`.
+        selection: Where selection is computed. ``"centralized"``
+            gathers the generation results on the primary process,
+            which computes the pairings & seeds of all agents and
+            scatters them. ``"decentralized"`` gathers the generation
+            results on all processes, each of which deterministically
+            computes the same pairings & seeds and keeps its own share
+            of them, which saves a collective per generation and the
+            wait on the primary process.
+        pairing: Which non-selected agent each selected agent replaces
+            (50% truncation selection holds either way).
+            ``"ranked"`` pairs agents found in the same position of the
+            ranking sub-leaderboards of selected and non-selected
+            agents. ``"local"`` prefers pairs of agents maintained by
+            the same process (exchanged without MPI communication),
+            then by processes of the same node (as reported by MPI,
+            see :func:`~.utils.mpi4py.get_node_size`), which reduces
+            inter-node traffic. The
+            number of agents exchanged within processes, within nodes
+            & across nodes is logged every generation.
+        pipeline: Whether to overlap the exchange of agents with their
+            mutation & evaluation: agents are mutated & evaluated as
+            soon as the MPI requests created for them have completed
+            (see :func:`.mutate_and_evaluate_pipelined`) rather than
+            once the entire exchange has completed. Only applies to CPU
+            evaluation & only supported for :paramref:`eval_mode` =
+            ``"serial"`` or ``"threaded"``. Agents drawing from the
+            global random number generator yield different (but
+            equally distributed) results since their evaluation order
+            changes.
+        evolution: How the population evolves. ``"generational"``
+            evaluates the entire population, then selects it, in
+            lockstep across processes. ``"steady_state"`` has the
+            primary process hand agents to mutate & evaluate to the
+            other processes one at a time and replace the worst agent
+            of the population with each evaluated agent as soon as it
+            is received (see :class:`.SteadyStateCoordinator`), which
+            never leaves processes waiting on slower evaluations.
+            Every ``pop_size`` evaluations count as a generation
+            (for logging & save points, which are always ``"full"``).
+            Only supports a single population evaluated on CPU by at
+            least two processes (the primary process does not
+            evaluate agents), one agent at a time.
+        tournament_size: Number of agents randomly drawn from the
+            population, the fittest of which is mutated, when
+            :paramref:`evolution` is ``"steady_state"``.
+        early_stopping: Whether to terminate an agent's evaluation as
+            soon as its score can provably no longer reach the
+            previous generation's selection cutoff (see
+            :func:`.compute_selection_cutoff`) given the per-step
+            reward bounds declared by the space (see
+            :class:`.BaseReinforcementSpace`). Such agents are then
+            ranked on their partial scores, which approximates 50%
+            truncation selection since the current generation's cutoff
+            can differ from the previous one. The maximum number of
+            environment steps spared is logged every generation. Not
+            supported for :paramref:`fit_transfer` = ``True`` & without
+            effect during steady-state evolution (see
+            :paramref:`evolution`).
+        racing: Whether to evaluate agents over an adaptive number of
+            episodes (see :class:`.Racer`): every agent is evaluated
+            over :paramref:`racing_num_initial_episodes` episodes,
+            after which only the agents whose fitness confidence
+            interval contains the selection boundary are evaluated
+            over additional episodes, which makes selection less noisy
+            at a fraction of the cost of evaluating all agents over
+            more episodes. Each episode of a generation is seeded
+            differently & fitnesses are mean episode scores. Only
+            supported for CPU evaluation with :paramref:`eval_mode` =
+            ``"serial"`` & without transfer (see
+            :paramref:`env_transfer`, :paramref:`fit_transfer` &
+            :paramref:`mem_transfer`), pipelining nor early stopping
+            (see :paramref:`pipeline` & :paramref:`early_stopping`).
+        racing_num_initial_episodes: Number of episodes every agent is
+            evaluated over when :paramref:`racing` is ``True``.
+        racing_max_num_episodes: Maximum number of episodes an agent is
+            evaluated over when :paramref:`racing` is ``True``.
+        racing_z_score: Number of standard errors on each side of an
+            agent's fitness mean that its confidence interval spans
+            when :paramref:`racing` is ``True``.
+        racing_budget: Maximum number of environment steps taken by
+            all agents during a generation, beyond which no additional
+            episode is allocated, when :paramref:`racing` is ``True``.
+            ``0`` means no budget.
+        num_islands: Number of islands the MPI processes are split
+            into (see :class:`.IslandModel`), each made of contiguous
+            processes (e.g. ``num_nodes`` for one island per node
+            with regular launcher settings) that evolve their own
+            population of ``num_nodes * tasks_per_node *
+            agents_per_task / num_islands`` agents with selection &
+            exchanges local to the island. Islands save their states
+            to their own sub-directory of
+            :paramref:`~.BaseSubtaskConfig.output_dir` & log their
+            metrics, prefixed by ``island_<idx>/``, to a single W&B
+            run (see :class:`.MetricsLogger`, which then requires MPI
+            to support ``MPI.THREAD_MULTIPLE``). ``1`` disables the
+            island model. Only supported for :paramref:`evolution` =
+            ``"generational"``, :paramref:`save_mode` = ``"full"`` &
+            :paramref:`exchange` different from ``"lineage"``.
+        migration_interval: Number of generations between each
+            migration, during which every island sends copies of its
+            :paramref:`num_migrants` fittest agents (per population)
+            to another island, where they replace the least fit
+            agents. ``0`` means that islands never migrate agents.
+        num_migrants: Number of agents (per population) that each
+            island sends during a migration.
+        migration_topology: Which island each island sends its
+            migrants to. ``"ring"`` sends them to the next island.
+            ``"random"`` draws a new cycle through all islands at
+            every migration.
     """
 
     agents_per_task: An[int, ge(1)] = 1
     total_num_gens: An[int, ge(1)] = 10
     save_interval: An[int, ge(0)] = 0
     save_first_gen: bool = False
+    save_queue_size: An[int, ge(0)] = 0
+    save_mode: An[str, one_of("full", "lineage")] = "full"
+    save_full_interval: An[int, ge(1)] = 10
+    materialization_cache_size: An[int, ge(0)] = 0
     pop_merge: bool = False
     env_transfer: bool = False
     fit_transfer: bool = False
     mem_transfer: bool = False
     eval_num_steps: An[int, ge(0)] = 0
     logging: bool = True
+    metrics_queue_size: An[int, ge(0)] = 0
+    metrics_sink: bool = False
+    exchange: An[str, one_of("agent", "lineage", "buffer")] = "agent"
+    lineage_rebase_interval: An[int, ge(0)] = 0
+    eval_mode: An[
+        str,
+        one_of("serial", "batched", "threaded", "balanced"),
+    ] = "serial"
+    eval_num_threads: An[int, ge(1)] = 1
+    noise_table_size: An[int, ge(0)] = 0
+    selection: An[str, one_of("centralized", "decentralized")] = "centralized"
+    pairing: An[str, one_of("ranked", "local")] = "ranked"
+    pipeline: bool = False
+    evolution: An[str, one_of("generational", "steady_state")] = "generational"
+    tournament_size: An[int, ge(1)] = 2
+    early_stopping: bool = False
+    racing: bool = False
+    racing_num_initial_episodes: An[int, ge(1)] = 2
+    racing_max_num_episodes: An[int, ge(1)] = 10
+    racing_z_score: An[float, ge(0)] = 1.96
+    racing_budget: An[int, ge(0)] = 0
+    num_islands: An[int, ge(1)] = 1
+    migration_interval: An[int, ge(0)] = 10
+    num_migrants: An[int, ge(1)] = 1
+    migration_topology: An[str, one_of("ring", "random")] = "ring"
 
 
 @dataclass
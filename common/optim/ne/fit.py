@@ -3,17 +3,21 @@
 import logging
 import pickle
 from collections.abc import Callable
+from contextlib import nullcontext
 from functools import partial
 from pathlib import Path
 from typing import Any
 
 import numpy as np
+from mpi4py import MPI
 
 from common.optim.ne.agent import BaseAgent
 from common.optim.ne.space import BaseSpace
 from common.optim.ne.utils.compute import (
+    compute_genealogy,
     compute_generation_results,
     compute_save_points,
+    compute_selection_cutoff,
     compute_start_time_and_seeds,
     compute_total_num_env_steps_and_process_fitnesses,
 )
@@ -24,23 +28,49 @@ from common.optim.ne.utils.evolve import (
 )
 from common.optim.ne.utils.exchange import (
     exchange_agents,
+    rebase_lineages,
+    scatter,
     update_exchange_and_mutate_info,
 )
 from common.optim.ne.utils.initialize import (
     initialize_agents,
     initialize_common_variables,
     initialize_gpu_comm,
+    initialize_lineage_bases,
 )
+from common.optim.ne.utils.island import (
+    IslandModel,
+    get_island_output_dir,
+    migrate_agents,
+)
+from common.optim.ne.utils.noise import NoiseTable
+from common.optim.ne.utils.pipeline import mutate_and_evaluate_pipelined
+from common.optim.ne.utils.race import Racer
 from common.optim.ne.utils.readwrite import (
+    CheckpointWriter,
+    GenealogyRecorder,
+    MaterializationCache,
+    convert_states,
     find_existing_save_points,
+    load_agents,
+    load_generation_results,
+    load_manifest,
     load_state,
     save_state,
 )
+from common.optim.ne.utils.schedule import WorkStealingScheduler
+from common.optim.ne.utils.shared import SharedAgentBuffers
+from common.optim.ne.utils.steady import SteadyStateCoordinator, work
+from common.optim.ne.utils.thread import EvaluationThreadPool
 from common.optim.ne.utils.type import Generation_results_type
 from common.optim.ne.utils.validate import validate_space
 from common.optim.ne.utils.wandb import setup_wandb, terminate_wandb
 from common.utils.misc import seed_all
-from common.utils.mpi4py import get_mpi_variables
+from common.utils.mpi4py import (
+    get_mpi_variables,
+    get_node_size,
+    use_mpi_comm,
+)
 
 from .config import (
     NeuroevolutionSubtaskConfig,
@@ -70,10 +100,41 @@ def fit(
         logger: See :func:`~.utils.wandb.setup_wandb`.
         config
     """
-    if not isinstance(config, NeuroevolutionSubtaskTestConfig):
-        evolve(space=space, agent=agent, logger=logger, config=config)
-    else:
+    if isinstance(config, NeuroevolutionSubtaskTestConfig):
         test(space=space, config=config)
+        return
+    # Metrics logged before a failure still reach W&B.
+    try:
+        if config.evolution == "steady_state":
+            evolve_steady_state(
+                space=space,
+                agent=agent,
+                logger=logger,
+                config=config,
+            )
+        elif config.num_islands > 1:
+            islands = IslandModel(
+                num_islands=config.num_islands,
+                migration_interval=config.migration_interval,
+                num_migrants=config.num_migrants,
+                migration_topology=config.migration_topology,
+                agents_per_task=config.agents_per_task,
+            )
+            with use_mpi_comm(comm=islands.comm):
+                evolve(
+                    space=space,
+                    agent=agent,
+                    logger=logger,
+                    config=config,
+                    islands=islands,
+                )
+        else:
+            evolve(space=space, agent=agent, logger=logger, config=config)
+    except BaseException:
+        # W&B errors must not replace the evolution error.
+        terminate_wandb(abort=True)
+        raise
+    terminate_wandb()
 
 
 def evolve(
@@ -81,6 +142,7 @@ def evolve(
     agent: partial[BaseAgent],
     logger: Callable[..., Any],
     config: NeuroevolutionSubtaskConfig,
+    islands: IslandModel | None = None,
 ) -> None:
     """Neuroevolution.
 
@@ -89,15 +151,39 @@ def evolve(
         agent
         logger: See :func:`~.utils.wandb.setup_wandb`.
         config
+        islands: See :paramref:`~.migrate_agents.islands`. MPI
+            collectives are expected to run on the island's
+            communicator (see :func:`~.utils.mpi4py.use_mpi_comm`).
     """
+    # Built before seeding so as not to alter the random state.
+    templates = initialize_agents(
+        agent=agent,
+        len_agents_batch=1,
+        num_pops=space.num_pops,
+        pop_merge=config.pop_merge,
+    )[0]
     seed_all(config.seed)
-    comm, _, _ = get_mpi_variables()
-    validate_space(space=space, pop_merge=config.pop_merge)
+    validate_space(
+        space=space,
+        pop_merge=config.pop_merge,
+        exchange=config.exchange,
+        env_transfer=config.env_transfer,
+        eval_mode=config.eval_mode,
+    )
+    output_dir = (
+        config.output_dir
+        if islands is None
+        else get_island_output_dir(
+            output_dir=config.output_dir,
+            idx=islands.idx,
+        )
+    )
     prev_num_gens, save_points = compute_save_points(
-        output_dir=config.output_dir,
+        output_dir=output_dir,
         total_num_gens=config.total_num_gens,
         save_interval=config.save_interval,
         save_first_gen=config.save_first_gen,
+        world_comm=None if islands is None else islands.world_comm,
     )
     (
         pop_size,
@@ -111,9 +197,19 @@ def evolve(
     ) = initialize_common_variables(
         agents_per_task=config.agents_per_task,
         num_pops=space.num_pops,
+        selection=config.selection,
+    )
+    ith_gpu_comm = (
+        initialize_gpu_comm() if space.evaluates_on_gpu else MPI.COMM_NULL
+    )
+    tasks_per_node = get_node_size()
+    # Pipelining only applies to CPU evaluation.
+    pipeline = config.pipeline and not space.evaluates_on_gpu
+    noise_table = (
+        NoiseTable(size=config.noise_table_size, seed=config.seed)
+        if config.noise_table_size
+        else None
     )
-    if space.evaluates_on_gpu:
-        ith_gpu_comm = initialize_gpu_comm()
     if prev_num_gens > 0:
         (
             agents_batch,
@@ -122,7 +218,12 @@ def evolve(
         ) = load_state(
             prev_num_gens=prev_num_gens,
             len_agents_batch=len_agents_batch,
-            output_dir=config.output_dir,
+            output_dir=output_dir,
+            selection=config.selection,
+            noise_table=noise_table,
+            cache=MaterializationCache(
+                max_size=config.materialization_cache_size,
+            ),
         )
     else:
         agents_batch = initialize_agents(
@@ -131,101 +232,333 @@ def evolve(
             num_pops=space.num_pops,
             pop_merge=config.pop_merge,
         )
-    setup_wandb(logger=logger, output_dir=config.output_dir)
-    for curr_gen in range(prev_num_gens + 1, config.total_num_gens + 1):
-        start_time, seeds = compute_start_time_and_seeds(
-            generation_results=generation_results,
-            curr_gen=curr_gen,
-            num_pops=space.num_pops,
-            pop_size=pop_size,
-            pop_merge=config.pop_merge,
+    lineage_bases = (
+        initialize_lineage_bases(agents_batch=agents_batch, pop_size=pop_size)
+        if config.exchange == "lineage"
+        else None
+    )
+    shared_buffers = (
+        SharedAgentBuffers(len_agents_batch=len_agents_batch)
+        if config.exchange == "buffer"
+        else None
+    )
+    thread_pool = (
+        EvaluationThreadPool(space=space, num_threads=config.eval_num_threads)
+        if config.eval_mode == "threaded"
+        else None
+    )
+    scheduler = (
+        WorkStealingScheduler(space=space)
+        if config.eval_mode == "balanced"
+        else None
+    )
+    racer = (
+        Racer(
+            space=space,
+            num_initial_episodes=config.racing_num_initial_episodes,
+            max_num_episodes=config.racing_max_num_episodes,
+            z_score=config.racing_z_score,
+            budget=config.racing_budget,
         )
-        if curr_gen == 1:
-            # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
-            # for a full example execution of the genetic algorithm.
-            # The following block is examplified in section 3.
-            comm.Scatter(
-                sendbuf=seeds,
-                recvbuf=seeds_batch,
-            )
-            exchange_and_mutate_info_batch[:, :, 3] = seeds_batch
-        else:
-            update_exchange_and_mutate_info(
+        if config.racing
+        else None
+    )
+    genealogy_recorder = (
+        GenealogyRecorder(save_full_interval=config.save_full_interval)
+        if config.save_mode == "lineage"
+        else None
+    )
+    setup_wandb(
+        logger=logger,
+        output_dir=config.output_dir,
+        metrics_queue_size=config.metrics_queue_size,
+        metrics_path=(
+            Path(f"{config.output_dir}/metrics.jsonl")
+            if config.metrics_sink
+            else None
+        ),
+        islands=islands,
+    )
+    # Queued save points are written even if evolution fails.
+    with (
+        CheckpointWriter(queue_size=config.save_queue_size)
+        if config.save_queue_size
+        else nullcontext()
+    ) as writer:
+        for curr_gen in range(prev_num_gens + 1, config.total_num_gens + 1):
+            # Lineages are always rebased at the start of the run since
+            # the lineage bases are not saved to disk.
+            if lineage_bases is not None and (
+                curr_gen == prev_num_gens + 1
+                or (
+                    config.lineage_rebase_interval
+                    and (curr_gen - 1) % config.lineage_rebase_interval == 0
+                )
+            ):
+                rebase_lineages(
+                    agents_batch=agents_batch,
+                    lineage_bases=lineage_bases,
+                )
+            start_time, seeds = compute_start_time_and_seeds(
+                generation_results=generation_results,
+                curr_gen=curr_gen,
                 num_pops=space.num_pops,
                 pop_size=pop_size,
-                exchange_and_mutate_info=exchange_and_mutate_info,
-                generation_results=generation_results,
-                seeds=seeds,
-            )
-            # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
-            # for a full example execution of the genetic algorithm.
-            # The following block is examplified in section 13.
-            comm.Scatter(
-                sendbuf=exchange_and_mutate_info,
-                recvbuf=exchange_and_mutate_info_batch,
+                selection=config.selection,
+                pop_merge=config.pop_merge,
+                island_idx=None if islands is None else islands.idx,
             )
-            exchange_agents(
-                num_pops=space.num_pops,
+            space.selection_cutoff = compute_selection_cutoff(
+                generation_results=generation_results,
+                curr_gen=curr_gen,
                 pop_size=pop_size,
-                agents_batch=agents_batch,
-                exchange_and_mutate_info_batch=exchange_and_mutate_info_batch,
+                selection=config.selection,
+                early_stopping=config.early_stopping,
             )
-        mutate(
-            agents_batch=agents_batch,
-            exchange_and_mutate_info_batch=exchange_and_mutate_info_batch,
-            num_pops=space.num_pops,
-        )
-        fitnesses_and_num_env_steps_batch = (
-            (
-                evaluate_on_gpu(
-                    ith_gpu_comm=ith_gpu_comm,
+            pending_exchange = None
+            if curr_gen == 1:
+                # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
+                # for a full example execution of the genetic algorithm.
+                # The following block is examplified in section 3.
+                scatter(
+                    sendbuf=seeds,
+                    recvbuf=seeds_batch,
+                    selection=config.selection,
+                )
+                exchange_and_mutate_info_batch[:, :, 3] = seeds_batch
+            else:
+                update_exchange_and_mutate_info(
+                    num_pops=space.num_pops,
+                    pop_size=pop_size,
+                    exchange_and_mutate_info=exchange_and_mutate_info,
+                    generation_results=generation_results,
+                    seeds=seeds,
+                    pairing=config.pairing,
+                    tasks_per_node=tasks_per_node,
+                )
+                # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
+                # for a full example execution of the genetic algorithm.
+                # The following block is examplified in section 13.
+                scatter(
+                    sendbuf=exchange_and_mutate_info,
+                    recvbuf=exchange_and_mutate_info_batch,
+                    selection=config.selection,
+                )
+                pending_exchange = exchange_agents(
+                    num_pops=space.num_pops,
+                    pop_size=pop_size,
+                    agents_batch=agents_batch,
+                    exchange_and_mutate_info_batch=exchange_and_mutate_info_batch,
+                    exchange=config.exchange,
+                    lineage_bases=lineage_bases,
+                    noise_table=noise_table,
+                    shared_buffers=shared_buffers,
+                    wait=not pipeline,
+                )
+            if genealogy_recorder is not None:
+                genealogy_recorder.record(
+                    genealogy=compute_genealogy(
+                        exchange_and_mutate_info=exchange_and_mutate_info,
+                        seeds=seeds,
+                        curr_gen=curr_gen,
+                    ),
+                    curr_gen=curr_gen,
+                )
+            if not pipeline:
+                mutate(
                     agents_batch=agents_batch,
+                    exchange_and_mutate_info_batch=exchange_and_mutate_info_batch,
+                    num_pops=space.num_pops,
+                    noise_table=noise_table,
+                    record_lineage=lineage_bases is not None,
+                )
+            fitnesses_and_num_env_steps_batch = (
+                mutate_and_evaluate_pipelined(
+                    agents_batch=agents_batch,
+                    exchange_and_mutate_info_batch=exchange_and_mutate_info_batch,
+                    pending_exchange=pending_exchange,
                     space=space,
                     curr_gen=curr_gen,
-                    transfer=config.env_transfer
-                    or config.fit_transfer
-                    or config.mem_transfer,
+                    exchange=config.exchange,
+                    lineage_bases=lineage_bases,
+                    noise_table=noise_table,
+                    eval_mode=config.eval_mode,
+                    thread_pool=thread_pool,
+                )
+                if pipeline
+                else (
+                    evaluate_on_gpu(
+                        ith_gpu_comm=ith_gpu_comm,
+                        agents_batch=agents_batch,
+                        space=space,
+                        curr_gen=curr_gen,
+                        transfer=config.env_transfer
+                        or config.fit_transfer
+                        or config.mem_transfer,
+                    )
+                    if space.evaluates_on_gpu
+                    else evaluate_on_cpu(
+                        agents_batch=agents_batch,
+                        space=space,
+                        curr_gen=curr_gen,
+                        eval_mode=config.eval_mode,
+                        thread_pool=thread_pool,
+                        scheduler=scheduler,
+                        racer=racer,
+                    )
                 )
             )
-            if space.evaluates_on_gpu
-            else evaluate_on_cpu(
+            compute_generation_results(
+                generation_results=generation_results,
+                generation_results_batch=generation_results_batch,
+                fitnesses_and_num_env_steps_batch=fitnesses_and_num_env_steps_batch,
                 agents_batch=agents_batch,
-                space=space,
-                curr_gen=curr_gen,
+                num_pops=space.num_pops,
+                exchange=config.exchange,
+                selection=config.selection,
             )
-        )
-        compute_generation_results(
-            generation_results=generation_results,
-            generation_results_batch=generation_results_batch,
-            fitnesses_and_num_env_steps_batch=fitnesses_and_num_env_steps_batch,
-            agents_batch=agents_batch,
-            num_pops=space.num_pops,
-        )
-        # Primary process gathers fitnesses, number of environment steps
-        # and pickled agent sizes
-        comm.Gather(
-            sendbuf=generation_results_batch,
-            recvbuf=generation_results,
-        )
-        total_num_env_steps = (
-            compute_total_num_env_steps_and_process_fitnesses(
-                generation_results=generation_results,
-                total_num_env_steps=total_num_env_steps,
-                curr_gen=curr_gen,
-                start_time=start_time,
-                pop_merge=config.pop_merge,
+            total_num_env_steps = (
+                compute_total_num_env_steps_and_process_fitnesses(
+                    generation_results=generation_results,
+                    total_num_env_steps=total_num_env_steps,
+                    curr_gen=curr_gen,
+                    start_time=start_time,
+                    num_saved_env_steps=(
+                        sum(
+                            agent.curr_eval_num_saved_steps
+                            for agents in agents_batch
+                            for agent in agents
+                        )
+                        if config.early_stopping
+                        else None
+                    ),
+                    log_buffer=space.log_buffer if config.logging else None,
+                    pop_merge=config.pop_merge,
+                )
             )
-        )
-        # State saving.
-        if curr_gen in save_points:
-            save_state(
+            migrate_agents(
+                islands=islands,
                 agents_batch=agents_batch,
                 generation_results=generation_results,
-                total_num_env_steps=total_num_env_steps,
                 curr_gen=curr_gen,
-                output_dir=config.output_dir,
             )
-    terminate_wandb()
+            # State saving.
+            if curr_gen in save_points:
+                save_state(
+                    agents_batch=agents_batch,
+                    generation_results=generation_results,
+                    total_num_env_steps=total_num_env_steps,
+                    curr_gen=curr_gen,
+                    output_dir=output_dir,
+                    templates=templates,
+                    writer=writer,
+                    genealogy_recorder=genealogy_recorder,
+                )
+    if thread_pool is not None:
+        thread_pool.shutdown()
+
+
+def evolve_steady_state(
+    space: BaseSpace,
+    agent: partial[BaseAgent],
+    logger: Callable[..., Any],
+    config: NeuroevolutionSubtaskConfig,
+) -> None:
+    """Steady-state Neuroevolution.
+
+    See :paramref:`~.NeuroevolutionSubtaskConfig.evolution`.
+
+    Args:
+        space
+        agent
+        logger: See :func:`~.utils.wandb.setup_wandb`.
+        config
+
+    Raises:
+        ValueError: If :paramref:`space` holds more than one
+            population or evaluates on GPU, or if there is a single
+            MPI process.
+    """
+    # Built before seeding so as not to alter the random state.
+    templates = [agent(pop_idx=0, pops_are_merged=False)]
+    seed_all(config.seed)
+    _, rank, size = get_mpi_variables()
+    if (
+        space.num_pops != 1
+        or space.evaluates_on_gpu
+        or size < 2  # noqa: PLR2004
+    ):
+        error_msg = (
+            "`evolution = steady_state` requires a single population "
+            "evaluated on CPU by at least two MPI processes."
+        )
+        raise ValueError(error_msg)
+    validate_space(
+        space=space,
+        pop_merge=config.pop_merge,
+        exchange=config.exchange,
+        env_transfer=config.env_transfer,
+        eval_mode=config.eval_mode,
+    )
+    prev_num_gens, save_points = compute_save_points(
+        output_dir=config.output_dir,
+        total_num_gens=config.total_num_gens,
+        save_interval=config.save_interval,
+        save_first_gen=config.save_first_gen,
+    )
+    pop_size, *_ = initialize_common_variables(
+        agents_per_task=config.agents_per_task,
+        num_pops=space.num_pops,
+        selection=config.selection,
+    )
+    noise_table = (
+        NoiseTable(size=config.noise_table_size, seed=config.seed)
+        if config.noise_table_size
+        else None
+    )
+    if rank != 0:
+        work(agent=agent, space=space, noise_table=noise_table)
+        return
+    coordinator = SteadyStateCoordinator(
+        pop_size=pop_size,
+        tournament_size=config.tournament_size,
+        templates=templates,
+    )
+    if prev_num_gens > 0:
+        coordinator.load(
+            path=Path(f"{config.output_dir}/{prev_num_gens}"),
+            noise_table=noise_table,
+            cache=MaterializationCache(
+                max_size=config.materialization_cache_size,
+            ),
+        )
+    setup_wandb(
+        logger=logger,
+        output_dir=config.output_dir,
+        metrics_queue_size=config.metrics_queue_size,
+        metrics_path=(
+            Path(f"{config.output_dir}/metrics.jsonl")
+            if config.metrics_sink
+            else None
+        ),
+    )
+    # Only the coordinator saves: its writer does not synchronize with
+    # the workers.
+    with use_mpi_comm(comm=MPI.COMM_SELF):
+        writer_context = (
+            CheckpointWriter(queue_size=config.save_queue_size)
+            if config.save_queue_size
+            else nullcontext()
+        )
+    # Queued save points are written even if evolution fails.
+    with writer_context as writer:
+        coordinator.run(
+            prev_num_gens=prev_num_gens,
+            total_num_gens=config.total_num_gens,
+            save_points=save_points,
+            output_dir=config.output_dir,
+            writer=writer,
+        )
 
 
 def test(
@@ -241,32 +574,60 @@ def test(
     # Get MPI info
     comm, rank, size = get_mpi_variables()
     # Setup work distribution across MPI processes
-    save_points = find_existing_save_points(output_dir=config.output_dir)
+    output_dirs = (
+        [config.output_dir]
+        if config.num_islands == 1
+        else [
+            get_island_output_dir(output_dir=config.output_dir, idx=idx)
+            for idx in range(config.num_islands)
+        ]
+    )
+    save_points = []
+    for output_dir in output_dirs:
+        convert_states(output_dir=output_dir)
+        save_points += [
+            (output_dir, gen)
+            for gen in find_existing_save_points(output_dir=output_dir)
+        ]
+    noise_table = (
+        NoiseTable(size=config.noise_table_size, seed=config.seed)
+        if config.noise_table_size
+        else None
+    )
+    cache = MaterializationCache(max_size=config.materialization_cache_size)
     assigned_save_points = [
         save_points[i] for i in range(len(save_points)) if i % size == rank
     ]
     # Loop over work assigned to this MPI process
-    for gen in assigned_save_points:
+    for output_dir, gen in assigned_save_points:
         # Validate path & load state
-        path = Path(f"{config.output_dir}/{gen}/")
-        if not (path / "state.pkl").is_file():
+        path = Path(f"{output_dir}/{gen}/")
+        if not (path / "manifest.json").is_file():
             log.info(f"No saved state found at {path}.")
             continue
         if (path / "evaluation.pkl").is_file():
             log.info(f"Already evaluated generation {gen}.")
             continue
-        with (path / "state.pkl").open(mode="rb") as f:
-            state = pickle.load(f)
+        manifest = load_manifest(path=path)
         # Extract state information for testing
-        agents: list[list[BaseAgent]] = state[0]
-        pop_size: int = len(agents)
-        generation_results: Generation_results_type = state[1]
-        total_num_env_steps: int = state[2]
+        generation_results: Generation_results_type = load_generation_results(
+            path=path,
+        )
+        total_num_env_steps: int = manifest["total_num_env_steps"]
+        pop_size: int = len(generation_results)
         fitnesses = generation_results[:, :, 0]
         fitnesses_sorting_indices = fitnesses.argsort(axis=0)
         fitnesses_index_ranking = fitnesses_sorting_indices.argsort(axis=0)
         selected = np.greater_equal(fitnesses_index_ranking, pop_size // 2)
         selected_indices = np.where(selected[:, 0])[0]
+        # Only the selected agents are read from disk.
+        agents: list[list[BaseAgent]] = load_agents(
+            path=path,
+            manifest=manifest,
+            indices=selected_indices.tolist(),
+            noise_table=noise_table,
+            cache=cache,
+        )
         # Setup evaluation
         scores = np.empty((pop_size // 2, config.num_tests))
         # Setting `eval_num_steps` to `test_num_steps` to have
@@ -275,10 +636,13 @@ def test(
         space.config.eval_num_steps = config.test_num_steps
         # Loop over selected agents
         for i in range(pop_size // 2):
-            agent: BaseAgent = agents[selected_indices[i]][0]
+            agent: BaseAgent = agents[i][0]
             for j in range(config.num_tests):
                 log.info(f"Test #{j}, agent #{i}, generation #{gen}.")
                 seed_all(MAX_INT - j)
+                # Agents draw their randomness from their own generator
+                # (see :attr:`~.BaseAgent.generator`).
+                agent.generator.manual_seed(MAX_INT - j)
                 # env,fit,env+fit,env+fit+mem: reset
                 # mem,mem+fit: no reset
                 if not (
@@ -1,5 +1,13 @@
 """Static architecture CPU-based Neural nets for neuroevolution."""
 
-from .rnnfc import CPUStaticRNNFC, CPUStaticRNNFCConfig
+from .rnnfc import (
+    CPUStaticRNNFC,
+    CPUStaticRNNFCConfig,
+    CPUStaticRNNFCPopulation,
+)
 
-__all__ = ["CPUStaticRNNFC", "CPUStaticRNNFCConfig"]
+__all__ = [
+    "CPUStaticRNNFC",
+    "CPUStaticRNNFCConfig",
+    "CPUStaticRNNFCPopulation",
+]
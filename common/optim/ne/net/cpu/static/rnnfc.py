@@ -1,10 +1,14 @@
-""":class:`.CPUStaticRNN` & its config."""
+""":class:`.CPUStaticRNN`, its config & its population counterpart."""
 
+import copy
+import weakref
 from dataclasses import dataclass
+from typing import Any
 
 import torch
 from jaxtyping import Float32
 from torch import Tensor, nn
+from torch.nn.utils import parameters_to_vector, vector_to_parameters
 
 
 @dataclass
@@ -15,11 +19,15 @@ class CPUStaticRNNFCConfig:
         input_size: Size of the input tensor.
         hidden_size: Size of the RNN hidden state.
         output_size: Size of the output tensor.
+        flat_params: Whether all parameters should be views into a
+            single contiguous buffer (see
+            :attr:`CPUStaticRNNFC.flat_params`).
     """
 
     input_size: int
     hidden_size: int
     output_size: int
+    flat_params: bool = False
 
 
 class CPUStaticRNNFC(nn.Module):
@@ -27,10 +35,19 @@ class CPUStaticRNNFC(nn.Module):
 
     Args:
         config
+
+    Attributes:
+        flat_params (torch.Tensor): A contiguous buffer that all
+            parameters are views into (only set if
+            :paramref:`~.CPUStaticRNNFCConfig.flat_params` is ``True``
+            or if the instance is attached to a
+            :class:`CPUStaticRNNFCPopulation`). It is not pickled but
+            rebuilt from the parameters upon unpickling.
     """
 
     def __init__(self: "CPUStaticRNNFC", config: CPUStaticRNNFCConfig) -> None:
         super().__init__()
+        self.config = config
         self.rnn = nn.RNNCell(
             input_size=config.input_size,
             hidden_size=config.hidden_size,
@@ -45,6 +62,48 @@ class CPUStaticRNNFC(nn.Module):
         for param in self.parameters():
             param.requires_grad = False
             param.data = torch.zeros_like(param.data)
+        if config.flat_params:
+            self.flatten_parameters()
+
+    def flatten_parameters(self: "CPUStaticRNNFC") -> None:
+        """Turns all parameters into views of :attr:`flat_params`."""
+        self.flat_params: Float32[Tensor, " num_params"] = (
+            parameters_to_vector(parameters=self.parameters())
+        )
+        vector_to_parameters(
+            vec=self.flat_params,
+            parameters=self.parameters(),
+        )
+
+    def __getstate__(self: "CPUStaticRNNFC") -> dict[str, Any]:
+        state: dict[str, Any] = super().__getstate__().copy()
+        if "flat_params" not in state:
+            return state
+        # Pickling a tensor view pickles its entire underlying storage
+        # and does not preserve the sharing of that storage. Parameters
+        # are therefore pickled as standalone copies and `flat_params`
+        # is rebuilt from them in `__setstate__`.
+        del state["flat_params"]
+        state.pop("population_slot", None)
+        state["_modules"] = {}
+        for name, module in self._modules.items():
+            module_copy = copy.copy(module)
+            module_copy._parameters = {  # noqa: SLF001
+                param_name: nn.Parameter(
+                    data=param.detach().clone(),
+                    requires_grad=False,
+                )
+                for param_name, param in module._parameters.items()  # noqa: SLF001
+            }
+            state["_modules"][name] = module_copy
+        return state
+
+    def __setstate__(self: "CPUStaticRNNFC", state: dict[str, Any]) -> None:
+        super().__setstate__(state)
+        # Instances pickled before the introduction of `config` have no
+        # flat parameter buffer.
+        if "config" in state and state["config"].flat_params:
+            self.flatten_parameters()
 
     def reset(self: "CPUStaticRNNFC") -> None:
         """Resets the hidden state of the RNN."""
@@ -59,3 +118,194 @@ class CPUStaticRNNFC(nn.Module):
         self.h = x
         x: Float32[Tensor, " output_size"] = self.fc(input=x)
         return x
+
+
+class CPUStaticRNNFCPopulation:
+    """Stacked parameters of :class:`CPUStaticRNNFC` instances.
+
+    Runs the forward pass of any number of networks sharing the same
+    :class:`CPUStaticRNNFCConfig` sizes with batched matrix
+    multiplications. Each network passed to :meth:`__call__` is
+    attached to a slot (a row of :attr:`flat_params`) and its
+    parameters become views of that row, so that networks remain
+    individually addressable (mutation, exchange, checkpointing).
+    Slots of networks that have been garbage collected (e.g. replaced
+    during exchange) are reused.
+
+    Args:
+        config: The config shared by all networks.
+
+    Attributes:
+        flat_params (torch.Tensor): The stacked flat parameters of
+            all slots.
+        slots (list[weakref.ref[CPUStaticRNNFC] | None]): The network
+            attached to each slot.
+    """
+
+    def __init__(
+        self: "CPUStaticRNNFCPopulation",
+        config: CPUStaticRNNFCConfig,
+    ) -> None:
+        self.config = config
+        template = CPUStaticRNNFC(
+            config=CPUStaticRNNFCConfig(
+                input_size=config.input_size,
+                hidden_size=config.hidden_size,
+                output_size=config.output_size,
+            ),
+        )
+        self.param_shapes: dict[str, torch.Size] = {
+            name: param.shape for name, param in template.named_parameters()
+        }
+        self.num_params = sum(
+            shape.numel() for shape in self.param_shapes.values()
+        )
+        self.flat_params: Float32[Tensor, " num_slots num_params"] = (
+            torch.zeros(size=(0, self.num_params))
+        )
+        self.slots: list[weakref.ref[CPUStaticRNNFC] | None] = []
+
+    def attach(
+        self: "CPUStaticRNNFCPopulation",
+        nets: list[CPUStaticRNNFC],
+    ) -> list[int]:
+        """Attaches :paramref:`nets` to slots if not already attached.
+
+        Args:
+            nets: The networks to attach.
+
+        Returns:
+            The slot index of each network.
+        """
+        slot_idx = []
+        free_slots = [
+            i
+            for i, slot in enumerate(self.slots)
+            if slot is None or slot() is None
+        ]
+        for net in nets:
+            i = getattr(net, "population_slot", None)
+            if (
+                i is not None
+                and i < len(self.slots)
+                and self.slots[i] is not None
+                and self.slots[i]() is net
+            ):
+                slot_idx.append(i)
+                continue
+            if not free_slots:
+                free_slots = self.grow()
+            i = free_slots.pop(0)
+            self.flat_params[i] = parameters_to_vector(
+                parameters=net.parameters(),
+            )
+            self.slots[i] = weakref.ref(net)
+            self.bind(net=net, i=i)
+            slot_idx.append(i)
+        return slot_idx
+
+    def grow(self: "CPUStaticRNNFCPopulation") -> list[int]:
+        """Doubles the number of slots & re-binds attached networks.
+
+        Returns:
+            The indices of the new (free) slots.
+        """
+        num_slots = len(self.slots)
+        new_num_slots = max(2 * num_slots, 1)
+        flat_params = torch.zeros(size=(new_num_slots, self.num_params))
+        flat_params[:num_slots] = self.flat_params
+        self.flat_params = flat_params
+        self.slots += [None] * (new_num_slots - num_slots)
+        for i in range(num_slots):
+            slot = self.slots[i]
+            net = slot() if slot is not None else None
+            if net is not None:
+                self.bind(net=net, i=i)
+        return list(range(num_slots, new_num_slots))
+
+    def bind(
+        self: "CPUStaticRNNFCPopulation",
+        net: CPUStaticRNNFC,
+        i: int,
+    ) -> None:
+        """Turns :paramref:`net`'s parameters into views of slot ``i``.
+
+        Args:
+            net: The network to bind.
+            i: The slot index.
+        """
+        net.flat_params = self.flat_params[i]
+        net.population_slot = i
+        vector_to_parameters(vec=net.flat_params, parameters=net.parameters())
+
+    def split(
+        self: "CPUStaticRNNFCPopulation",
+        flat_params: Float32[Tensor, " batch_size num_params"],
+    ) -> dict[str, Tensor]:
+        """Splits stacked flat parameters into stacked parameters.
+
+        Args:
+            flat_params: Rows of :attr:`flat_params`.
+
+        Returns:
+            Views of :paramref:`flat_params` of shape
+                ``(batch_size, *param_shape)``, keyed by parameter name.
+        """
+        params = {}
+        start = 0
+        for name, shape in self.param_shapes.items():
+            params[name] = flat_params[:, start : start + shape.numel()].view(
+                len(flat_params),
+                *shape,
+            )
+            start += shape.numel()
+        return params
+
+    def __call__(
+        self: "CPUStaticRNNFCPopulation",
+        nets: list[CPUStaticRNNFC],
+        x: Float32[Tensor, " batch_size input_size"],
+    ) -> Float32[Tensor, " batch_size output_size"]:
+        """Batched equivalent of calling each network on its ``x`` row.
+
+        Args:
+            nets: The networks to run.
+            x: One input tensor per network.
+
+        Returns:
+            One output tensor per network.
+        """
+        slot_idx = self.attach(nets=nets)
+        params = self.split(
+            flat_params=(
+                self.flat_params
+                if slot_idx == list(range(len(self.slots)))
+                else self.flat_params[slot_idx]
+            ),
+        )
+        h: Float32[Tensor, " batch_size 1 hidden_size"] = torch.stack(
+            [net.h for net in nets],
+        ).unsqueeze(dim=1)
+        x: Float32[Tensor, " batch_size 1 input_size"] = x.unsqueeze(dim=1)
+        h = torch.tanh(
+            torch.baddbmm(
+                params["rnn.bias_ih"].unsqueeze(dim=1),
+                x,
+                params["rnn.weight_ih"].mT,
+            )
+            + torch.baddbmm(
+                params["rnn.bias_hh"].unsqueeze(dim=1),
+                h,
+                params["rnn.weight_hh"].mT,
+            ),
+        )
+        # Hidden states are cloned so that each network owns its own
+        # (pickling a view pickles its entire underlying storage).
+        for i, net in enumerate(nets):
+            net.h = h[i, 0].clone()
+        x: Float32[Tensor, " batch_size output_size"] = torch.baddbmm(
+            params["fc.bias"].unsqueeze(dim=1),
+            h,
+            params["fc.weight"].mT,
+        ).squeeze(dim=1)
+        return x
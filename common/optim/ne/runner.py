@@ -53,10 +53,50 @@ class NeuroevolutionTaskRunner(OptimTaskRunner):
             RuntimeError: If
                 :paramref:`~.NeuroevolutionSubtaskConfig.device` is
                 set to ``gpu`` but CUDA is not available.
+            ValueError: If config values are incompatible.
         """
         if config.eval_num_steps == 0 and config.env_transfer:
             error_msg = "`env_transfer = True` requires `eval_num_steps > 0`."
             raise ValueError(error_msg)
+        if config.pipeline and config.eval_mode in ("batched", "balanced"):
+            error_msg = (
+                "`pipeline = True` requires `eval_mode = serial` or "
+                "`eval_mode = threaded`."
+            )
+            raise ValueError(error_msg)
+        if config.evolution == "steady_state" and config.save_mode != "full":
+            error_msg = (
+                "`evolution = steady_state` requires `save_mode = full`."
+            )
+            raise ValueError(error_msg)
+        if config.early_stopping and config.fit_transfer:
+            error_msg = (
+                "`early_stopping = True` requires `fit_transfer = False`."
+            )
+            raise ValueError(error_msg)
+        if config.racing and (
+            config.eval_mode != "serial"
+            or config.pipeline
+            or config.early_stopping
+            or config.env_transfer
+            or config.fit_transfer
+            or config.mem_transfer
+        ):
+            error_msg = (
+                "`racing = True` requires `eval_mode = serial`, "
+                "`pipeline = False`, `early_stopping = False` & no transfer."
+            )
+            raise ValueError(error_msg)
+        if config.num_islands > 1 and (
+            config.evolution != "generational"
+            or config.save_mode != "full"
+            or config.exchange == "lineage"
+        ):
+            error_msg = (
+                "`num_islands > 1` requires `evolution = generational`, "
+                "`save_mode = full` & `exchange != lineage`."
+            )
+            raise ValueError(error_msg)
 
     @classmethod
     def run_subtask(
@@ -19,10 +19,13 @@ class BaseSpaceConfig:
         eval_num_steps: See
             :paramref:`~.NeuroevolutionSubtaskConfig.eval_num_steps`.
         logging: See :paramref:`~.NeuroevolutionSubtaskConfig.logging`.
+        early_stopping: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.early_stopping`.
     """
 
     eval_num_steps: An[int, ge(0)] = "${config.eval_num_steps}"  # type: ignore[assignment]
     logging: bool = "${config.logging}"  # type: ignore[assignment]
+    early_stopping: bool = "${config.early_stopping}"  # type: ignore[assignment]
 
 
 class BaseSpace(ABC):
@@ -38,6 +41,22 @@ class BaseSpace(ABC):
             given space.
         evaluates_on_gpu: Whether GPU devices are used to evaluate
             agents.
+
+    Attributes:
+        logged_score (float | None): The value to log for the latest
+            agent evaluated through :meth:`evaluate` (``None`` if no
+            value is to be logged).
+        log_buffer (list[tuple[float | None, int]]): The logged
+            scores (see :attr:`logged_score`) & total numbers of steps
+            (see :attr:`~.BaseAgent.total_num_steps`) of the agents
+            evaluated by this process since the last reduction (see
+            :func:`.reduce_logs`).
+        selection_cutoff (float | None): The previous generation's
+            selection cutoff (see :func:`.compute_selection_cutoff`),
+            ``None`` if unknown.
+        eval_episode (int): The index of the current evaluation
+            episode of the agents being evaluated, within the
+            generation (see :class:`.Racer`).
     """
 
     def __init__(
@@ -50,6 +69,10 @@ class BaseSpace(ABC):
         self.config = config
         self.num_pops = num_pops
         self.evaluates_on_gpu = evaluates_on_gpu
+        self.logged_score: float | None = None
+        self.log_buffer: list[tuple[float | None, int]] = []
+        self.selection_cutoff: float | None = None
+        self.eval_episode = 0
 
     @abstractmethod
     def evaluate(
@@ -69,3 +92,30 @@ class BaseSpace(ABC):
         Returns:
             The fitnesses and number of steps ran.
         """
+
+    def evaluate_batch(
+        self: "BaseSpace",
+        agents_batch: list[list[BaseAgent]],
+        curr_gen: An[int, ge(1)],
+    ) -> np.ndarray[np.float32, Any]:
+        """Evaluates all agents maintained by a process at once.
+
+        Calls :meth:`evaluate` on each element of
+        :paramref:`agents_batch` by default. Subclasses can override
+        this method to step their environments together.
+
+        Args:
+            agents_batch: See
+                :paramref:`~.compute_generation_results.agents_batch`.
+            curr_gen: See :paramref:`curr_gen`.
+
+        Returns:
+            The fitnesses and number of steps ran, of shape
+                ``(len(agents_batch), num_pops, 2)``.
+        """
+        return np.stack(
+            [
+                self.evaluate(agents=[agents], curr_gen=curr_gen)
+                for agents in agents_batch
+            ],
+        ).reshape(len(agents_batch), self.num_pops, 2)
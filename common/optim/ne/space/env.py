@@ -0,0 +1,531 @@
+""":class:`.BaseBatchedEnv` & its implementations."""
+
+import copy
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+import torch
+from gymnasium import Env, Wrapper
+from gymnasium.wrappers import TimeLimit
+from jaxtyping import Bool, Float32, Float64
+from tensordict import TensorDict
+from torch import Tensor
+from torchrl.data.tensor_specs import OneHot
+from torchrl.envs import EnvBase
+from torchrl.envs.libs.gym import GymEnv
+
+from common.utils.beartype import ge
+
+
+class BaseBatchedEnv(ABC):
+    """Fixed number of environment slots stepped together.
+
+    Used by :meth:`~.BaseReinforcementSpace.evaluate_batch` to evaluate
+    all agents maintained by a process at once, each agent being
+    attributed its own slot.
+
+    Args:
+        num_envs: Number of environment slots.
+
+    Attributes:
+        saves_snapshots (bool): Whether :meth:`save` returns
+            snapshots, which can be packed into a state buffer.
+    """
+
+    saves_snapshots = False
+
+    def __init__(self: "BaseBatchedEnv", num_envs: An[int, ge(1)]) -> None:
+        self.num_envs = num_envs
+
+    @abstractmethod
+    def reset(
+        self: "BaseBatchedEnv",
+        idx: An[int, ge(0)],
+        seed: int,
+    ) -> Float32[Tensor, " obs_size"]:
+        """Seeds & resets an environment slot.
+
+        Args:
+            idx: The slot index.
+            seed: The environment seed.
+
+        Returns:
+            The initial observation.
+        """
+
+    @abstractmethod
+    def step(
+        self: "BaseBatchedEnv",
+        idx: list[int],
+        actions: Tensor,
+    ) -> tuple[
+        Float32[Tensor, " num_idx obs_size"],  # obs
+        Float32[np.ndarray, " num_idx"],  # rewards
+        Bool[np.ndarray, " num_idx"],  # dones
+    ]:
+        """Steps a subset of the environment slots.
+
+        Args:
+            idx: The slot indices.
+            actions: One action per slot in :paramref:`idx`.
+
+        Returns:
+            The observations, rewards and whether the episodes are
+                done.
+        """
+
+    @abstractmethod
+    def save(
+        self: "BaseBatchedEnv",
+        idx: An[int, ge(0)],
+    ) -> tuple[Any, Any]:  # saved_env, saved_env_out
+        """Saves an environment slot's state.
+
+        Implementations should, whenever possible, return a snapshot of
+        the environment's dynamical state (e.g. physics state, random
+        number generator state & episode counters) as a small
+        :class:`torch.Tensor` rather than a copy of the environment:
+        snapshots are cheap to take, to restore and to exchange, and
+        can be packed into a state buffer (see
+        :meth:`~.BaseAgent.get_state_buffer`).
+
+        Args:
+            idx: The slot index.
+
+        Returns:
+            See :attr:`~.BaseAgent.saved_env` and
+                :attr:`~.BaseAgent.saved_env_out`.
+        """
+
+    @abstractmethod
+    def load(
+        self: "BaseBatchedEnv",
+        idx: An[int, ge(0)],
+        saved_env: Any,  # noqa: ANN401
+        saved_env_out: Any,  # noqa: ANN401
+    ) -> Float32[Tensor, " obs_size"]:
+        """Loads a state saved with :meth:`save` into a slot.
+
+        Args:
+            idx: The slot index.
+            saved_env: See :attr:`~.BaseAgent.saved_env`.
+            saved_env_out: See :attr:`~.BaseAgent.saved_env_out`.
+
+        Returns:
+            The observation to resume from.
+        """
+
+
+class TorchRLBatchedEnv(BaseBatchedEnv):
+    """Copies of a `torchrl <https://pytorch.org/rl/>`_ environment.
+
+    Environment slots are stepped one after the other, which preserves
+    the exact semantics of :meth:`~.BaseReinforcementSpace.evaluate`
+    for any :class:`torchrl.envs.EnvBase`.
+
+    Args:
+        env: The environment to copy.
+        num_envs: See :paramref:`~.BaseBatchedEnv.num_envs`.
+    """
+
+    def __init__(
+        self: "TorchRLBatchedEnv",
+        env: EnvBase,
+        num_envs: An[int, ge(1)],
+    ) -> None:
+        super().__init__(num_envs=num_envs)
+        self.envs = [copy.deepcopy(env) for _ in range(num_envs)]
+        self.outs: list[TensorDict] = [TensorDict() for _ in range(num_envs)]
+
+    def reset(
+        self: "TorchRLBatchedEnv",
+        idx: An[int, ge(0)],
+        seed: int,
+    ) -> Float32[Tensor, " obs_size"]:
+        self.envs[idx].set_seed(seed=seed)
+        self.outs[idx] = self.envs[idx].reset()
+        return self.outs[idx]["observation"]
+
+    def step(
+        self: "TorchRLBatchedEnv",
+        idx: list[int],
+        actions: Tensor,
+    ) -> tuple[
+        Float32[Tensor, " num_idx obs_size"],
+        Float32[np.ndarray, " num_idx"],
+        Bool[np.ndarray, " num_idx"],
+    ]:
+        rewards = np.empty(shape=len(idx), dtype=np.float32)
+        dones = np.empty(shape=len(idx), dtype=bool)
+        for k, i in enumerate(idx):
+            out = self.outs[i].set(key="action", item=actions[k])
+            out = self.envs[i].step(tensordict=out)["next"]
+            rewards[k], dones[k] = float(out["reward"]), bool(out["done"])
+            self.outs[i] = out
+        obs = torch.stack([self.outs[i]["observation"] for i in idx])
+        return obs, rewards, dones
+
+    def save(
+        self: "TorchRLBatchedEnv",
+        idx: An[int, ge(0)],
+    ) -> tuple[EnvBase, TensorDict]:
+        return copy.deepcopy(self.envs[idx]), copy.deepcopy(self.outs[idx])
+
+    def load(
+        self: "TorchRLBatchedEnv",
+        idx: An[int, ge(0)],
+        saved_env: EnvBase,
+        saved_env_out: TensorDict,
+    ) -> Float32[Tensor, " obs_size"]:
+        self.envs[idx] = copy.deepcopy(saved_env)
+        self.outs[idx] = copy.deepcopy(saved_env_out)
+        return self.outs[idx]["observation"]
+
+
+class GymnasiumBatchedEnv(BaseBatchedEnv):
+    """Copies of the gymnasium environment wrapped by a :class:`GymEnv`.
+
+    Talks to the `gymnasium <https://gymnasium.farama.org/>`_
+    environments directly with NumPy arrays, which skips the
+    :class:`~tensordict.TensorDict` bookkeeping of
+    :class:`TorchRLBatchedEnv`. Observations are written into a
+    pre-allocated buffer. Seeding, action conversion, dtypes and
+    ``done`` flags reproduce those of the wrapping :class:`GymEnv`.
+    Environments are saved as snapshots (see
+    :func:`snapshot_gymnasium_env`) that are restored into the slot's
+    environment instance, which only supports the environments listed
+    in :data:`GYMNASIUM_SNAPSHOT_ADAPTERS`.
+
+    Args:
+        env: The environment whose gymnasium environment to copy.
+        num_envs: See :paramref:`~.BaseBatchedEnv.num_envs`.
+    """
+
+    saves_snapshots = True
+
+    def __init__(
+        self: "GymnasiumBatchedEnv",
+        env: GymEnv,
+        num_envs: An[int, ge(1)],
+    ) -> None:
+        super().__init__(num_envs=num_envs)
+        gym_env = env._env  # noqa: SLF001
+        self.envs = [copy.deepcopy(gym_env) for _ in range(num_envs)]
+        for slot_env in self.envs:
+            # Snapshots can be restored into (and stepped from) a slot
+            # that was never reset otherwise.
+            slot_env.reset()
+        self.one_hot_actions = isinstance(env.action_spec, OneHot)
+        observation_spec = env.observation_spec["observation"]
+        self.obs: Tensor = torch.zeros(
+            size=(num_envs, *observation_spec.shape),
+            dtype=observation_spec.dtype,
+        )
+        self.obs_np: np.ndarray[Any, Any] = self.obs.numpy()
+
+    def __getstate__(self: "GymnasiumBatchedEnv") -> dict[str, Any]:
+        state = self.__dict__.copy()
+        # Copying `obs_np` would break its memory sharing with `obs`.
+        del state["obs_np"]
+        return state
+
+    def __setstate__(
+        self: "GymnasiumBatchedEnv",
+        state: dict[str, Any],
+    ) -> None:
+        self.__dict__.update(state)
+        self.obs_np = self.obs.numpy()
+
+    def reset(
+        self: "GymnasiumBatchedEnv",
+        idx: An[int, ge(0)],
+        seed: int,
+    ) -> Tensor:
+        # `GymEnv.set_seed` resets the environment with the seed.
+        self.envs[idx].reset(seed=seed)
+        self.obs_np[idx], _ = self.envs[idx].reset()
+        return self.obs[idx]
+
+    def step(
+        self: "GymnasiumBatchedEnv",
+        idx: list[int],
+        actions: Tensor,
+    ) -> tuple[
+        Tensor,
+        Float32[np.ndarray, " num_idx"],
+        Bool[np.ndarray, " num_idx"],
+    ]:
+        rewards = np.empty(shape=len(idx), dtype=np.float32)
+        dones = np.empty(shape=len(idx), dtype=bool)
+        actions_np = (
+            actions.argmax(dim=-1) if self.one_hot_actions else actions
+        ).numpy()
+        for k, i in enumerate(idx):
+            self.obs_np[i], rewards[k], terminated, truncated, _ = self.envs[
+                i
+            ].step(actions_np[k])
+            dones[k] = terminated or truncated
+        return self.obs[idx], rewards, dones
+
+    def save(
+        self: "GymnasiumBatchedEnv",
+        idx: An[int, ge(0)],
+    ) -> tuple[Float64[Tensor, " snapshot_size"], Tensor]:
+        return (
+            snapshot_gymnasium_env(env=self.envs[idx]),
+            self.obs[idx].clone(),
+        )
+
+    def load(
+        self: "GymnasiumBatchedEnv",
+        idx: An[int, ge(0)],
+        saved_env: Float64[Tensor, " snapshot_size"],
+        saved_env_out: Tensor,
+    ) -> Tensor:
+        restore_gymnasium_env(env=self.envs[idx], snapshot=saved_env)
+        self.obs[idx] = saved_env_out
+        return self.obs[idx]
+
+
+# Number of 32-bit words in a 128-bit integer.
+_NUM_WORDS = 4
+
+
+def _get_time_limit(env: Env[Any, Any]) -> TimeLimit | None:
+    """Returns the :class:`TimeLimit` wrapper of an environment.
+
+    Args:
+        env: The (possibly wrapped) gymnasium environment.
+
+    Returns:
+        The outermost :class:`TimeLimit` wrapper of :paramref:`env`, or
+            ``None`` if it has none.
+    """
+    while isinstance(env, Wrapper):
+        if isinstance(env, TimeLimit):
+            return env
+        env = env.env
+    return None
+
+
+def _get_classic_control_state(
+    env: Env[Any, Any],
+) -> Float64[np.ndarray, " state_size"]:
+    return np.asarray(env.state, dtype=np.float64)
+
+
+def _set_classic_control_state(
+    env: Env[Any, Any],
+    values: Float64[np.ndarray, " state_size"],
+) -> None:
+    env.state = values.copy()
+
+
+def _get_cartpole_state(
+    env: Env[Any, Any],
+) -> Float64[np.ndarray, " state_size"]:
+    # `steps_beyond_terminated` is `None` until the pole falls.
+    steps_beyond_terminated = (
+        np.nan
+        if env.steps_beyond_terminated is None
+        else env.steps_beyond_terminated
+    )
+    return np.append(steps_beyond_terminated, env.state)
+
+
+def _set_cartpole_state(
+    env: Env[Any, Any],
+    values: Float64[np.ndarray, " state_size"],
+) -> None:
+    env.steps_beyond_terminated = (
+        None if np.isnan(values[0]) else int(values[0])
+    )
+    env.state = values[1:].copy()
+
+
+def _get_acrobot_state(
+    env: Env[Any, Any],
+) -> Float64[np.ndarray, " state_size"]:
+    # The state is `float32` after a reset & `float64` after a step,
+    # which changes the outcome of the next step.
+    return np.append(env.state.dtype == np.float32, env.state)
+
+
+def _set_acrobot_state(
+    env: Env[Any, Any],
+    values: Float64[np.ndarray, " state_size"],
+) -> None:
+    env.state = values[1:].astype(np.float32 if values[0] else np.float64)
+
+
+def _get_mujoco_state(
+    env: Env[Any, Any],
+) -> Float64[np.ndarray, " state_size"]:
+    return np.concatenate(([env.data.time], env.data.qpos, env.data.qvel))
+
+
+def _set_mujoco_state(
+    env: Env[Any, Any],
+    values: Float64[np.ndarray, " state_size"],
+) -> None:
+    qpos, qvel = np.split(values[1:], [env.model.nq])
+    env.set_state(qpos=qpos, qvel=qvel)
+    env.data.time = values[0]
+
+
+# Maps the (fully qualified) class names of the supported unwrapped
+# gymnasium environments, or of one of their base classes, to the
+# functions that get & set their dynamical state. Names are used so
+# that optional simulators (e.g. MuJoCo) need not be imported.
+GYMNASIUM_SNAPSHOT_ADAPTERS: dict[
+    str,
+    tuple[
+        Callable[[Env[Any, Any]], Float64[np.ndarray, " state_size"]],
+        Callable[[Env[Any, Any], Float64[np.ndarray, " state_size"]], None],
+    ],
+] = {
+    "gymnasium.envs.classic_control.acrobot.AcrobotEnv": (
+        _get_acrobot_state,
+        _set_acrobot_state,
+    ),
+    "gymnasium.envs.classic_control.cartpole.CartPoleEnv": (
+        _get_cartpole_state,
+        _set_cartpole_state,
+    ),
+    "gymnasium.envs.classic_control.continuous_mountain_car."
+    "Continuous_MountainCarEnv": (
+        _get_classic_control_state,
+        _set_classic_control_state,
+    ),
+    "gymnasium.envs.classic_control.mountain_car.MountainCarEnv": (
+        _get_classic_control_state,
+        _set_classic_control_state,
+    ),
+    "gymnasium.envs.classic_control.pendulum.PendulumEnv": (
+        _get_classic_control_state,
+        _set_classic_control_state,
+    ),
+    "gymnasium.envs.mujoco.mujoco_env.MujocoEnv": (
+        _get_mujoco_state,
+        _set_mujoco_state,
+    ),
+}
+
+
+def _get_snapshot_adapter(
+    env: Env[Any, Any],
+) -> tuple[
+    Callable[[Env[Any, Any]], Float64[np.ndarray, " state_size"]],
+    Callable[[Env[Any, Any], Float64[np.ndarray, " state_size"]], None],
+]:
+    """Returns the snapshot adapter of a gymnasium environment.
+
+    Args:
+        env: The unwrapped gymnasium environment.
+
+    Returns:
+        See :data:`GYMNASIUM_SNAPSHOT_ADAPTERS`.
+
+    Raises:
+        ValueError: If :paramref:`env` is not supported.
+    """
+    for cls in type(env).__mro__:
+        adapter = GYMNASIUM_SNAPSHOT_ADAPTERS.get(
+            f"{cls.__module__}.{cls.__qualname__}",
+        )
+        if adapter is not None:
+            return adapter
+    error_msg = (
+        f"Environment `{type(env).__qualname__}` cannot be saved as a "
+        "snapshot (see `GYMNASIUM_SNAPSHOT_ADAPTERS`). Set "
+        "`skip_tensordict = False` to copy it instead."
+    )
+    raise ValueError(error_msg)
+
+
+def snapshot_gymnasium_env(
+    env: Env[Any, Any],
+) -> Float64[Tensor, " snapshot_size"]:
+    """Captures the dynamical state of a gymnasium environment.
+
+    The snapshot holds the :class:`TimeLimit` step counter, the
+    environment's :class:`~numpy.random.PCG64` state (split into 32-bit
+    words, which :class:`float` values represent exactly) and the
+    environment-specific state returned by its adapter (see
+    :data:`GYMNASIUM_SNAPSHOT_ADAPTERS`).
+
+    Args:
+        env: The (possibly wrapped) gymnasium environment.
+
+    Returns:
+        The snapshot.
+
+    Raises:
+        ValueError: If :paramref:`env` has no snapshot adapter or does
+            not use a :class:`~numpy.random.PCG64` generator.
+    """
+    unwrapped = env.unwrapped
+    get_state, _ = _get_snapshot_adapter(env=unwrapped)
+    rng_state = unwrapped.np_random.bit_generator.state
+    if rng_state["bit_generator"] != "PCG64":
+        error_msg = (
+            "Only environments using a `PCG64` generator can be saved as "
+            f"snapshots, got `{rng_state['bit_generator']}`."
+        )
+        raise ValueError(error_msg)
+    time_limit = _get_time_limit(env=env)
+    elapsed_steps = 0
+    if time_limit is not None:
+        elapsed_steps = time_limit._elapsed_steps or 0  # noqa: SLF001
+    words = [
+        (value >> (32 * i)) & 0xFFFFFFFF
+        for value in rng_state["state"].values()
+        for i in range(_NUM_WORDS)
+    ]
+    return torch.from_numpy(
+        np.concatenate(
+            [
+                [elapsed_steps, *words],
+                [rng_state["has_uint32"], rng_state["uinteger"]],
+                get_state(unwrapped),
+            ],
+        ),
+    )
+
+
+def restore_gymnasium_env(
+    env: Env[Any, Any],
+    snapshot: Float64[Tensor, " snapshot_size"],
+) -> None:
+    """Restores a snapshot into a gymnasium environment.
+
+    Args:
+        env: The (possibly wrapped) gymnasium environment. Must be an
+            instance of the environment :paramref:`snapshot` was taken
+            from.
+        snapshot: See return value of :func:`snapshot_gymnasium_env`.
+    """
+    values = snapshot.numpy()
+    words = values[1 : 1 + 2 * _NUM_WORDS].astype(np.uint64).tolist()
+    state, inc = (
+        sum(
+            word << (32 * i)
+            for i, word in enumerate(words[j : j + _NUM_WORDS])
+        )
+        for j in (0, _NUM_WORDS)
+    )
+    unwrapped = env.unwrapped
+    unwrapped.np_random.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": state, "inc": inc},
+        "has_uint32": int(values[1 + 2 * _NUM_WORDS]),
+        "uinteger": int(values[2 + 2 * _NUM_WORDS]),
+    }
+    _, set_state = _get_snapshot_adapter(env=unwrapped)
+    set_state(unwrapped, values[3 + 2 * _NUM_WORDS :])
+    time_limit = _get_time_limit(env=env)
+    if time_limit is not None:
+        time_limit._elapsed_steps = int(values[0])  # noqa: SLF001
@@ -0,0 +1,103 @@
+from typing import Any
+
+import gymnasium as gym
+import numpy as np
+import pytest
+from gymnasium import Env
+
+from .env import restore_gymnasium_env, snapshot_gymnasium_env
+
+
+def snapshot_and_restore(
+    env_name: str,
+    actions: list[Any],
+) -> tuple[Env[Any, Any], Env[Any, Any]]:
+    env = gym.make(id=env_name)
+    env.reset(seed=0)
+    for action in actions:
+        env.step(action)
+    restored_env = gym.make(id=env_name)
+    restored_env.reset(seed=1)
+    restore_gymnasium_env(
+        env=restored_env,
+        snapshot=snapshot_gymnasium_env(env=env),
+    )
+    return env, restored_env
+
+
+def assert_same_steps(
+    env: Env[Any, Any],
+    restored_env: Env[Any, Any],
+    actions: list[Any],
+) -> None:
+    for action in actions:
+        obs, reward, terminated, truncated, _ = env.step(action)
+        restored_obs, restored_reward, restored_terminated, *_ = (
+            restored_env.step(action)
+        )
+        assert np.array_equal(obs, restored_obs)
+        assert reward == restored_reward
+        assert terminated == restored_terminated
+        if terminated or truncated:
+            return
+
+
+@pytest.mark.parametrize(
+    "env_name",
+    ["Acrobot-v1", "CartPole-v1", "MountainCar-v0", "Pendulum-v1"],
+)
+def test_classic_control(env_name: str) -> None:
+    action_space = gym.make(id=env_name).action_space
+    action_space.seed(seed=0)
+    actions = [action_space.sample() for _ in range(20)]
+    env, restored_env = snapshot_and_restore(
+        env_name=env_name,
+        actions=actions[:10],
+    )
+    assert_same_steps(env=env, restored_env=restored_env, actions=actions)
+
+
+def test_cartpole_steps_beyond_terminated() -> None:
+    # The pole falls within 10 steps when always pushed to the right.
+    env, restored_env = snapshot_and_restore(
+        env_name="CartPole-v1",
+        actions=[1] * 10,
+    )
+    assert env.unwrapped.steps_beyond_terminated is not None
+    assert (
+        restored_env.unwrapped.steps_beyond_terminated
+        == env.unwrapped.steps_beyond_terminated
+    )
+    # Steps past termination yield no reward.
+    assert restored_env.step(1)[1] == 0
+
+
+def test_acrobot_dtype() -> None:
+    env, restored_env = snapshot_and_restore(
+        env_name="Acrobot-v1",
+        actions=[],
+    )
+    assert restored_env.unwrapped.state.dtype == np.float32
+    env.step(0)
+    restored_env.step(0)
+    assert restored_env.unwrapped.state.dtype == env.unwrapped.state.dtype
+
+
+def test_mujoco() -> None:
+    pytest.importorskip("mujoco")
+    env, restored_env = snapshot_and_restore(
+        env_name="InvertedPendulum-v5",
+        actions=[np.array([0.5])] * 5,
+    )
+    assert_same_steps(
+        env=env,
+        restored_env=restored_env,
+        actions=[np.array([-0.5])] * 5,
+    )
+
+
+def test_unsupported() -> None:
+    env = gym.make(id="FrozenLake-v1")
+    env.reset(seed=0)
+    with pytest.raises(ValueError, match="cannot be saved as a snapshot"):
+        snapshot_gymnasium_env(env=env)
@@ -1,17 +1,20 @@
 """:class:`.BaseReinforcementSpace`."""
 
 import copy
+import math
 from abc import ABC
 from typing import Annotated as An
 from typing import Any, final
 
 import numpy as np
+import torch
 from tensordict import TensorDict
+from torch import Tensor
 from torchrl.envs import EnvBase
 
 from common.optim.ne.agent import BaseAgent
 from common.optim.ne.space.base import BaseSpace, BaseSpaceConfig
-from common.optim.ne.utils.wandb import gather
+from common.optim.ne.space.env import BaseBatchedEnv, TorchRLBatchedEnv
 from common.utils.beartype import ge
 
 
@@ -22,15 +25,108 @@ class BaseReinforcementSpace(BaseSpace, ABC):
         env: The `torchrl <https://pytorch.org/rl/>`_ environment to run
             the evaluation on.
         config
+        step_reward_bounds: The minimum & maximum reward that a single
+            environment step can yield, ``None`` if unknown (which
+            disables early termination, see :meth:`terminates_early`).
+        max_episode_num_steps: The maximum number of steps of an
+            episode (e.g. its time limit), ``None`` if unknown.
     """
 
     def __init__(
         self: "BaseReinforcementSpace",
         config: BaseSpaceConfig,
         env: EnvBase,
+        step_reward_bounds: tuple[float, float] | None = None,
+        max_episode_num_steps: An[int, ge(1)] | None = None,
     ) -> None:
         super().__init__(config=config, num_pops=1, evaluates_on_gpu=False)
         self.env = env
+        self.step_reward_bounds = step_reward_bounds
+        self.max_episode_num_steps = max_episode_num_steps
+        self.batched_env: BaseBatchedEnv | None = None
+        # Environment slots (see :meth:`evaluate_fast` &
+        # :meth:`evaluate_batch`) implement the default
+        # :meth:`env_done_reset`. Subclasses overriding it step
+        # :attr:`env` instead.
+        self.uses_slots = (
+            type(self).env_done_reset is BaseReinforcementSpace.env_done_reset
+        )
+        self.fast_env = self.make_fast_env() if self.uses_slots else None
+
+    def make_fast_env(self: "BaseReinforcementSpace") -> BaseBatchedEnv | None:
+        """Creates the single environment slot used by :meth:`evaluate`.
+
+        Returns ``None`` by default, in which case :meth:`evaluate`
+        steps :attr:`env` through :class:`~tensordict.TensorDict`
+        objects. Subclasses can override this method to return an
+        environment that skips this bookkeeping (see
+        :meth:`evaluate_fast`). Not called if :meth:`env_done_reset` is
+        overridden.
+
+        Returns:
+            The environment slot or ``None``.
+        """
+        return None
+
+    def saves_env_snapshots(
+        self: "BaseReinforcementSpace",
+        *,
+        batched: bool,
+    ) -> bool:
+        """Returns whether saved environments are snapshots.
+
+        Only snapshots (see :meth:`~.BaseBatchedEnv.save`) can be
+        packed into a state buffer (see
+        :meth:`~.BaseAgent.get_state_buffer`). Environments stepped
+        through :class:`~tensordict.TensorDict` objects are saved as
+        copies instead.
+
+        Args:
+            batched: Whether agents are evaluated with
+                :meth:`evaluate_batch` rather than :meth:`evaluate`.
+
+        Returns:
+            See above.
+        """
+        if not self.uses_slots:
+            return False
+        env = self.make_batched_env(num_envs=1) if batched else self.fast_env
+        return env is not None and env.saves_snapshots
+
+    def make_batched_env(
+        self: "BaseReinforcementSpace",
+        num_envs: An[int, ge(1)],
+    ) -> BaseBatchedEnv:
+        """Creates the environment slots used by :meth:`evaluate_batch`.
+
+        Subclasses can override this method to return an environment
+        that steps all of its slots at once.
+
+        Args:
+            num_envs: See :paramref:`~.BaseBatchedEnv.num_envs`.
+
+        Returns:
+            A :class:`.TorchRLBatchedEnv` copying :attr:`env`.
+        """
+        return TorchRLBatchedEnv(env=self.env, num_envs=num_envs)
+
+    def get_env_seed(
+        self: "BaseReinforcementSpace",
+        curr_gen: int,
+    ) -> An[int, ge(0)]:
+        """Returns the seed to reset the environment with.
+
+        Each evaluation episode of a generation (see
+        :attr:`~.BaseSpace.eval_episode`) is seeded differently, the
+        first one with :paramref:`curr_gen`.
+
+        Args:
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            See above.
+        """
+        return curr_gen + self.eval_episode * 2**32
 
     @final
     def run_pre_eval(
@@ -50,7 +146,7 @@ class BaseReinforcementSpace(BaseSpace, ABC):
         if curr_gen > 1 and agent.config.env_transfer:
             self.env = copy.deepcopy(agent.saved_env)
             return copy.deepcopy(agent.saved_env_out)
-        self.env.set_seed(seed=curr_gen)
+        self.env.set_seed(seed=self.get_env_seed(curr_gen=curr_gen))
         return self.env.reset()
 
     def env_done_reset(
@@ -77,25 +173,141 @@ class BaseReinforcementSpace(BaseSpace, ABC):
             agent.reset()
         if agent.config.env_transfer:
             self.logged_score: float | None = agent.curr_episode_score
-            agent.curr_episode_score = 0
+            agent.curr_episode_score = 0.0
             agent.curr_episode_num_steps = 0
-            self.env.set_seed(seed=curr_gen)
+            self.env.set_seed(seed=self.get_env_seed(curr_gen=curr_gen))
             return self.env.reset()
         return out
 
+    @staticmethod
+    def record_step(agent: BaseAgent, reward: float) -> None:
+        """Updates the agent's scores & step counters after a step.
+
+        Args:
+            agent: See :paramref:`pre_eval_reset.agent`.
+            reward: The reward obtained by the agent.
+        """
+        agent.curr_eval_score += reward
+        agent.curr_eval_num_steps += 1
+        agent.total_num_steps += 1
+        if agent.config.env_transfer:
+            agent.curr_episode_score += reward
+            agent.curr_episode_num_steps += 1
+        if agent.config.fit_transfer:
+            agent.continual_fitness += reward
+
+    @staticmethod
+    def get_fitness_and_num_steps(
+        agent: BaseAgent,
+    ) -> np.ndarray[np.float32, Any]:
+        """Returns the agent's fitness & number of evaluation steps.
+
+        Args:
+            agent: See :paramref:`pre_eval_reset.agent`.
+
+        Returns:
+            See return value of :meth:`~.BaseSpace.evaluate`.
+        """
+        return np.array(
+            (
+                (
+                    agent.continual_fitness
+                    if agent.config.fit_transfer
+                    else agent.curr_eval_score
+                ),
+                agent.curr_eval_num_steps,
+            ),
+        )
+
+    def get_max_num_remaining_steps(
+        self: "BaseReinforcementSpace",
+        agent: BaseAgent,
+    ) -> An[int, ge(0)] | None:
+        """Returns the maximum number of steps left in the evaluation.
+
+        Args:
+            agent: See :paramref:`pre_eval_reset.agent`.
+
+        Returns:
+            See above, ``None`` if unbounded.
+        """
+        max_num_steps = min(
+            [
+                *(
+                    [self.config.eval_num_steps]
+                    if self.config.eval_num_steps
+                    else []
+                ),
+                # Environments are reset mid-evaluation when
+                # `env_transfer` is `True`.
+                *(
+                    [self.max_episode_num_steps]
+                    if self.max_episode_num_steps is not None
+                    and not agent.config.env_transfer
+                    else []
+                ),
+            ],
+            default=None,
+        )
+        if max_num_steps is None:
+            return None
+        return max(max_num_steps - agent.curr_eval_num_steps, 0)
+
+    def terminates_early(
+        self: "BaseReinforcementSpace",
+        agent: BaseAgent,
+    ) -> bool:
+        """Whether the agent's evaluation can terminate early.
+
+        Given :attr:`step_reward_bounds`, an agent whose score can no
+        longer reach :attr:`~.BaseSpace.selection_cutoff` needs not be
+        evaluated any further (see
+        :paramref:`~.NeuroevolutionSubtaskConfig.early_stopping`).
+        Agents that can no longer fall below the cutoff are evaluated
+        until the end, as their partial scores would otherwise become
+        the next generation's cutoff, which would then keep rising.
+        Records the maximum number of steps the agent is spared in
+        :attr:`~.BaseAgent.curr_eval_num_saved_steps`.
+
+        Args:
+            agent: See :paramref:`pre_eval_reset.agent`.
+
+        Returns:
+            See above.
+        """
+        if (
+            not self.config.early_stopping
+            or self.selection_cutoff is None
+            or self.step_reward_bounds is None
+        ):
+            return False
+        _, max_step_reward = self.step_reward_bounds
+        num_remaining_steps = self.get_max_num_remaining_steps(agent=agent)
+        horizon = (
+            math.inf if num_remaining_steps is None else num_remaining_steps
+        )
+        # Highest score reachable by the end of the evaluation, which
+        # can also end at any step before (upon environment
+        # termination).
+        max_score = agent.curr_eval_score + (
+            max_step_reward * horizon if max_step_reward > 0 else 0
+        )
+        if max_score >= self.selection_cutoff:
+            return False
+        agent.curr_eval_num_saved_steps = num_remaining_steps or 0
+        return True
+
     @final
     def run_post_eval(
         self: "BaseReinforcementSpace",
         agent: BaseAgent,
         out: TensorDict,
-        curr_gen: int,
     ) -> None:
         """Resets the agent & saves the environment post-evaluation.
 
         Args:
             agent: See :paramref:`pre_eval_reset.agent`.
             out: The latest environment output.
-            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
         """
         if not agent.config.mem_transfer:
             agent.reset()
@@ -105,11 +317,7 @@ class BaseReinforcementSpace(BaseSpace, ABC):
         if not agent.config.env_transfer:
             self.logged_score = agent.curr_eval_score
         if self.config.logging:
-            gather(
-                logged_score=self.logged_score,
-                curr_gen=curr_gen,
-                agent_total_num_steps=agent.total_num_steps,
-            )
+            self.log_buffer.append((self.logged_score, agent.total_num_steps))
 
     @final
     def evaluate(
@@ -124,37 +332,265 @@ class BaseReinforcementSpace(BaseSpace, ABC):
             curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
         """
         agent = agents[0][0]
-        agent.curr_eval_score = 0
+        if self.fast_env is not None:
+            return self.evaluate_fast(agent=agent, curr_gen=curr_gen)
+        agent.curr_eval_score = 0.0
         agent.curr_eval_num_steps = 0
+        agent.curr_eval_num_saved_steps = 0
         self.logged_score = None
         out = self.run_pre_eval(agent=agent, curr_gen=curr_gen)
         while not out["done"]:
             out = out.set(key="action", item=agent(x=out["observation"]))
             out = self.env.step(tensordict=out)["next"]
-            agent.curr_eval_score += float(out["reward"])
-            agent.curr_eval_num_steps += 1
-            agent.total_num_steps += 1
-            if agent.config.env_transfer:
-                agent.curr_episode_score += float(out["reward"])
-                agent.curr_episode_num_steps += 1
-            if agent.config.fit_transfer:
-                agent.continual_fitness += float(out["reward"])
+            self.record_step(agent=agent, reward=float(out["reward"]))
             if out["done"]:
                 out = self.env_done_reset(
                     agent=agent,
                     out=out,
                     curr_gen=curr_gen,
                 )
-            if agent.curr_eval_num_steps == self.config.eval_num_steps:
+            if agent.curr_eval_num_steps == self.config.eval_num_steps or (
+                not out["done"] and self.terminates_early(agent=agent)
+            ):
                 break
-        self.run_post_eval(agent=agent, out=out, curr_gen=curr_gen)
-        return np.array(
-            (
-                (
-                    agent.continual_fitness
-                    if agent.config.fit_transfer
-                    else agent.curr_eval_score
-                ),
-                agent.curr_eval_num_steps,
-            ),
+        self.run_post_eval(agent=agent, out=out)
+        return self.get_fitness_and_num_steps(agent=agent)
+
+    @final
+    def run_slot_pre_eval(
+        self: "BaseReinforcementSpace",
+        agent: BaseAgent,
+        env: BaseBatchedEnv,
+        idx: An[int, ge(0)],
+        curr_gen: int,
+    ) -> Tensor:
+        """:meth:`run_pre_eval` counterpart for an environment slot.
+
+        Args:
+            agent: See :paramref:`pre_eval_reset.agent`.
+            env: The environment slots.
+            idx: The slot index attributed to :paramref:`agent`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            The observation to start from.
+        """
+        agent.curr_eval_score = 0.0
+        agent.curr_eval_num_steps = 0
+        agent.curr_eval_num_saved_steps = 0
+        if curr_gen > 1 and agent.config.env_transfer:
+            return env.load(
+                idx=idx,
+                saved_env=agent.saved_env,
+                saved_env_out=agent.saved_env_out,
+            )
+        return env.reset(idx=idx, seed=self.get_env_seed(curr_gen=curr_gen))
+
+    @final
+    def slot_done_reset(
+        self: "BaseReinforcementSpace",
+        agent: BaseAgent,
+        env: BaseBatchedEnv,
+        idx: An[int, ge(0)],
+        curr_gen: int,
+    ) -> tuple[Tensor | None, float | None]:
+        """:meth:`env_done_reset` counterpart for an environment slot.
+
+        Args:
+            agent: See :paramref:`pre_eval_reset.agent`.
+            env: See :paramref:`run_slot_pre_eval.env`.
+            idx: See :paramref:`run_slot_pre_eval.idx`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            * The observation to resume from (``None`` if the agent
+              is done being evaluated).
+            * The episode score to log (``None`` if no value is to be
+              logged).
+        """
+        if not agent.config.mem_transfer:
+            agent.reset()
+        if not agent.config.env_transfer:
+            return None, None
+        logged_score = agent.curr_episode_score
+        agent.curr_episode_score = 0.0
+        agent.curr_episode_num_steps = 0
+        return (
+            env.reset(idx=idx, seed=self.get_env_seed(curr_gen=curr_gen)),
+            logged_score,
+        )
+
+    @final
+    def run_slot_post_eval(
+        self: "BaseReinforcementSpace",
+        agent: BaseAgent,
+        env: BaseBatchedEnv,
+        idx: An[int, ge(0)],
+        logged_score: float | None,
+    ) -> float | None:
+        """:meth:`run_post_eval` counterpart for an environment slot.
+
+        Args:
+            agent: See :paramref:`pre_eval_reset.agent`.
+            env: See :paramref:`run_slot_pre_eval.env`.
+            idx: See :paramref:`run_slot_pre_eval.idx`.
+            logged_score: The latest episode score to log.
+
+        Returns:
+            See :attr:`~.BaseSpace.logged_score`.
+        """
+        if not agent.config.mem_transfer:
+            agent.reset()
+        if agent.config.env_transfer:
+            agent.saved_env, agent.saved_env_out = env.save(idx=idx)
+        else:
+            logged_score = agent.curr_eval_score
+        if self.config.logging:
+            self.log_buffer.append((logged_score, agent.total_num_steps))
+        return logged_score
+
+    @final
+    def evaluate_fast(
+        self: "BaseReinforcementSpace",
+        agent: BaseAgent,
+        curr_gen: An[int, ge(1)],
+    ) -> np.ndarray[np.float32, Any]:
+        """:class:`~tensordict.TensorDict`-free :meth:`evaluate` path.
+
+        Steps :attr:`fast_env`'s single slot instead of :attr:`env`.
+
+        Args:
+            agent: See :paramref:`pre_eval_reset.agent`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            See return value of :meth:`~.BaseSpace.evaluate`.
+        """
+        # `fast_env` is only `None` when `evaluate_fast` is not called.
+        # The following `assert` statement is for static type checking
+        # reasons and has no execution purposes.
+        assert self.fast_env is not None  # noqa: S101
+        env = self.fast_env
+        logged_score = None
+        obs: Tensor | None = self.run_slot_pre_eval(
+            agent=agent,
+            env=env,
+            idx=0,
+            curr_gen=curr_gen,
         )
+        while obs is not None:
+            next_obs, rewards, dones = env.step(
+                idx=[0],
+                actions=agent(x=obs).unsqueeze(dim=0),
+            )
+            obs = next_obs[0]
+            self.record_step(agent=agent, reward=float(rewards[0]))
+            if dones[0]:
+                obs, episode_score = self.slot_done_reset(
+                    agent=agent,
+                    env=env,
+                    idx=0,
+                    curr_gen=curr_gen,
+                )
+                logged_score = episode_score
+            if agent.curr_eval_num_steps == self.config.eval_num_steps or (
+                obs is not None and self.terminates_early(agent=agent)
+            ):
+                break
+        self.logged_score = self.run_slot_post_eval(
+            agent=agent,
+            env=env,
+            idx=0,
+            logged_score=logged_score,
+        )
+        return self.get_fitness_and_num_steps(agent=agent)
+
+    @final
+    def evaluate_batch(
+        self: "BaseReinforcementSpace",
+        agents_batch: list[list[BaseAgent]],
+        curr_gen: An[int, ge(1)],
+    ) -> np.ndarray[np.float32, Any]:
+        """Batched counterpart of :meth:`evaluate`.
+
+        Each agent is attributed an environment slot of
+        :attr:`batched_env` and all agents still running are stepped
+        together, their actions being computed with
+        :meth:`~.BaseAgent.call_batch`. Agents are evaluated one after
+        the other instead if :meth:`env_done_reset` is overridden.
+
+        Args:
+            agents_batch: See :paramref:`~.BaseSpace.evaluate_batch`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+        """
+        if not self.uses_slots:
+            return super().evaluate_batch(
+                agents_batch=agents_batch,
+                curr_gen=curr_gen,
+            )
+        agents = [agents_batch[i][0] for i in range(len(agents_batch))]
+        num_agents = len(agents)
+        if self.batched_env is None or self.batched_env.num_envs != num_agents:
+            self.batched_env = self.make_batched_env(num_envs=num_agents)
+        env = self.batched_env
+        logged_scores: list[float | None] = [None] * num_agents
+        obs = torch.stack(
+            [
+                self.run_slot_pre_eval(
+                    agent=agent,
+                    env=env,
+                    idx=i,
+                    curr_gen=curr_gen,
+                )
+                for i, agent in enumerate(agents)
+            ],
+        )
+        running = list(range(num_agents))
+        while running:
+            actions = type(agents[0]).call_batch(
+                agents=[agents[i] for i in running],
+                x=obs[running],
+            )
+            next_obs, rewards, dones = env.step(idx=running, actions=actions)
+            obs[running] = next_obs
+            still_running = []
+            for i, reward, done in zip(
+                running,
+                rewards.tolist(),
+                dones.tolist(),
+                strict=True,
+            ):
+                agent = agents[i]
+                self.record_step(agent=agent, reward=reward)
+                if done:
+                    reset_obs, logged_scores[i] = self.slot_done_reset(
+                        agent=agent,
+                        env=env,
+                        idx=i,
+                        curr_gen=curr_gen,
+                    )
+                    if reset_obs is None:
+                        continue
+                    obs[i] = reset_obs
+                if (
+                    agent.curr_eval_num_steps == self.config.eval_num_steps
+                    or self.terminates_early(agent=agent)
+                ):
+                    continue
+                still_running.append(i)
+            running = still_running
+        fitnesses_and_num_env_steps_batch = np.empty(
+            shape=(num_agents, self.num_pops, 2),
+            dtype=np.float32,
+        )
+        for i, agent in enumerate(agents):
+            self.run_slot_post_eval(
+                agent=agent,
+                env=env,
+                idx=i,
+                logged_score=logged_scores[i],
+            )
+            fitnesses_and_num_env_steps_batch[i] = (
+                self.get_fitness_and_num_steps(agent=agent)
+            )
+        return fitnesses_and_num_env_steps_batch
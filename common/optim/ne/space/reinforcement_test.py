@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from .reinforcement import BaseReinforcementSpace
+
+NUM_STEPS = 10
+
+
+def make_space(selection_cutoff: float) -> SimpleNamespace:
+    return SimpleNamespace(
+        config=SimpleNamespace(early_stopping=True),
+        selection_cutoff=selection_cutoff,
+        step_reward_bounds=(0.0, 1.0),
+        get_max_num_remaining_steps=lambda agent: NUM_STEPS
+        - agent.curr_eval_num_steps,
+    )
+
+
+def make_agent(score: float, num_steps: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        curr_eval_score=score,
+        curr_eval_num_steps=num_steps,
+        curr_eval_num_saved_steps=0,
+    )
+
+
+@pytest.mark.parametrize(
+    ("score", "num_steps", "expected"),
+    [
+        (1.0, 5, True),  # Can reach at most 6.
+        (2.0, 5, False),  # Can reach the cutoff exactly.
+        (6.0, 5, False),  # Above the cutoff but still evaluated.
+        (8.0, 9, False),
+    ],
+)
+def test_terminates_early(
+    score: float,
+    num_steps: int,
+    *,
+    expected: bool,
+) -> None:
+    agent = make_agent(score=score, num_steps=num_steps)
+    terminates_early = BaseReinforcementSpace.terminates_early(
+        self=make_space(selection_cutoff=7.0),  # type: ignore[arg-type]
+        agent=agent,  # type: ignore[arg-type]
+    )
+    assert terminates_early == expected
+    assert agent.curr_eval_num_saved_steps == (
+        NUM_STEPS - num_steps if expected else 0
+    )
+
+
+def test_selection_cutoff_does_not_ratchet() -> None:
+    # Agents earn a constant reward at every step.
+    step_rewards = np.linspace(start=0.0, stop=1.0, num=8)
+    pop_size = len(step_rewards)
+    true_cutoff = np.sort(step_rewards * NUM_STEPS)[pop_size // 2]
+    # Stale cutoff, e.g. from an earlier & less fit generation. Winners
+    # stopped as soon as they exceed it would make their partial
+    # scores the next cutoff, which would then creep up by a step
+    # reward per generation rather than reach `true_cutoff`.
+    space = make_space(selection_cutoff=2.0)
+    for _ in range(5):
+        fitnesses = []
+        for step_reward in step_rewards:
+            agent = make_agent(score=0.0, num_steps=0)
+            while (
+                agent.curr_eval_num_steps < NUM_STEPS
+                and not BaseReinforcementSpace.terminates_early(
+                    self=space,  # type: ignore[arg-type]
+                    agent=agent,  # type: ignore[arg-type]
+                )
+            ):
+                agent.curr_eval_score += step_reward
+                agent.curr_eval_num_steps += 1
+            fitnesses.append(agent.curr_eval_score)
+        space.selection_cutoff = np.sort(fitnesses)[pop_size // 2]
+        assert space.selection_cutoff == pytest.approx(true_cutoff)
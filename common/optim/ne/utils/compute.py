@@ -6,28 +6,37 @@ import time
 from typing import Annotated as An
 
 import numpy as np
-import wandb
+from mpi4py import MPI
 
 from common.optim.ne.agent import BaseAgent
-from common.optim.ne.utils.readwrite import find_existing_save_points
+from common.optim.ne.utils.exchange import pack_agent
+from common.optim.ne.utils.readwrite import (
+    convert_states,
+    find_existing_save_points,
+)
 from common.optim.ne.utils.type import (
+    Exchange_and_mutate_info_type,
     Fitnesses_and_num_env_steps_batch_type,
+    Genealogy_type,
     Generation_results_batch_type,
     Generation_results_type,
     Seeds_type,
 )
-from common.utils.beartype import ge
+from common.optim.ne.utils.wandb import log_metrics, reduce_logs
+from common.utils.beartype import ge, one_of
 from common.utils.mpi4py import get_mpi_variables
 
 log = logging.getLogger(__name__)
 
 
-def compute_generation_results(
+def compute_generation_results(  # noqa: PLR0913
     generation_results: Generation_results_type | None,
     generation_results_batch: Generation_results_batch_type,
     fitnesses_and_num_env_steps_batch: Fitnesses_and_num_env_steps_batch_type,
     agents_batch: list[list[BaseAgent]],
     num_pops: An[int, ge(1)],
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+    selection: An[str, one_of("centralized", "decentralized")],
 ) -> None:
     """Fills the :paramref:`generation_results` array with results.
 
@@ -39,12 +48,15 @@ def compute_generation_results(
     Args:
         generation_results: An array maintained solely by the
             primary process (secondary processes have this variable
-            set to ``None``) containing several pieces of information
-            about the results of a given generation. The 3rd
+            set to ``None``, unless :paramref:`selection` is
+            ``"decentralized"``) containing several pieces of
+            information about the results of a given generation. The 3rd
             dimension contains the following information at the
             following indices: 0) Agent fitness, 1) Number of
             environment steps taken by the agent during the
-            evaluation, 2) Size of the agent when serialized.
+            evaluation, 2) Size of the agent when serialized (see
+            :func:`.pack_agent`, ``0`` when :paramref:`exchange` is
+            ``"buffer"``).
         generation_results_batch: A sub-array of
             :paramref:`generation_results` maintained by the process
             calling this function.
@@ -55,23 +67,41 @@ def compute_generation_results(
         agents_batch: A 2D list of agents maintained by the process
             calling this function.
         num_pops: See :meth:`~.BaseSpace.num_pops`.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+        selection: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.selection`.
     """
     comm, _, _ = get_mpi_variables()
     # Store the fitnesses and number of environment steps
     generation_results_batch[:, :, 0:2] = fitnesses_and_num_env_steps_batch
-    # Store the size of the agents
-    for i in range(len(agents_batch)):
-        for j in range(num_pops):
-            generation_results_batch[i, j, 2] = len(
-                pickle.dumps(obj=agents_batch[i][j]),
-            )
+    # Store the size of the agents (not required by buffer-based
+    # exchanges)
+    generation_results_batch[:, :, 2] = 0
+    if exchange != "buffer":
+        for i in range(len(agents_batch)):
+            for j in range(num_pops):
+                generation_results_batch[i, j, 2] = len(
+                    pickle.dumps(
+                        obj=pack_agent(
+                            agent=agents_batch[i][j],
+                            exchange=exchange,
+                        ),
+                    ),
+                )
     # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
     # for a full example execution of the genetic algorithm.
     # The following block is examplified in section 6.
-    comm.Gather(
-        sendbuf=generation_results_batch,
-        recvbuf=generation_results,
-    )
+    if selection == "decentralized":
+        comm.Allgather(
+            sendbuf=generation_results_batch,
+            recvbuf=generation_results,
+        )
+    else:
+        comm.Gather(
+            sendbuf=generation_results_batch,
+            recvbuf=generation_results,
+        )
 
 
 def compute_save_points(
@@ -80,9 +110,19 @@ def compute_save_points(
     save_interval: An[int, ge(0)],
     *,
     save_first_gen: bool,
+    world_comm: MPI.Comm | None = None,
 ) -> tuple[int, list[int]]:  # largest_prev_num_gens, save_points
     """Compute generations at which to save the state.
 
+    States saved in the former format are converted beforehand (see
+    :func:`.convert_states`).
+
+    With islands, each island only finds the save points of its own
+    directory, which may differ between islands after a failure (e.g.
+    during an asynchronous save). All islands then resume from the
+    latest generation saved by every island, so that they run the same
+    generations (& thus the same collectives).
+
     Args:
         output_dir: See :paramref:`~.BaseSubtaskConfig.output_dir`.
         total_num_gens: See
@@ -91,12 +131,26 @@ def compute_save_points(
             :paramref:`~.NeuroevolutionSubtaskConfig.save_interval`.
         save_first_gen: See
             :paramref:`~.NeuroevolutionSubtaskConfig.save_first_gen`.
+        world_comm: See :attr:`~.IslandModel.world_comm`, ``None`` if
+            not running islands. Collective over it if not ``None``.
 
     Returns:
         The largest previous number of generations and
             a list of generations at which to save the state.
     """
+    convert_states(output_dir=output_dir)
     existing_save_points = find_existing_save_points(output_dir=output_dir)
+    if world_comm is not None:
+        existing_save_points = list(
+            set.intersection(
+                *(
+                    set(save_points)
+                    for save_points in world_comm.allgather(
+                        sendobj=existing_save_points,
+                    )
+                ),
+            ),
+        )
     largest_prev_num_gens = max(existing_save_points, default=0)
     # If `save_interval` is 0, only the last generation is saved.
     real_save_interval = (
@@ -114,13 +168,59 @@ def compute_save_points(
     return largest_prev_num_gens, save_points
 
 
-def compute_start_time_and_seeds(
+def compute_genealogy(
+    exchange_and_mutate_info: Exchange_and_mutate_info_type | None,
+    seeds: Seeds_type | None,
+    curr_gen: An[int, ge(1)],
+) -> Genealogy_type | None:
+    """Computes where the current generation's agents come from.
+
+    Args:
+        exchange_and_mutate_info: See
+            :paramref:`~.update_exchange_and_mutate_info.exchange_and_mutate_info`.
+        seeds: See :paramref:`~.update_exchange_and_mutate_info.seeds`.
+        curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+    Returns:
+        For each agent, the position of the agent it was mutated from
+            during the previous generation (its own position unless it
+            was replaced during the exchange) and its mutation seed.
+            ``None`` if ``rank != 0``.
+    """
+    _, rank, _ = get_mpi_variables()
+    if rank != 0:
+        return None
+    # `exchange_and_mutate_info` and `seeds` are only `None` when
+    # `rank != 0`. The following `assert` statements are for static
+    # type checking reasons and have no execution purposes.
+    assert exchange_and_mutate_info is not None  # noqa: S101
+    assert seeds is not None  # noqa: S101
+    positions = np.broadcast_to(
+        np.arange(len(seeds), dtype=np.uint32)[:, None],
+        seeds.shape,
+    )
+    parent_positions = (
+        positions
+        if curr_gen == 1
+        # Non-selected agents (not sending) are replaced.
+        else np.where(
+            exchange_and_mutate_info[:, :, 2] == 1,
+            positions,
+            exchange_and_mutate_info[:, :, 1],
+        )
+    )
+    return np.stack([parent_positions, seeds], axis=-1)
+
+
+def compute_start_time_and_seeds(  # noqa: PLR0913
     generation_results: Generation_results_type | None,
     curr_gen: An[int, ge(1)],
     num_pops: An[int, ge(1)],
     pop_size: An[int, ge(1)],
+    selection: An[str, one_of("centralized", "decentralized")],
     *,
     pop_merge: bool,
+    island_idx: An[int, ge(0)] | None = None,
 ) -> tuple[float | None, Seeds_type | None]:  # start_time, seeds
     """Compute the start time and seeds for the current generation.
 
@@ -134,16 +234,23 @@ def compute_start_time_and_seeds(
         curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
         num_pops: See :meth:`~.BaseSpace.num_pops`.
         pop_size: Total number of agent per population.
+        selection: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.selection`.
         pop_merge: See
             :paramref:`~.NeuroevolutionSubtaskConfig.pop_merge`.
+        island_idx: See :attr:`~.IslandModel.idx`, ``None`` if not
+            running islands. Islands draw different seeds.
 
     Returns:
         The start time for the current generation,
             :paramref:`~.update_exchange_and_mutate_info.seeds`.
     """
     comm, rank, size = get_mpi_variables()
-    np.random.seed(seed=curr_gen)
-    if rank != 0:
+    np.random.seed(
+        seed=curr_gen if island_idx is None else [curr_gen, island_idx],
+    )
+    # With decentralized selection, every process draws the same seeds.
+    if rank != 0 and selection == "centralized":
         return None, None
     start_time = time.time()
     # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
@@ -184,11 +291,59 @@ def compute_start_time_and_seeds(
     return start_time, seeds
 
 
-def compute_total_num_env_steps_and_process_fitnesses(
+def compute_selection_cutoff(
+    generation_results: Generation_results_type | None,
+    curr_gen: An[int, ge(1)],
+    pop_size: An[int, ge(1)],
+    selection: An[str, one_of("centralized", "decentralized")],
+    *,
+    early_stopping: bool,
+) -> float | None:  # selection_cutoff
+    """Computes the previous generation's selection cutoff.
+
+    The cutoff is the lowest fitness of the agents selected at the end
+    of the previous generation (see
+    :func:`compute_start_time_and_seeds`), which evaluations can be
+    terminated early against (see
+    :meth:`~.BaseReinforcementSpace.terminates_early`).
+
+    Args:
+        generation_results: See
+            :paramref:`~compute_generation_results.generation_results`.
+        curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+        pop_size: See
+            :paramref:`~compute_start_time_and_seeds.pop_size`.
+        selection: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.selection`.
+        early_stopping: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.early_stopping`.
+
+    Returns:
+        The selection cutoff of the first population, ``None`` during
+            the first generation or if :paramref:`early_stopping` is
+            ``False``.
+    """
+    if not early_stopping or curr_gen == 1:
+        return None
+    comm, _, _ = get_mpi_variables()
+    selection_cutoff = (
+        float(np.sort(generation_results[:, 0, 0])[pop_size // 2])
+        if generation_results is not None
+        else None
+    )
+    # With decentralized selection, every process computes the cutoff.
+    if selection == "centralized":
+        selection_cutoff = comm.bcast(obj=selection_cutoff)
+    return selection_cutoff
+
+
+def compute_total_num_env_steps_and_process_fitnesses(  # noqa: PLR0913
     generation_results: Generation_results_type | None,
     total_num_env_steps: An[int, ge(0)] | None,
     curr_gen: An[int, ge(1)],
     start_time: float | None,
+    num_saved_env_steps: An[int, ge(0)] | None = None,
+    log_buffer: list[tuple[float | None, int]] | None = None,
     *,
     pop_merge: bool,
 ) -> An[int, ge(0)] | None:  # total_num_env_steps
@@ -203,22 +358,32 @@ def compute_total_num_env_steps_and_process_fitnesses(
             (secondary processes set this to ``None``).
         curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
         start_time: Generation start time.
+        num_saved_env_steps: The maximum number of environment steps
+            spared by the early termination of the evaluations
+            performed by this process (see
+            :attr:`~.BaseAgent.curr_eval_num_saved_steps`), ``None`` if
+            :paramref:`~.NeuroevolutionSubtaskConfig.early_stopping`
+            is ``False``.
+        log_buffer: See :attr:`~.BaseSpace.log_buffer`, reduced &
+            logged alongside the generation results (see
+            :func:`.reduce_logs`). ``None`` if
+            :paramref:`~.NeuroevolutionSubtaskConfig.logging` is
+            ``False``.
         pop_merge: See
             :paramref:`~.NeuroevolutionSubtaskConfig.pop_merge`.
 
     Returns:
         The updated total number of environment steps.
     """
-    _, rank, _ = get_mpi_variables()
-    if rank != 0:
+    comm, rank, _ = get_mpi_variables()
+    if num_saved_env_steps is not None:
+        num_saved_env_steps = comm.reduce(sendobj=num_saved_env_steps)
+    if log_buffer is not None:
+        reduce_logs(log_buffer=log_buffer)
+    # `generation_results` is only `None` when `rank != 0` and
+    # selection is centralized.
+    if generation_results is None:
         return None
-    # `generation_results`, `total_num_env_steps` & `start_time` are
-    # only `None` when `rank != 0`. The following `assert` statements
-    # are for static type checking reasons and have no execution
-    # purposes.
-    assert generation_results is not None  # noqa: S101
-    assert total_num_env_steps is not None  # noqa: S101
-    assert start_time is not None  # noqa: S101
     fitnesses = generation_results[:, :, 0]
     if pop_merge:
         # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
@@ -226,6 +391,13 @@ def compute_total_num_env_steps_and_process_fitnesses(
         # The following block is examplified in section 7.
         fitnesses[:, 0] += fitnesses[:, 1][::-1]
         fitnesses[:, 1] = fitnesses[:, 0][::-1]
+    if rank != 0:
+        return None
+    # `total_num_env_steps` & `start_time` are only `None` when
+    # `rank != 0`. The following `assert` statements are for static
+    # type checking reasons and have no execution purposes.
+    assert total_num_env_steps is not None  # noqa: S101
+    assert start_time is not None  # noqa: S101
     num_env_steps = generation_results[:, :, 1]
     total_num_env_steps += int(num_env_steps.sum())
     elapsed_time = time.time() - start_time
@@ -233,8 +405,14 @@ def compute_total_num_env_steps_and_process_fitnesses(
     fitnesses_max = fitnesses.max(axis=0)
     log.info(f"{curr_gen}: {elapsed_time}")
     log.info(f"{fitnesses_mean}\n{fitnesses_max}\n")
-    wandb.log(
-        {
+    if num_saved_env_steps is not None:
+        log.info(f"Saved at most {num_saved_env_steps} environment steps.")
+        log_metrics(
+            data={"num_saved_env_steps": num_saved_env_steps},
+            commit=False,
+        )
+    log_metrics(
+        data={
             "gen": curr_gen,
             "fitnesses_mean": fitnesses_mean,
             "fitnesses_max": fitnesses_max,
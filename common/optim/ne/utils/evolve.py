@@ -11,19 +11,51 @@ from mpi4py import MPI
 
 from common.optim.ne.agent import BaseAgent
 from common.optim.ne.space.base import BaseSpace
+from common.optim.ne.utils.noise import NoiseTable
+from common.optim.ne.utils.race import Racer
+from common.optim.ne.utils.schedule import WorkStealingScheduler
+from common.optim.ne.utils.thread import EvaluationThreadPool
 from common.optim.ne.utils.type import (
     Exchange_and_mutate_info_batch_type,
     Fitnesses_and_num_env_steps_batch_type,
 )
-from common.utils.beartype import ge
+from common.utils.beartype import ge, one_of
 from common.utils.misc import seed_all
 from common.utils.mpi4py import get_mpi_variables
 
 
+def mutate_agent(
+    agent: BaseAgent,
+    seed: int,
+    noise_table: NoiseTable | None,
+) -> None:
+    """Mutates :paramref:`agent` given a mutation seed.
+
+    Args:
+        agent: The agent to mutate.
+        seed: The mutation seed (see
+            :paramref:`~.update_exchange_and_mutate_info.seeds`).
+        noise_table: The :class:`.NoiseTable` to draw the mutation
+            from, or ``None`` to seed the agent's
+            :attr:`~.BaseAgent.generator` and call
+            :meth:`~.BaseAgent.mutate`.
+    """
+    agent.generator.manual_seed(seed)
+    if noise_table is None:
+        agent.mutate()
+        return
+    agent.mutate_with_noise(
+        noise=noise_table.get(seed=seed, num_params=agent.num_params),
+    )
+
+
 def mutate(
     agents_batch: list[list[BaseAgent]],
     exchange_and_mutate_info_batch: Exchange_and_mutate_info_batch_type,
     num_pops: int,
+    noise_table: NoiseTable | None = None,
+    *,
+    record_lineage: bool,
 ) -> None:
     """Mutate :paramref:`agents_batch`.
 
@@ -34,21 +66,36 @@ def mutate(
             :paramref:`~.update_exchange_and_mutate_info.exchange_and_mutate_info`
             maintained by this process.
         num_pops: See :meth:`~.BaseSpace.num_pops`.
+        noise_table: See :paramref:`~.mutate_agent.noise_table`.
+        record_lineage: Whether to append the mutation seeds to the
+            agents' :attr:`~.BaseAgent.lineage`.
     """
     seeds = exchange_and_mutate_info_batch[:, :, 3]
     for i in range(len(agents_batch)):
         for j in range(num_pops):
-            seed_all(seed=seeds[i, j])
             # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
             # for a full example execution of the genetic algorithm.
             # The following block is examplified in section 4 & 16.
-            agents_batch[i][j].mutate()
+            mutate_agent(
+                agent=agents_batch[i][j],
+                seed=int(seeds[i, j]),
+                noise_table=noise_table,
+            )
+            if record_lineage:
+                agents_batch[i][j].lineage.append(int(seeds[i, j]))
 
 
-def evaluate_on_cpu(
+def evaluate_on_cpu(  # noqa: PLR0913
     agents_batch: list[list[BaseAgent]],
     space: BaseSpace,
     curr_gen: An[int, ge(1)],
+    eval_mode: An[
+        str,
+        one_of("serial", "batched", "threaded", "balanced"),
+    ] = "serial",
+    thread_pool: EvaluationThreadPool | None = None,
+    scheduler: WorkStealingScheduler | None = None,
+    racer: Racer | None = None,
 ) -> (
     Fitnesses_and_num_env_steps_batch_type  # fitnesses_and_num_env_steps_batch
 ):
@@ -60,6 +107,15 @@ def evaluate_on_cpu(
         space: The :class:`.BaseSpace` instance used throughout the
             execution.
         curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+        eval_mode: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.eval_mode`.
+        thread_pool: The :class:`.EvaluationThreadPool` to evaluate
+            agents with when :paramref:`eval_mode` is ``"threaded"``.
+        scheduler: The :class:`.WorkStealingScheduler` to evaluate
+            agents with when :paramref:`eval_mode` is ``"balanced"``.
+        racer: The :class:`.Racer` to evaluate agents with when
+            :paramref:`~.NeuroevolutionSubtaskConfig.racing` is
+            ``True`` (only with :paramref:`eval_mode` = ``"serial"``).
 
     Returns:
         The output of agent evaluation performed by the process calling
@@ -72,6 +128,32 @@ def evaluate_on_cpu(
         dtype=np.float32,
     )
     seed_all(seed=curr_gen)
+    if racer is not None:
+        return racer.evaluate(agents_batch=agents_batch, curr_gen=curr_gen)
+    if eval_mode == "batched":
+        fitnesses_and_num_env_steps_batch[:] = space.evaluate_batch(
+            agents_batch=agents_batch,
+            curr_gen=curr_gen,
+        )
+        return fitnesses_and_num_env_steps_batch
+    if eval_mode in ("threaded", "balanced"):
+        evaluator = thread_pool if eval_mode == "threaded" else scheduler
+        # `thread_pool` (resp. `scheduler`) is only `None` when
+        # `eval_mode != "threaded"` (resp. `"balanced"`). The following
+        # `assert` statement is for static type checking reasons and
+        # has no execution purposes.
+        assert evaluator is not None  # noqa: S101
+        for i, (fitnesses_and_num_env_steps, logged_score) in enumerate(
+            evaluator.evaluate(agents_batch=agents_batch, curr_gen=curr_gen),
+        ):
+            fitnesses_and_num_env_steps_batch[i] = fitnesses_and_num_env_steps
+            # Evaluations do not log, see `EvaluationThreadPool` &
+            # `WorkStealingScheduler`.
+            if space.config.logging:
+                space.log_buffer.append(
+                    (logged_score, agents_batch[i][0].total_num_steps),
+                )
+        return fitnesses_and_num_env_steps_batch
     # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
     # for a full example execution of the genetic algorithm.
     # The following block is examplified in section 5.
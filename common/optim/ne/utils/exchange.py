@@ -1,27 +1,43 @@
 """Process agent exchange for Neuroevolution fitting."""
 
+import copy
+import logging
+from collections import defaultdict, deque
 from typing import Annotated as An
+from typing import Any
 
 import numpy as np
+import torch
+from jaxtyping import Float32, Float64
 from mpi4py import MPI
+from torch import Tensor
 
 from common.optim.ne.agent import BaseAgent
+from common.optim.ne.utils.evolve import mutate_agent
+from common.optim.ne.utils.noise import NoiseTable
+from common.optim.ne.utils.shared import SharedAgentBuffers
 from common.optim.ne.utils.type import (
     Exchange_and_mutate_info_batch_type,
     Exchange_and_mutate_info_type,
     Generation_results_type,
+    Lineage_bases_type,
     Seeds_type,
 )
-from common.utils.beartype import ge, le
+from common.optim.ne.utils.wandb import log_metrics
+from common.utils.beartype import ge, le, one_of
 from common.utils.mpi4py import get_mpi_variables
 
+log = logging.getLogger(__name__)
 
-def update_exchange_and_mutate_info(
+
+def update_exchange_and_mutate_info(  # noqa: PLR0913
     num_pops: An[int, ge(1), le(2)],
     pop_size: An[int, ge(1)],
     exchange_and_mutate_info: Exchange_and_mutate_info_type | None,
     generation_results: Generation_results_type | None,
     seeds: Seeds_type | None,
+    pairing: An[str, one_of("ranked", "local")],
+    tasks_per_node: An[int, ge(1)],
 ) -> None:
     """Update the exchange and mutate information.
 
@@ -39,26 +55,31 @@ def update_exchange_and_mutate_info(
             :paramref:`~.compute_start_time_and_seeds.pop_size`.
         exchange_and_mutate_info: An array maintained only by
             the primary process (secondary processes set this to
-            ``None``) containing information for all processes on
-            how to exchange and mutate agents. Precisions on the 3rd
-            dimension: 0) The size of the agent when serialized, 1)
-            The position of the agent paired for with the current
-            agent, 2) Whether to send or receive the agent, 3) The
-            seed to randomize the mutation and evaluation of the
-            agent.
+            ``None``, unless
+            :paramref:`~.NeuroevolutionSubtaskConfig.selection` is
+            ``"decentralized"``) containing information for all
+            processes on how to exchange and mutate agents.
+            Precisions on the 3rd dimension: 0) The size of the agent
+            when serialized, 1) The position of the agent paired for
+            with the current agent, 2) Whether to send or receive the
+            agent, 3) The seed to randomize the mutation and
+            evaluation of the agent.
         generation_results: See
             :paramref:`~.compute_generation_results.generation_results`.
         seeds: The seeds to set the mutation and evaluation randomness
             for the current generation.
+        pairing: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.pairing`.
+        tasks_per_node: See return value of
+            :func:`~.utils.mpi4py.get_node_size`.
     """
-    _, rank, _ = get_mpi_variables()
-    if rank != 0:
+    _, rank, size = get_mpi_variables()
+    # `exchange_and_mutate_info`, `generation_results`, and `seeds` are
+    # only `None` when `rank != 0` and selection is centralized.
+    if exchange_and_mutate_info is None:
         return
-    # `exchange_and_mutate_info`, `generation_results`, and `seeds`are
-    # only `None` when `rank != 0`. The following `assert` statements
-    # are for static type checking reasons and have no execution
-    # purposes.
-    assert exchange_and_mutate_info is not None  # noqa: S101
+    # The following `assert` statements are for static type checking
+    # reasons and have no execution purposes.
     assert generation_results is not None  # noqa: S101
     assert seeds is not None  # noqa: S101
     serialized_agent_sizes = generation_results[:, :, 2]
@@ -68,27 +89,25 @@ def update_exchange_and_mutate_info(
     # The following block is examplified in section 10.
     fitnesses_sorting_indices = fitnesses.argsort(axis=0)
     fitnesses_index_ranking = fitnesses_sorting_indices.argsort(axis=0)
+    len_agents_batch = pop_size // size
+    agents_per_node = len_agents_batch * tasks_per_node
     # 0) MPI buffer size
     exchange_and_mutate_info[:, :, 0] = np.max(serialized_agent_sizes)
     for j in range(num_pops):
         # Each selected/non-selected agent is paired with a
-        # corresponding non-selected/selected agent. Both agents are
-        # placed in the same position in the ranking sub-leaderboard of
-        # selected and non-selected agents.
+        # corresponding non-selected/selected agent.
         # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
         # for a full example execution of the genetic algorithm.
         # The following block is examplified in section 12.
         # (Section 11 is performed in
         # :func:`.compute_start_time_and_seeds`)
-        paired_agent_ranking = (
-            fitnesses_index_ranking[:, j] + pop_size // 2
-        ) % pop_size
-        paired_agent_position = fitnesses_sorting_indices[
-            :,
-            j,
-        ][paired_agent_ranking]
         # 1) Agent pair position
-        exchange_and_mutate_info[:, j, 1] = paired_agent_position
+        exchange_and_mutate_info[:, j, 1] = pair_agents(
+            fitnesses_sorting_indices=fitnesses_sorting_indices[:, j],
+            pairing=pairing,
+            len_agents_batch=len_agents_batch,
+            agents_per_node=agents_per_node,
+        )
     # 2) Sending (1 means sending, 0 means receiving)
     exchange_and_mutate_info[:, :, 2] = np.greater_equal(
         fitnesses_index_ranking,
@@ -96,16 +115,375 @@ def update_exchange_and_mutate_info(
     )  # Also section 12 (send)
     # 3) Seeds to set randomness for mutation & evaluation.
     exchange_and_mutate_info[:, :, 3] = seeds
+    if rank == 0:
+        log_traffic(
+            traffic_matrix=compute_traffic_matrix(
+                exchange_and_mutate_info=exchange_and_mutate_info,
+                len_agents_batch=len_agents_batch,
+            ),
+            tasks_per_node=tasks_per_node,
+        )
+
+
+def pair_agents(
+    fitnesses_sorting_indices: np.ndarray[Any, Any],
+    pairing: An[str, one_of("ranked", "local")],
+    len_agents_batch: An[int, ge(1)],
+    agents_per_node: An[int, ge(1)],
+) -> np.ndarray[Any, Any]:
+    """Pairs each selected agent with a non-selected agent.
+
+    Both pairings keep 50% truncation selection: every selected agent
+    (top half of the population) replaces exactly one non-selected
+    agent (bottom half). They only differ in which non-selected agent
+    each selected agent replaces.
+
+    Args:
+        fitnesses_sorting_indices: The positions of a population's
+            agents sorted by increasing fitness.
+        pairing: ``"ranked"`` pairs agents found in the same position
+            of the ranking sub-leaderboards of selected and
+            non-selected agents, regardless of which process maintains
+            them. ``"local"`` first pairs agents maintained by the same
+            process (which exchange them without MPI communication),
+            then agents maintained by processes of the same node and
+            finally the remaining agents, each time in the order of
+            the ranking sub-leaderboards.
+        len_agents_batch: See
+            :paramref:`~.initialize_agents.len_agents_batch`.
+        agents_per_node: Number of agents maintained by the processes
+            of a node.
+
+    Returns:
+        The position of the agent paired with each agent of the
+            population.
+    """
+    pop_size = len(fitnesses_sorting_indices)
+    non_selected = fitnesses_sorting_indices[: pop_size // 2].tolist()
+    selected = fitnesses_sorting_indices[pop_size // 2 :].tolist()
+    paired_agent_position = np.empty(pop_size, dtype=np.uint32)
+    group_sizes = (
+        [pop_size]
+        if pairing == "ranked"
+        else [len_agents_batch, agents_per_node, pop_size]
+    )
+    for group_size in group_sizes:
+        # Selected agents of each process/node/population yet to be
+        # paired, in the order of the ranking sub-leaderboard.
+        groups: dict[int, deque[int]] = defaultdict(deque)
+        for position in selected:
+            groups[position // group_size].append(position)
+        unpaired_non_selected = []
+        for position in non_selected:
+            group = groups[position // group_size]
+            if not group:
+                unpaired_non_selected.append(position)
+                continue
+            paired_position = group.popleft()
+            paired_agent_position[position] = paired_position
+            paired_agent_position[paired_position] = position
+        unpaired_selected = {
+            position for group in groups.values() for position in group
+        }
+        selected = [
+            position for position in selected if position in unpaired_selected
+        ]
+        non_selected = unpaired_non_selected
+    return paired_agent_position
+
+
+def compute_traffic_matrix(
+    exchange_and_mutate_info: Exchange_and_mutate_info_type,
+    len_agents_batch: An[int, ge(1)],
+) -> np.ndarray[Any, Any]:
+    """Counts the agents each process sends to each process.
+
+    Args:
+        exchange_and_mutate_info: See
+            :paramref:`~.update_exchange_and_mutate_info.exchange_and_mutate_info`.
+        len_agents_batch: See
+            :paramref:`~.initialize_agents.len_agents_batch`.
+
+    Returns:
+        A ``size`` x ``size`` array whose element ``[i, k]`` is the
+            number of agents sent by process ``i`` to process ``k``
+            (summed over populations).
+    """
+    _, _, size = get_mpi_variables()
+    sending = exchange_and_mutate_info[:, :, 2] == 1
+    src = np.nonzero(sending)[0] // len_agents_batch
+    dest = exchange_and_mutate_info[:, :, 1][sending] // len_agents_batch
+    traffic_matrix = np.zeros(shape=(size, size), dtype=np.int64)
+    np.add.at(traffic_matrix, (src, dest), 1)
+    return traffic_matrix
+
+
+def log_traffic(
+    traffic_matrix: np.ndarray[Any, Any],
+    tasks_per_node: An[int, ge(1)],
+) -> None:
+    """Logs the number of agents exchanged within/across nodes.
+
+    Args:
+        traffic_matrix: See return value of
+            :func:`compute_traffic_matrix`.
+        tasks_per_node: Number of processes per node.
+    """
+    node_ids = np.arange(len(traffic_matrix)) // tasks_per_node
+    same_node = node_ids[:, None] == node_ids[None, :]
+    num_same_process = int(np.trace(traffic_matrix))
+    num_same_node = int(traffic_matrix[same_node].sum()) - num_same_process
+    num_remote = int(traffic_matrix[~same_node].sum())
+    log.info(
+        f"exchanges (same process/same node/remote): {num_same_process}"
+        f"/{num_same_node}/{num_remote}",
+    )
+    log.debug(f"traffic matrix:\n{traffic_matrix}")
+    # Committed along with the generation's other metrics in
+    # :func:`.compute_total_num_env_steps_and_process_fitnesses`.
+    log_metrics(
+        data={
+            "num_same_process_exchanges": num_same_process,
+            "num_same_node_exchanges": num_same_node,
+            "num_remote_exchanges": num_remote,
+        },
+        commit=False,
+    )
+
+
+def scatter(
+    sendbuf: np.ndarray[Any, Any] | None,
+    recvbuf: np.ndarray[Any, Any],
+    selection: An[str, one_of("centralized", "decentralized")],
+) -> None:
+    """Hands each process its share of a population-wide array.
+
+    Args:
+        sendbuf: The population-wide array, maintained by the primary
+            process only (secondary processes set this to ``None``)
+            unless :paramref:`selection` is ``"decentralized"``.
+        recvbuf: The process' share of :paramref:`sendbuf`.
+        selection: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.selection`.
+    """
+    comm, rank, _ = get_mpi_variables()
+    if selection == "centralized":
+        comm.Scatter(sendbuf=sendbuf, recvbuf=recvbuf)
+        return
+    # `sendbuf` is never `None` with decentralized selection. The
+    # following `assert` statement is for static type checking reasons
+    # and has no execution purposes.
+    assert sendbuf is not None  # noqa: S101
+    recvbuf[:] = sendbuf[rank * len(recvbuf) : (rank + 1) * len(recvbuf)]
+
+
+def pack_agent(
+    agent: BaseAgent,
+    exchange: An[str, one_of("agent", "lineage")],
+) -> BaseAgent | tuple[int, list[int], dict[str, Any]]:
+    """Returns the object to send in place of :paramref:`agent`.
+
+    Args:
+        agent: The agent to send.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+
+    Returns:
+        Either :paramref:`agent` itself or its lineage base, lineage
+            and non-parameter state.
+    """
+    if exchange == "agent":
+        return agent
+    return agent.lineage_base, agent.lineage, agent.get_state()
+
+
+def rebase_lineages(
+    agents_batch: list[list[BaseAgent]],
+    lineage_bases: list[Lineage_bases_type],
+) -> None:
+    """Gathers all agent parameters on all processes & resets lineages.
+
+    Args:
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        lineage_bases: One array per population, filled with the
+            parameters of all agents of that population at the time of
+            the rebase.
+    """
+    comm, rank, _ = get_mpi_variables()
+    len_agents_batch = len(agents_batch)
+    for j, pop_lineage_bases in enumerate(lineage_bases):
+        params_batch = np.stack(
+            [
+                agents_batch[i][j].get_params().numpy()
+                for i in range(len_agents_batch)
+            ],
+        )
+        comm.Allgather(sendbuf=params_batch, recvbuf=pop_lineage_bases)
+        for i in range(len_agents_batch):
+            agents_batch[i][j].lineage_base = len_agents_batch * rank + i
+            agents_batch[i][j].lineage = []
+
+
+def replay_lineage(
+    agent: BaseAgent,
+    lineage_base: An[int, ge(0)],
+    lineage: list[int],
+    pop_lineage_bases: Lineage_bases_type,
+    noise_table: NoiseTable | None,
+) -> None:
+    """Reproduces an agent's parameters from its lineage.
+
+    Args:
+        agent: The agent to overwrite the parameters of.
+        lineage_base: See :attr:`~.BaseAgent.lineage_base`.
+        lineage: See :attr:`~.BaseAgent.lineage`.
+        pop_lineage_bases: The element of
+            :paramref:`~.rebase_lineages.lineage_bases` corresponding to
+            :paramref:`agent`'s population.
+        noise_table: See :paramref:`~.mutate_agent.noise_table`.
+    """
+    agent.set_params(params=torch.from_numpy(pop_lineage_bases[lineage_base]))
+    for seed in lineage:
+        mutate_agent(agent=agent, seed=seed, noise_table=noise_table)
+    agent.lineage_base = lineage_base
+    agent.lineage = lineage
+
+
+def send_agent(
+    agent: BaseAgent,
+    dest: An[int, ge(0)],
+    tag: An[int, ge(0)],
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+) -> list[MPI.Request]:
+    """Sends (non-blocking) an agent to another process.
+
+    Args:
+        agent: The agent to send.
+        dest: The rank of the receiving process.
+        tag: The tag to match on the receiving process.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+
+    Returns:
+        The MPI request(s) created.
+    """
+    comm, _, _ = get_mpi_variables()
+    if exchange != "buffer":
+        return [
+            comm.isend(
+                obj=pack_agent(agent=agent, exchange=exchange),
+                dest=dest,
+                tag=tag,
+            ),
+        ]
+    # Parameters & non-parameter state are sent separately, under two
+    # distinct tags.
+    buffers = (agent.get_params().numpy(), agent.get_state_buffer())
+    return [
+        comm.Isend(buf=buffer, dest=dest, tag=2 * tag + k)
+        for k, buffer in enumerate(buffers)
+    ]
+
 
+def recv_agent(
+    agent: BaseAgent,
+    source: An[int, ge(0)],
+    tag: An[int, ge(0)],
+    mpi_buffer_size: An[int, ge(0)],
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+) -> tuple[
+    list[MPI.Request],  # req
+    tuple[Float32[Tensor, " num_params"], Float64[np.ndarray, " n"]] | None,
+]:
+    """Receives (non-blocking) an agent from another process.
 
-def exchange_agents(
+    Args:
+        agent: The agent to be replaced.
+        source: The rank of the sending process.
+        tag: See :paramref:`~send_agent.tag`.
+        mpi_buffer_size: The size of the largest serialized agent.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+
+    Returns:
+        The MPI request(s) created and, if :paramref:`exchange` is
+            ``"buffer"``, the parameter & state receive buffers.
+    """
+    comm, _, _ = get_mpi_variables()
+    if exchange != "buffer":
+        return [comm.irecv(buf=mpi_buffer_size, source=source, tag=tag)], None
+    # Parameters are directly received into the agent's parameters if
+    # `get_params` returns a view of them.
+    buffers = (
+        agent.get_params(),
+        np.empty_like(agent.get_state_buffer()),
+    )
+    req = [
+        comm.Irecv(buf=buffers[0].numpy(), source=source, tag=2 * tag),
+        comm.Irecv(buf=buffers[1], source=source, tag=2 * tag + 1),
+    ]
+    return req, buffers
+
+
+def copy_agent(
+    agent: BaseAgent,
+    paired_agent: BaseAgent,
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+) -> BaseAgent:
+    """Copies an agent maintained by the same process in memory.
+
+    In-memory counterpart of :func:`send_agent` & :func:`recv_agent`.
+
+    Args:
+        agent: The agent to be replaced.
+        paired_agent: The agent to copy.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+
+    Returns:
+        The agent to replace :paramref:`agent` with (either a copy of
+            :paramref:`paired_agent` or :paramref:`agent` overwritten).
+    """
+    if exchange == "agent":
+        return copy.deepcopy(paired_agent)
+    agent.set_params(params=paired_agent.get_params())
+    if exchange == "buffer":
+        agent.set_state_buffer(state_buffer=paired_agent.get_state_buffer())
+        return agent
+    agent.lineage_base = paired_agent.lineage_base
+    agent.lineage = paired_agent.lineage.copy()
+    agent.set_state(state=copy.deepcopy(paired_agent.get_state()))
+    return agent
+
+
+def exchange_agents(  # noqa: PLR0913
     num_pops: An[int, ge(1), le(2)],
     pop_size: An[int, ge(1)],
     agents_batch: list[list[BaseAgent]],
     exchange_and_mutate_info_batch: Exchange_and_mutate_info_batch_type,
-) -> None:
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+    lineage_bases: list[Lineage_bases_type] | None,
+    noise_table: NoiseTable | None = None,
+    shared_buffers: SharedAgentBuffers | None = None,
+    *,
+    wait: bool = True,
+) -> (
+    tuple[
+        list[MPI.Request],  # req
+        list[tuple[int, int]],  # req_positions
+        dict[tuple[int, int], Any],  # received
+    ]
+    | None
+):
     """Exchange agents between processes.
 
+    Agents paired with an agent maintained by the same process are
+    copied in memory and, if :paramref:`shared_buffers` is given,
+    agents paired with an agent maintained by another process of the
+    same node go through node-wide shared memory. Remaining exchanges
+    use point-to-point messaging.
+
     Args:
         num_pops: See :meth:`~.BaseSpace.num_pops`.
         pop_size: See
@@ -114,15 +492,119 @@ def exchange_agents(
             :paramref:`~.compute_generation_results.agents_batch`.
         exchange_and_mutate_info_batch: See
             :paramref:`~.mutate.exchange_and_mutate_info_batch`.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+        lineage_bases: See :paramref:`~.rebase_lineages.lineage_bases`
+            (``None`` when :paramref:`exchange` is not ``"lineage"``).
+        noise_table: See :paramref:`~.mutate_agent.noise_table`.
+        shared_buffers: The node-wide shared memory to exchange agents
+            through (only supported when :paramref:`exchange` is
+            ``"buffer"``).
+        wait: Whether to wait for the MPI requests & replace the
+            received agents. If ``False``, the caller is left to do so
+            (see :func:`.mutate_and_evaluate_pipelined`).
+
+    Returns:
+        ``None`` if :paramref:`wait` is ``True``, otherwise the first
+            three elements of the return value of
+            :func:`post_exchange`.
     """
-    comm, rank, _ = get_mpi_variables()
+    req, req_positions, received, intra_node_pairs = post_exchange(
+        num_pops=num_pops,
+        pop_size=pop_size,
+        agents_batch=agents_batch,
+        exchange_and_mutate_info_batch=exchange_and_mutate_info_batch,
+        exchange=exchange,
+        shared_buffers=shared_buffers,
+    )
+    # Intra-node exchanges are performed while the MPI requests are in
+    # flight.
+    exchange_intra_node(
+        agents_batch=agents_batch,
+        intra_node_pairs=intra_node_pairs,
+        exchange=exchange,
+        shared_buffers=shared_buffers,
+    )
+    if not wait:
+        return req, req_positions, received
+    # Wait for all MPI requests and retrieve a list composed of the
+    # agents (or their lineages) received from the other processes and
+    # `None` for the agents that were sent (and for all agents when
+    # `exchange == "buffer"`).
+    obj_or_none_list: list[Any] = MPI.Request.waitall(req)
+    for (i, j), obj_or_none in zip(
+        req_positions,
+        obj_or_none_list,
+        strict=True,
+    ):
+        if obj_or_none is not None:
+            received[i, j] = obj_or_none
+    for (i, j), received_agent in received.items():
+        replace_agent(
+            agents_batch=agents_batch,
+            i=i,
+            j=j,
+            received_agent=received_agent,
+            exchange=exchange,
+            lineage_bases=lineage_bases,
+            noise_table=noise_table,
+        )
+    return None
+
+
+def post_exchange(  # noqa: PLR0913
+    num_pops: An[int, ge(1), le(2)],
+    pop_size: An[int, ge(1)],
+    agents_batch: list[list[BaseAgent]],
+    exchange_and_mutate_info_batch: Exchange_and_mutate_info_batch_type,
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+    shared_buffers: SharedAgentBuffers | None,
+) -> tuple[
+    list[MPI.Request],  # req
+    list[tuple[int, int]],  # req_positions
+    dict[tuple[int, int], Any],  # received
+    list[tuple[tuple[int, int], int]],  # intra_node_pairs
+]:
+    """Posts the MPI requests of an exchange.
+
+    Args:
+        num_pops: See :meth:`~.BaseSpace.num_pops`.
+        pop_size: See
+            :paramref:`~.compute_start_time_and_seeds.pop_size`.
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        exchange_and_mutate_info_batch: See
+            :paramref:`~.mutate.exchange_and_mutate_info_batch`.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+        shared_buffers: See
+            :paramref:`~.exchange_agents.shared_buffers`.
+
+    Returns:
+        * The MPI requests created with the ``isend`` and ``irecv``
+          (or ``Isend`` and ``Irecv``) methods.
+        * The position (in :paramref:`agents_batch`) of the agent
+          each MPI request was created for.
+        * The receive buffers of the receiving agents (by position in
+          :paramref:`agents_batch`) when :paramref:`exchange` is
+          ``"buffer"``, to be completed with the received objects
+          otherwise (see :paramref:`~.replace_agent.received_agent`).
+        * See :paramref:`~.exchange_intra_node.intra_node_pairs`.
+    """
+    _, rank, _ = get_mpi_variables()
     mpi_buffer_size = exchange_and_mutate_info_batch[:, :, 0]
     paired_agent_position = exchange_and_mutate_info_batch[:, :, 1]
     sending = exchange_and_mutate_info_batch[:, :, 2]
     len_agents_batch = len(agents_batch)
-    # List to contain the `len_agents_batch` * `num_pops` number of
-    # MPI requests created with the `isend` and `irecv` methods.
+    if shared_buffers is not None:
+        shared_buffers.allocate(agents_batch=agents_batch)
     req: list[MPI.Request] = []
+    req_positions: list[tuple[int, int]] = []
+    received: dict[tuple[int, int], Any] = {}
+    # List to contain the receiving agent positions and the position of
+    # their paired agent when the latter is maintained by a process of
+    # the same node (including this one) and no MPI request is needed.
+    intra_node_pairs: list[tuple[tuple[int, int], int]] = []
     # Iterate over all agents in the batch.
     for i in range(len_agents_batch):
         for j in range(num_pops):
@@ -134,43 +616,143 @@ def exchange_agents(
             paired_process_rank = int(
                 paired_agent_position[i, j] // len_agents_batch,
             )
+            if paired_process_rank == rank or (
+                shared_buffers is not None
+                and shared_buffers.is_on_node(rank=paired_process_rank)
+            ):
+                if sending[i, j] == 0:  # 0 means receiving
+                    intra_node_pairs.append(
+                        ((i, j), int(paired_agent_position[i, j])),
+                    )
+                elif paired_process_rank != rank:
+                    # `shared_buffers` is never `None` here. The
+                    # following `assert` statement is for static type
+                    # checking reasons and has no execution purposes.
+                    assert shared_buffers is not None  # noqa: S101
+                    shared_buffers.write(agent=agents_batch[i][j], i=i, j=j)
+                continue
             if sending[i, j] == 1:  # 1 means sending
                 # Give a unique tag for this agent that the receiving
                 # process will be able to match.
                 tag = int(pop_size * j + len_agents_batch * rank + i)
                 # Send (non-blocking) the agent and append the MPI
-                # request.
+                # request(s).
                 # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
                 # for a full example execution of the genetic algorithm.
                 # The following block is examplified in section 15.
-                req.append(
-                    comm.isend(
-                        obj=agents_batch[i][j],
-                        dest=paired_process_rank,
-                        tag=tag,
-                    ),
+                agent_req = send_agent(
+                    agent=agents_batch[i][j],
+                    dest=paired_process_rank,
+                    tag=tag,
+                    exchange=exchange,
                 )
             else:  # not 1 (0) means receiving
                 # Give a unique tag for this agent that the sending
                 # process will be able to match.
                 tag = int(pop_size * j + paired_agent_position[i, j])
                 # Receive (non-blocking) the agent and append the MPI
-                # request.
+                # request(s).
                 # See https://github.com/MaximilienLC/ai_repo/blob/main/docs/genetic.pdf
                 # for a full example execution of the genetic algorithm.
                 # The following block is examplified in section 15.
-                req.append(
-                    comm.irecv(
-                        buf=mpi_buffer_size[i, j],
-                        source=paired_process_rank,
-                        tag=tag,
-                    ),
+                agent_req, buffers = recv_agent(
+                    agent=agents_batch[i][j],
+                    source=paired_process_rank,
+                    tag=tag,
+                    mpi_buffer_size=int(mpi_buffer_size[i, j]),
+                    exchange=exchange,
                 )
-    # Wait for all MPI requests and retrieve a list composed of the
-    # agents received from the other processes and `None` for the
-    # agents that were sent.
-    agent_or_none_list: list[BaseAgent | None] = MPI.Request.waitall(req)
-    # Replacing existing agents with the received agents.
-    for i, agent_or_none in enumerate(agent_or_none_list):
-        if agent_or_none:
-            agents_batch[i // num_pops][i % num_pops] = agent_or_none
+                if buffers is not None:
+                    received[i, j] = buffers
+            req += agent_req
+            req_positions += [(i, j)] * len(agent_req)
+    return req, req_positions, received, intra_node_pairs
+
+
+def exchange_intra_node(
+    agents_batch: list[list[BaseAgent]],
+    intra_node_pairs: list[tuple[tuple[int, int], int]],
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+    shared_buffers: SharedAgentBuffers | None,
+) -> None:
+    """Replaces the agents paired with an agent of the same node.
+
+    Args:
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        intra_node_pairs: The positions (in :paramref:`agents_batch`)
+            of the receiving agents paired with an agent maintained by
+            a process of the same node, along with the position (in
+            the population) of the latter.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+        shared_buffers: See
+            :paramref:`~.exchange_agents.shared_buffers`.
+    """
+    _, rank, _ = get_mpi_variables()
+    len_agents_batch = len(agents_batch)
+    if shared_buffers is not None:
+        shared_buffers.sync()
+    for (i, j), position in intra_node_pairs:
+        if position // len_agents_batch == rank:
+            agents_batch[i][j] = copy_agent(
+                agent=agents_batch[i][j],
+                paired_agent=agents_batch[position % len_agents_batch][j],
+                exchange=exchange,
+            )
+            continue
+        # `shared_buffers` is never `None` here. The following `assert`
+        # statement is for static type checking reasons and has no
+        # execution purposes.
+        assert shared_buffers is not None  # noqa: S101
+        shared_buffers.read(agent=agents_batch[i][j], position=position, j=j)
+
+
+def replace_agent(  # noqa: PLR0913
+    agents_batch: list[list[BaseAgent]],
+    i: An[int, ge(0)],
+    j: An[int, ge(0)],
+    received_agent: Any,  # noqa: ANN401
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+    lineage_bases: list[Lineage_bases_type] | None,
+    noise_table: NoiseTable | None,
+) -> None:
+    """Replaces an agent with the agent received in its place.
+
+    Args:
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        i: The agent's index in :paramref:`agents_batch`.
+        j: The agent's population index.
+        received_agent: The received agent, its lineage (see
+            :func:`pack_agent`) or its parameter & state buffers,
+            depending on :paramref:`exchange`.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+        lineage_bases: See :paramref:`~.rebase_lineages.lineage_bases`
+            (``None`` when :paramref:`exchange` is not ``"lineage"``).
+        noise_table: See :paramref:`~.mutate_agent.noise_table`.
+    """
+    if exchange == "buffer":
+        params, state_buffer = received_agent
+        agents_batch[i][j].set_params(params=params)
+        agents_batch[i][j].set_state_buffer(state_buffer=state_buffer)
+        return
+    if exchange == "agent":
+        # Replacing the existing agent with the received agent.
+        agents_batch[i][j] = received_agent
+        return
+    # `lineage_bases` is only `None` when `exchange != "lineage"`.
+    # The following `assert` statement is for static type checking
+    # reasons and has no execution purposes.
+    assert lineage_bases is not None  # noqa: S101
+    # Reproducing the sender agent in place of the existing agent.
+    lineage_base, lineage, state = received_agent
+    replay_lineage(
+        agent=agents_batch[i][j],
+        lineage_base=lineage_base,
+        lineage=lineage,
+        pop_lineage_bases=lineage_bases[j],
+        noise_table=noise_table,
+    )
+    agents_batch[i][j].set_state(state=state)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from .exchange import pair_agents
+
+
+@pytest.mark.parametrize(
+    ("fitnesses_sorting_indices", "pairing", "expected"),
+    [
+        ([0, 2, 4, 6, 7, 5, 3, 1], "ranked", [7, 6, 5, 4, 3, 2, 1, 0]),
+        ([0, 2, 4, 6, 7, 5, 3, 1], "local", [1, 0, 3, 2, 5, 4, 7, 6]),
+        ([0, 1, 4, 6, 2, 3, 5, 7], "local", [2, 3, 0, 1, 5, 4, 7, 6]),
+        ([0, 1, 2, 6, 3, 4, 5, 7], "ranked", [3, 4, 5, 0, 1, 2, 7, 6]),
+        ([0, 1, 2, 6, 3, 4, 5, 7], "local", [4, 5, 3, 2, 0, 1, 7, 6]),
+    ],
+)
+def test_pair_agents(
+    fitnesses_sorting_indices: list[int],
+    pairing: str,
+    expected: list[int],
+) -> None:
+    # 4 processes of 2 agents, 2 nodes of 2 processes.
+    paired_agent_position = pair_agents(
+        fitnesses_sorting_indices=np.array(fitnesses_sorting_indices),
+        pairing=pairing,
+        len_agents_batch=2,
+        agents_per_node=4,
+    )
+    assert paired_agent_position.tolist() == expected
+
+
+@pytest.mark.parametrize("pairing", ["ranked", "local"])
+def test_pair_agents_truncation_selection(pairing: str) -> None:
+    rng = np.random.default_rng(seed=0)
+    for _ in range(100):
+        fitnesses_sorting_indices = rng.permutation(24)
+        paired_agent_position = pair_agents(
+            fitnesses_sorting_indices=fitnesses_sorting_indices,
+            pairing=pairing,
+            len_agents_batch=3,
+            agents_per_node=6,
+        )
+        positions = np.arange(24)
+        assert np.array_equal(
+            paired_agent_position[paired_agent_position],
+            positions,
+        )
+        selected = np.isin(positions, fitnesses_sorting_indices[12:])
+        assert np.array_equal(selected[paired_agent_position], ~selected)
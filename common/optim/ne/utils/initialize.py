@@ -12,10 +12,11 @@ from common.optim.ne.utils.type import (
     Exchange_and_mutate_info_type,
     Generation_results_batch_type,
     Generation_results_type,
+    Lineage_bases_type,
     Seeds_batch_type,
 )
 from common.optim.utils.hydra import get_launcher_config
-from common.utils.beartype import ge, le
+from common.utils.beartype import ge, le, one_of
 from common.utils.misc import seed_all
 from common.utils.mpi4py import get_mpi_variables
 
@@ -23,6 +24,7 @@ from common.utils.mpi4py import get_mpi_variables
 def initialize_common_variables(
     agents_per_task: An[int, ge(1)],
     num_pops: An[int, ge(1), le(2)],
+    selection: An[str, one_of("centralized", "decentralized")],
 ) -> tuple[
     An[int, ge(1)],  # pop_size
     An[int, ge(1)],  # len_agents_batch
@@ -39,6 +41,8 @@ def initialize_common_variables(
         agents_per_task: See
             :paramref:`~.NeuroevolutionSubtaskConfig.agents_per_task`.
         num_pops: See :meth:`~.BaseSpace.num_pops`.
+        selection: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.selection`.
 
     Returns:
         :paramref:`~.compute_start_time_and_seeds.pop_size`,
@@ -53,16 +57,16 @@ def initialize_common_variables(
             :paramref:`~.compute_total_num_env_steps_and_process_fitnesses.total_num_env_steps`.
     """
     comm, rank, size = get_mpi_variables()
-    launcher_config = get_launcher_config()
-    pop_size = (
-        launcher_config.nodes
-        * launcher_config.tasks_per_node
-        * agents_per_task
-    )
+    # `size` is `num_nodes * tasks_per_node` (divided by the number of
+    # islands, see `NeuroevolutionSubtaskConfig.num_islands`).
+    pop_size = size * agents_per_task
     len_agents_batch = pop_size // size
+    # With decentralized selection, every process maintains the arrays
+    # otherwise only maintained by the primary process.
+    primary = rank == 0 or selection == "decentralized"
     exchange_and_mutate_info = (
         None
-        if rank != 0
+        if not primary
         else np.empty(
             shape=(pop_size, num_pops, 4),
             dtype=np.uint32,
@@ -82,7 +86,7 @@ def initialize_common_variables(
     )
     generation_results = (
         None
-        if rank != 0
+        if not primary
         else np.empty(
             shape=(pop_size, num_pops, 3),
             dtype=np.float32,
@@ -163,3 +167,27 @@ def initialize_agents(
             )
 
     return agents_batch
+
+
+def initialize_lineage_bases(
+    agents_batch: list[list[BaseAgent]],
+    pop_size: An[int, ge(1)],
+) -> list[Lineage_bases_type]:  # lineage_bases
+    """Allocates the arrays holding the agents' lineage bases.
+
+    Args:
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        pop_size: See
+            :paramref:`~.compute_start_time_and_seeds.pop_size`.
+
+    Returns:
+        See :paramref:`~.rebase_lineages.lineage_bases`.
+    """
+    return [
+        np.empty(
+            shape=(pop_size, agent.num_params),
+            dtype=np.float32,
+        )
+        for agent in agents_batch[0]
+    ]
@@ -0,0 +1,240 @@
+""":class:`.IslandModel`, :func:`.get_island_output_dir` & co."""
+
+import logging
+from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+from mpi4py import MPI
+
+from common.optim.ne.agent import BaseAgent
+from common.optim.ne.utils.type import Generation_results_type
+from common.utils.beartype import ge, one_of
+from common.utils.mpi4py import get_mpi_variables
+
+log = logging.getLogger(__name__)
+
+
+class IslandModel:
+    """Splits the MPI processes into islands.
+
+    Each island is a group of contiguous MPI processes that evolves its
+    own population (selection & exchanges only involve the processes of
+    the island) and, every :paramref:`migration_interval` generations,
+    sends copies of its :paramref:`num_migrants` fittest agents (per
+    population) to another island, where they replace the least fit
+    agents (see :func:`migrate_agents`).
+
+    Args:
+        num_islands: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.num_islands`.
+        migration_interval: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.migration_interval`.
+        num_migrants: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.num_migrants`.
+        migration_topology: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.migration_topology`.
+        agents_per_task: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.agents_per_task`.
+
+    Attributes:
+        world_comm (mpi4py.MPI.Comm): The communicator spanning all
+            islands.
+        comm (mpi4py.MPI.Comm): The communicator spanning the
+            island of the process.
+        idx (int): The index of the island of the process.
+        size (int): The number of processes per island.
+    """
+
+    def __init__(
+        self: "IslandModel",
+        num_islands: An[int, ge(2)],
+        migration_interval: An[int, ge(0)],
+        num_migrants: An[int, ge(1)],
+        migration_topology: An[str, one_of("ring", "random")],
+        agents_per_task: An[int, ge(1)],
+    ) -> None:
+        self.world_comm, world_rank, world_size = get_mpi_variables()
+        if world_size % num_islands:
+            error_msg = (
+                f"The number of MPI processes ({world_size}) must be a "
+                f"multiple of the number of islands ({num_islands})."
+            )
+            raise ValueError(error_msg)
+        self.size = world_size // num_islands
+        if num_migrants > self.size * agents_per_task // 2:
+            error_msg = (
+                f"The number of migrants ({num_migrants}) must not exceed "
+                "half of the population size of an island "
+                f"({self.size * agents_per_task})."
+            )
+            raise ValueError(error_msg)
+        self.num_islands = num_islands
+        self.migration_interval = migration_interval
+        self.num_migrants = num_migrants
+        self.migration_topology = migration_topology
+        self.idx = world_rank // self.size
+        self.comm = self.world_comm.Split(color=self.idx, key=world_rank)
+
+    def get_destinations(
+        self: "IslandModel",
+        curr_gen: An[int, ge(1)],
+    ) -> np.ndarray[Any, Any]:
+        """Returns the island each island sends its migrants to.
+
+        Every island receives migrants from exactly one other island.
+
+        Args:
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            The index of the destination island of each island.
+        """
+        order = (
+            np.arange(self.num_islands)
+            if self.migration_topology == "ring"
+            # Identical on all processes.
+            else np.random.default_rng(seed=curr_gen).permutation(
+                self.num_islands,
+            )
+        )
+        destinations = np.empty(shape=self.num_islands, dtype=int)
+        destinations[order] = np.roll(order, shift=-1)
+        return destinations
+
+
+def get_island_output_dir(output_dir: str, idx: An[int, ge(0)]) -> str:
+    """Returns the directory an island saves its states to.
+
+    Args:
+        output_dir: See :paramref:`~.BaseSubtaskConfig.output_dir`.
+        idx: See :attr:`~.IslandModel.idx`.
+
+    Returns:
+        The island's output directory.
+    """
+    return f"{output_dir}/islands/{idx}"
+
+
+def migrate_agents(
+    islands: IslandModel | None,
+    agents_batch: list[list[BaseAgent]],
+    generation_results: Generation_results_type | None,
+    curr_gen: An[int, ge(1)],
+) -> None:
+    """Migrates agents between islands if due this generation.
+
+    Each island's primary process ranks its population & shares
+    the positions of the fittest & least fit agents with the other
+    processes of all islands. Processes then send the migrants they
+    maintain to the processes maintaining the agents they replace,
+    in place of which they are inserted in
+    :paramref:`agents_batch`. The results of the migrants (as
+    computed in their original island) replace those of the agents
+    they replace in :paramref:`generation_results`, so that migrants
+    compete in the receiving island's next selection.
+
+    Args:
+        islands: The island model, ``None`` if not running islands.
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        generation_results: See
+            :paramref:`~.compute_generation_results.generation_results`.
+        curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+    """
+    if (
+        islands is None
+        or not islands.migration_interval
+        or curr_gen % islands.migration_interval
+    ):
+        return
+    comm, rank, _ = get_mpi_variables()
+    if rank == 0:
+        # `generation_results` is only `None` when `rank != 0`. The
+        # following `assert` statement is for static type checking
+        # reasons and has no execution purposes.
+        assert generation_results is not None  # noqa: S101
+        ranking = generation_results[:, :, 0].argsort(axis=0, kind="stable")
+        top_positions = ranking[: -islands.num_migrants - 1 : -1]
+        worst_positions = ranking[: islands.num_migrants]
+        top_results = np.take_along_axis(
+            generation_results,
+            top_positions[..., None],
+            axis=0,
+        )
+    migration_info = comm.bcast(
+        obj=(
+            (top_positions, top_results, worst_positions)
+            if rank == 0
+            else None
+        ),
+    )
+    # Indexed by island.
+    all_migration_info = islands.world_comm.allgather(
+        sendobj=migration_info,
+    )[:: islands.size]
+    destinations = islands.get_destinations(curr_gen=curr_gen)
+    dest_idx = int(destinations[islands.idx])
+    src_idx = int(np.flatnonzero(destinations == islands.idx)[0])
+    send_requests = send_migrants(
+        islands=islands,
+        agents_batch=agents_batch,
+        top_positions=migration_info[0],
+        worst_positions=all_migration_info[dest_idx][2],
+        dest_idx=dest_idx,
+    )
+    src_top_positions, src_top_results, _ = all_migration_info[src_idx]
+    worst_positions = migration_info[2]
+    len_agents_batch = len(agents_batch)
+    for k, j in np.ndindex(*worst_positions.shape):
+        position = worst_positions[k, j]
+        if position // len_agents_batch == rank:
+            agents_batch[position % len_agents_batch][j] = (
+                islands.world_comm.recv(
+                    source=src_idx * islands.size
+                    + src_top_positions[k, j] // len_agents_batch,
+                    tag=k * worst_positions.shape[1] + j,
+                )
+            )
+        if generation_results is not None:
+            generation_results[position, j] = src_top_results[k, j]
+    MPI.Request.waitall(send_requests)
+    if rank == 0:
+        log.info(f"Island {islands.idx} received migrants from {src_idx}.")
+
+
+def send_migrants(
+    islands: IslandModel,
+    agents_batch: list[list[BaseAgent]],
+    top_positions: np.ndarray[Any, Any],
+    worst_positions: np.ndarray[Any, Any],
+    dest_idx: An[int, ge(0)],
+) -> list[MPI.Request]:
+    """Sends the migrants maintained by this process without blocking.
+
+    Args:
+        islands: See :paramref:`migrate_agents.islands`.
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        top_positions: The positions of the island's fittest agents,
+            per migrant & population.
+        worst_positions: The positions of the destination island's
+            least fit agents, per migrant & population.
+        dest_idx: The index of the destination island.
+
+    Returns:
+        The send requests to wait on.
+    """
+    _, rank, _ = get_mpi_variables()
+    len_agents_batch = len(agents_batch)
+    return [
+        # Agents are pickled when the send is issued.
+        islands.world_comm.isend(
+            agents_batch[top_positions[k, j] % len_agents_batch][j],
+            dest=dest_idx * islands.size
+            + worst_positions[k, j] // len_agents_batch,
+            tag=k * top_positions.shape[1] + j,
+        )
+        for k, j in np.ndindex(*top_positions.shape)
+        if top_positions[k, j] // len_agents_batch == rank
+    ]
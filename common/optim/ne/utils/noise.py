@@ -0,0 +1,90 @@
+""":class:`.NoiseTable`."""
+
+from typing import Annotated as An
+
+import numpy as np
+import torch
+from jaxtyping import Float32
+from mpi4py import MPI
+from torch import Tensor
+
+from common.utils.beartype import ge
+from common.utils.mpi4py import get_mpi_variables
+
+
+class NoiseTable:
+    """Block of Gaussian noise shared by all processes of a node.
+
+    The table is generated once per node by the node's first process
+    into an MPI shared memory window that the node's other processes
+    map. Every process of every node holds the exact same values given
+    the same :paramref:`size` and :paramref:`seed`, which turns a
+    mutation into a slice-add of the table.
+
+    Args:
+        size: Number of values in the table.
+        seed: The seed used to generate the table.
+
+    Attributes:
+        table (torch.Tensor): The (read-only by convention) noise
+            values.
+    """
+
+    # Number of values generated at once when filling the table.
+    chunk_size = 2**20
+
+    def __init__(
+        self: "NoiseTable",
+        size: An[int, ge(1)],
+        seed: int,
+    ) -> None:
+        comm, _, _ = get_mpi_variables()
+        self.node_comm = comm.Split_type(split_type=MPI.COMM_TYPE_SHARED)
+        itemsize = np.dtype(np.float32).itemsize
+        # The window must be kept alive for as long as `table` is used.
+        self.win = MPI.Win.Allocate_shared(
+            size=size * itemsize if self.node_comm.Get_rank() == 0 else 0,
+            disp_unit=itemsize,
+            comm=self.node_comm,
+        )
+        buf, _ = self.win.Shared_query(rank=0)
+        table = np.ndarray(buffer=buf, dtype=np.float32, shape=(size,))
+        if self.node_comm.Get_rank() == 0:
+            generator = torch.Generator().manual_seed(seed)
+            for start in range(0, size, self.chunk_size):
+                end = min(start + self.chunk_size, size)
+                table[start:end] = torch.randn(
+                    size=(end - start,),
+                    generator=generator,
+                ).numpy()
+        self.node_comm.Barrier()
+        self.table: Float32[Tensor, " size"] = torch.from_numpy(table)
+
+    def get(
+        self: "NoiseTable",
+        seed: int,
+        num_params: An[int, ge(1)],
+    ) -> Float32[Tensor, " num_params"]:
+        """Returns the slice of the table attributed to a seed.
+
+        Args:
+            seed: A mutation seed (see
+                :paramref:`~.update_exchange_and_mutate_info.seeds`).
+            num_params: The number of values to return.
+
+        Returns:
+            A view of :paramref:`num_params` consecutive values of
+                :attr:`table`.
+
+        Raises:
+            ValueError: If the table holds less than
+                :paramref:`num_params` values.
+        """
+        if num_params > len(self.table):
+            error_msg = (
+                f"The noise table holds {len(self.table)} values but "
+                f"{num_params} were requested."
+            )
+            raise ValueError(error_msg)
+        offset = seed % (len(self.table) - num_params + 1)
+        return self.table[offset : offset + num_params]
@@ -0,0 +1,181 @@
+"""Pipelined mutation & evaluation for Neuroevolution fitting."""
+
+from collections import Counter
+from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+from mpi4py import MPI
+
+from common.optim.ne.agent import BaseAgent
+from common.optim.ne.space.base import BaseSpace
+from common.optim.ne.utils.evolve import mutate
+from common.optim.ne.utils.exchange import replace_agent
+from common.optim.ne.utils.noise import NoiseTable
+from common.optim.ne.utils.thread import EvaluationThreadPool
+from common.optim.ne.utils.type import (
+    Exchange_and_mutate_info_batch_type,
+    Fitnesses_and_num_env_steps_batch_type,
+    Lineage_bases_type,
+)
+from common.utils.beartype import ge, one_of
+from common.utils.misc import seed_all
+
+
+def mutate_and_evaluate_pipelined(  # noqa: PLR0913
+    agents_batch: list[list[BaseAgent]],
+    exchange_and_mutate_info_batch: Exchange_and_mutate_info_batch_type,
+    pending_exchange: (
+        tuple[
+            list[MPI.Request],
+            list[tuple[int, int]],
+            dict[tuple[int, int], Any],
+        ]
+        | None
+    ),
+    space: BaseSpace,
+    curr_gen: An[int, ge(1)],
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+    lineage_bases: list[Lineage_bases_type] | None,
+    noise_table: NoiseTable | None = None,
+    eval_mode: An[str, one_of("serial", "threaded")] = "serial",
+    thread_pool: EvaluationThreadPool | None = None,
+) -> (
+    Fitnesses_and_num_env_steps_batch_type  # fitnesses_and_num_env_steps_batch
+):
+    """Mutates & evaluates agents while the exchange is in flight.
+
+    The agents of an element of :paramref:`agents_batch` are mutated
+    & evaluated as soon as all of the MPI requests created for them
+    have completed (right away for agents that neither send nor
+    receive through MPI), in the order in which they complete, which
+    hides the exchange's communication latency behind computation.
+
+    Args:
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        exchange_and_mutate_info_batch: See
+            :paramref:`~.mutate.exchange_and_mutate_info_batch`.
+        pending_exchange: See return value of
+            :func:`~.exchange_agents` (``None`` when no exchange took
+            place).
+        space: See :paramref:`~.evaluate_on_cpu.space`.
+        curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+        lineage_bases: See :paramref:`~.rebase_lineages.lineage_bases`
+            (``None`` when :paramref:`exchange` is not ``"lineage"``).
+        noise_table: See :paramref:`~.mutate_agent.noise_table`.
+        eval_mode: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.eval_mode`.
+        thread_pool: See :paramref:`~.evaluate_on_cpu.thread_pool`.
+
+    Returns:
+        See return value of :func:`~.evaluate_on_cpu`.
+    """
+    req, req_positions, received = (
+        pending_exchange if pending_exchange is not None else ([], [], {})
+    )
+    num_pending_req = Counter(i for i, _ in req_positions)
+    ready = [i for i in range(len(agents_batch)) if not num_pending_req[i]]
+    fitnesses_and_num_env_steps_batch = np.zeros(
+        shape=(len(agents_batch), space.num_pops, 2),
+        dtype=np.float32,
+    )
+    # Evaluations submitted to `thread_pool`, by index in
+    # `agents_batch`.
+    futures: dict[int, Any] = {}
+    seed_all(seed=curr_gen)
+    while True:
+        for i in ready:
+            prepare_agents(
+                agents_batch=agents_batch,
+                i=i,
+                exchange_and_mutate_info_batch=exchange_and_mutate_info_batch,
+                received=received,
+                exchange=exchange,
+                lineage_bases=lineage_bases,
+                noise_table=noise_table,
+            )
+            if thread_pool is not None and eval_mode == "threaded":
+                futures[i] = thread_pool.submit(
+                    agents=agents_batch[i],
+                    curr_gen=curr_gen,
+                )
+                continue
+            fitnesses_and_num_env_steps_batch[i] = space.evaluate(
+                agents=[agents_batch[i]],
+                curr_gen=curr_gen,
+            )
+        # Wait for at least one of the remaining MPI requests.
+        indices, obj_or_none_list = MPI.Request.waitsome(req)
+        if indices is None:
+            break
+        # `obj_or_none_list` is never `None` when `indices` is not. The
+        # following `assert` statement is for static type checking
+        # reasons and has no execution purposes.
+        assert obj_or_none_list is not None  # noqa: S101
+        ready = []
+        for k, obj_or_none in zip(indices, obj_or_none_list, strict=True):
+            i, j = req_positions[k]
+            if obj_or_none is not None:
+                received[i, j] = obj_or_none
+            num_pending_req[i] -= 1
+            if num_pending_req[i] == 0:
+                ready.append(i)
+    for i in sorted(futures):
+        fitnesses_and_num_env_steps, logged_score = futures[i].result()
+        fitnesses_and_num_env_steps_batch[i] = fitnesses_and_num_env_steps
+        # Worker threads do not log, see `EvaluationThreadPool`.
+        if space.config.logging:
+            space.log_buffer.append(
+                (logged_score, agents_batch[i][0].total_num_steps),
+            )
+    return fitnesses_and_num_env_steps_batch
+
+
+def prepare_agents(  # noqa: PLR0913
+    agents_batch: list[list[BaseAgent]],
+    i: An[int, ge(0)],
+    exchange_and_mutate_info_batch: Exchange_and_mutate_info_batch_type,
+    received: dict[tuple[int, int], Any],
+    exchange: An[str, one_of("agent", "lineage", "buffer")],
+    lineage_bases: list[Lineage_bases_type] | None,
+    noise_table: NoiseTable | None,
+) -> None:
+    """Replaces the received agents of a batch element & mutates it.
+
+    Args:
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        i: The index of the element in :paramref:`agents_batch`.
+        exchange_and_mutate_info_batch: See
+            :paramref:`~.mutate.exchange_and_mutate_info_batch`.
+        received: See the third element of the return value of
+            :func:`~.post_exchange`.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+        lineage_bases: See :paramref:`~.rebase_lineages.lineage_bases`
+            (``None`` when :paramref:`exchange` is not ``"lineage"``).
+        noise_table: See :paramref:`~.mutate_agent.noise_table`.
+    """
+    for j in range(len(agents_batch[i])):
+        if (i, j) in received:
+            replace_agent(
+                agents_batch=agents_batch,
+                i=i,
+                j=j,
+                received_agent=received[i, j],
+                exchange=exchange,
+                lineage_bases=lineage_bases,
+                noise_table=noise_table,
+            )
+    mutate(
+        agents_batch=[agents_batch[i]],
+        exchange_and_mutate_info_batch=exchange_and_mutate_info_batch[
+            i : i + 1
+        ],
+        num_pops=len(agents_batch[i]),
+        noise_table=noise_table,
+        record_lineage=lineage_bases is not None,
+    )
@@ -0,0 +1,185 @@
+""":class:`.Racer`."""
+
+import logging
+from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+
+from common.optim.ne.agent import BaseAgent
+from common.optim.ne.space.base import BaseSpace
+from common.optim.ne.utils.type import Fitnesses_and_num_env_steps_batch_type
+from common.utils.beartype import ge
+from common.utils.mpi4py import get_mpi_variables
+
+log = logging.getLogger(__name__)
+
+
+class Racer:
+    """Evaluates agents over an adaptive number of episodes.
+
+    Every agent is first evaluated over
+    :paramref:`num_initial_episodes` episodes. Then, in rounds, the
+    processes share the statistics of the agents they maintain and
+    every process evaluates its agents whose fitness confidence
+    interval (of half-width :paramref:`z_score` standard errors)
+    contains the selection boundary (halfway between the fitness means
+    of the worst selected & best non-selected agents) over one more
+    episode, the most uncertain ones first, until no such agent is
+    left, agents reach :paramref:`max_num_episodes` episodes or the
+    generation's environment step budget is exhausted. An agent's
+    fitness is its mean episode score and its number of environment
+    steps is the sum over its episodes. Elements of
+    :paramref:`~.compute_generation_results.agents_batch` are raced as
+    a whole (an element keeps racing as long as any of its agents
+    does).
+
+    Args:
+        space: See :paramref:`~.evaluate_on_cpu.space`.
+        num_initial_episodes: Number of episodes every agent is
+            evaluated over.
+        max_num_episodes: Maximum number of episodes an agent is
+            evaluated over.
+        z_score: Number of standard errors on each side of an agent's
+            fitness mean that its confidence interval spans.
+        budget: Maximum number of environment steps taken by all
+            agents per generation beyond which no further episode is
+            allocated (the initial episodes are always run). ``0``
+            means no budget.
+    """
+
+    def __init__(
+        self: "Racer",
+        space: BaseSpace,
+        num_initial_episodes: An[int, ge(1)],
+        max_num_episodes: An[int, ge(1)],
+        z_score: An[float, ge(0)],
+        budget: An[int, ge(0)],
+    ) -> None:
+        self.space = space
+        self.num_initial_episodes = num_initial_episodes
+        self.max_num_episodes = max(max_num_episodes, num_initial_episodes)
+        self.z_score = z_score
+        self.budget = budget
+
+    def evaluate(
+        self: "Racer",
+        agents_batch: list[list[BaseAgent]],
+        curr_gen: An[int, ge(1)],
+    ) -> Fitnesses_and_num_env_steps_batch_type:
+        """Races :paramref:`agents_batch` with the other processes.
+
+        Collective over all processes.
+
+        Args:
+            agents_batch: See
+                :paramref:`~.compute_generation_results.agents_batch`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            See return value of :func:`~.evaluate_on_cpu`.
+        """
+        # Sum of scores, sum of squared scores, number of environment
+        # steps & number of episodes, per element & population.
+        stats = np.zeros(
+            shape=(len(agents_batch), self.space.num_pops, 4),
+            dtype=np.float64,
+        )
+        logging_enabled = self.space.config.logging
+        racing = np.ones(shape=len(agents_batch), dtype=bool)
+        for episode in range(self.max_num_episodes):
+            self.space.eval_episode = episode
+            for i in np.flatnonzero(racing):
+                fitnesses_and_num_env_steps = self.space.evaluate(
+                    agents=[agents_batch[i]],
+                    curr_gen=curr_gen,
+                )
+                fitnesses, num_env_steps = np.reshape(
+                    fitnesses_and_num_env_steps,
+                    (-1, 2),
+                ).T
+                stats[i] += np.stack(
+                    (
+                        fitnesses,
+                        fitnesses**2,
+                        num_env_steps,
+                        np.ones_like(fitnesses),
+                    ),
+                    axis=-1,
+                )
+            # Only the first episode of each agent is logged.
+            self.space.config.logging = False
+            if episode + 1 < self.num_initial_episodes:
+                continue
+            if episode + 1 == self.max_num_episodes:
+                break
+            racing = self.select(stats=stats)
+            if racing is None:
+                break
+        self.space.config.logging = logging_enabled
+        self.space.eval_episode = 0
+        return np.stack(
+            (stats[..., 0] / stats[..., 3], stats[..., 2]),
+            axis=-1,
+        ).astype(np.float32)
+
+    def select(
+        self: "Racer",
+        stats: np.ndarray[Any, Any],
+    ) -> np.ndarray[Any, Any] | None:
+        """Selects the elements to evaluate over one more episode.
+
+        Collective over all processes, all of which select the same
+        agents.
+
+        Args:
+            stats: The per-element statistics of this process, see
+                :meth:`evaluate`.
+
+        Returns:
+            Whether each element of this process is selected, ``None``
+                if no agent of any process is.
+        """
+        comm, rank, size = get_mpi_variables()
+        all_stats = np.empty(shape=(size, *stats.shape), dtype=stats.dtype)
+        comm.Allgather(sendbuf=stats, recvbuf=all_stats)
+        all_stats = all_stats.reshape(-1, *stats.shape[1:])
+        sums, sq_sums, num_env_steps, counts = np.moveaxis(all_stats, -1, 0)
+        means = sums / counts
+        # Sample standard deviations, unknown after a single episode.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stds = np.sqrt(
+                np.maximum(sq_sums - counts * means**2, 0) / (counts - 1),
+            )
+        stds[counts < 2] = np.inf  # noqa: PLR2004
+        half_widths = self.z_score * stds / np.sqrt(counts)
+        sorted_means = np.sort(means, axis=0)
+        pop_size = len(means)
+        boundaries = (
+            sorted_means[pop_size // 2 - 1] + sorted_means[pop_size // 2]
+        ) / 2
+        # Distances to the boundary in units of confidence interval
+        # half-widths, below 1 for undecided agents.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distances = np.abs(means - boundaries) / half_widths
+        distances = np.nan_to_num(distances, nan=np.inf).min(axis=1)
+        undecided = (distances <= 1) & (counts[:, 0] < self.max_num_episodes)
+        # The most uncertain agents first.
+        order = np.flatnonzero(undecided)[
+            np.argsort(distances[undecided], kind="stable")
+        ]
+        if self.budget:
+            # Expected cost of one more episode of each element.
+            costs = num_env_steps[order].sum(axis=1) / counts[order, 0]
+            remaining_budget = self.budget - num_env_steps.sum()
+            order = order[np.cumsum(costs) <= remaining_budget]
+        if rank == 0:
+            log.info(f"Racing {len(order)} agent(s).")
+        if not len(order):
+            return None
+        selected = np.zeros(shape=pop_size, dtype=bool)
+        selected[order] = True
+        len_agents_batch = len(stats)
+        return selected[
+            rank * len_agents_batch : (rank + 1) * len_agents_batch
+        ]
@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from .race import Racer
+
+NUM_EPISODE_STEPS = 10
+
+
+def make_stats(scores: list[list[float]]) -> np.ndarray:
+    # One population, `NUM_EPISODE_STEPS` steps per episode.
+    scores_np = np.array(scores)
+    return np.stack(
+        (
+            scores_np.sum(axis=1),
+            (scores_np**2).sum(axis=1),
+            np.full(len(scores_np), NUM_EPISODE_STEPS * scores_np.shape[1]),
+            np.full(len(scores_np), scores_np.shape[1]),
+        ),
+        axis=-1,
+    )[:, None].astype(np.float64)
+
+
+def make_racer(max_num_episodes: int = 5, budget: int = 0) -> Racer:
+    return Racer(
+        space=SimpleNamespace(),  # type: ignore[arg-type]
+        num_initial_episodes=2,
+        max_num_episodes=max_num_episodes,
+        z_score=1.96,
+        budget=budget,
+    )
+
+
+# Means 0.1, 5, 6 & 10.1: the boundary is 5.5, which only the
+# confidence intervals of the 2nd (half-width 1.96) & 3rd (half-width
+# 0.98) agents contain.
+SCORES = [[0.0, 0.2], [4.0, 6.0], [5.5, 6.5], [10.0, 10.2]]
+
+
+def test_select_undecided() -> None:
+    selected = make_racer().select(stats=make_stats(scores=SCORES))
+    assert selected is not None
+    assert selected.tolist() == [False, True, True, False]
+
+
+def test_select_decided() -> None:
+    scores = [[0.0, 0.2], [4.0, 4.2], [6.0, 6.2], [10.0, 10.2]]
+    assert make_racer().select(stats=make_stats(scores=scores)) is None
+
+
+def test_select_max_num_episodes() -> None:
+    racer = make_racer(max_num_episodes=2)
+    assert racer.select(stats=make_stats(scores=SCORES)) is None
+
+
+@pytest.mark.parametrize(
+    ("budget", "expected"),
+    [
+        # 80 steps taken, each additional episode costs 10 steps. The
+        # 2nd agent is the most uncertain one.
+        (90, [False, True, False, False]),
+        (100, [False, True, True, False]),
+    ],
+)
+def test_select_budget(budget: int, expected: list[bool]) -> None:
+    selected = make_racer(budget=budget).select(
+        stats=make_stats(scores=SCORES),
+    )
+    assert selected is not None
+    assert selected.tolist() == expected
+
+
+def test_select_budget_exhausted() -> None:
+    racer = make_racer(budget=85)
+    assert racer.select(stats=make_stats(scores=SCORES)) is None
@@ -1,14 +1,82 @@
-"""File reading and writing utilities for Neuroevolution fitting."""
+"""File reading and writing utilities for Neuroevolution fitting.
 
+A saved state (format version :data:`FORMAT_VERSION`) is a directory
+named after its generation that holds:
+
+* ``manifest.json``: written by the primary process. Holds the format
+  version, the layout of the agents (see below), the number of
+  populations, the number of agents held by each shard and
+  :paramref:`~.compute_total_num_env_steps_and_process_fitnesses.total_num_env_steps`.
+* ``generation_results.npy``: written by the primary process, see
+  :paramref:`~.compute_generation_results.generation_results`.
+* ``shards/``: the agents maintained by each process at save time,
+  written by that process. With the ``"columnar"`` layout (used when
+  the states of all agents can be packed with
+  :meth:`~.BaseAgent.get_state_buffer`), shard ``i`` holds one
+  ``params_<pop_idx>_<i>.npy`` parameter matrix and one
+  ``state_<pop_idx>_<i>.npy`` state buffer matrix per population (one
+  row per agent), which are completed by the ``templates.pkl`` agents
+  (freshly built from the agent configuration) written by the primary
+  process. With the ``"pickle"`` layout, shard
+  ``i`` is an ``agents_<i>.pkl`` file of agents pickled one after the
+  other, whose byte offsets are listed in the manifest.
+
+``"columnar"`` save points can also be ``"lineage"`` save points (see
+:paramref:`~.NeuroevolutionSubtaskConfig.save_mode`), whose shards do
+not hold parameter matrices. The manifest of such a save point then
+holds the generation of the previous ``"full"`` save point, and the
+primary process writes a ``genealogy.npy`` file stacking, for every
+generation since, the output of :func:`.compute_genealogy`. The
+parameters of an agent are materialized (see :func:`load_agents`) by
+replaying the mutations of its ancestors on top of the parameters of
+its ancestor in the ``"full"`` save point.
+
+Shards are written & read by all processes in parallel, and the rows
+of any agent can be read (e.g. through :func:`load_params`) without
+reading those of the others. As the manifest locates every agent, a
+state can be loaded by a number of processes that differs from the
+number that saved it. Every file is written to a temporary file that
+is synced to disk and then renamed, and the manifest is only written
+once all processes have written their shards, which means that a save
+point is complete (and only then) once its manifest and all of the
+files it lists exist (see :func:`is_complete`).
+
+States saved in the former format, i.e. as a single ``state.pkl``
+file, are converted with :func:`convert_state` before being resumed
+from (see :func:`.compute_save_points`).
+"""
+
+import copy
+import json
+import os
 import pickle
+import queue
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
+from types import TracebackType
 from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+import torch
+from jaxtyping import Float32
+from mpi4py import MPI
 
 from common.optim.ne.agent import BaseAgent
-from common.optim.ne.utils.type import Generation_results_type
-from common.utils.beartype import ge
+from common.optim.ne.utils.evolve import mutate_agent
+from common.optim.ne.utils.noise import NoiseTable
+from common.optim.ne.utils.type import Genealogy_type, Generation_results_type
+from common.utils.beartype import ge, one_of
 from common.utils.mpi4py import get_mpi_variables
 
+# Version of the saved state format, see the module docstring.
+FORMAT_VERSION = 2
+# Seconds between two checks of whether all processes wrote their
+# files, see :meth:`CheckpointWriter.all_written`.
+POLL_INTERVAL = 0.001
+
 
 def find_existing_save_points(output_dir: str) -> list[int]:
     """Returns a list of existing save points.
@@ -25,16 +93,699 @@ def find_existing_save_points(output_dir: str) -> list[int]:
         for save_path in Path(output_dir).glob(pattern="*")
         if (
             save_path.is_dir()
-            and (save_path / "state.pkl").exists()
             and save_path.name.isdigit()
+            and is_complete(path=save_path)
+        )
+    ]
+
+
+def get_shard_files(
+    manifest: dict[str, Any],
+    shard_idx: An[int, ge(0)],
+) -> list[str]:
+    """Returns the names of the files making up a shard.
+
+    Args:
+        manifest: See return value of :func:`load_manifest`.
+        shard_idx: The shard index.
+
+    Returns:
+        The file names, relative to the ``shards/`` directory.
+    """
+    if manifest["layout"] == "pickle":
+        return [f"agents_{shard_idx}.pkl"]
+    names = ("params", "state") if manifest["base_gen"] is None else ("state",)
+    return [
+        f"{name}_{pop_idx}_{shard_idx}.npy"
+        for pop_idx in range(manifest["num_pops"])
+        for name in names
+    ]
+
+
+def is_complete(path: Path) -> bool:
+    """Returns whether a saved state has been entirely written.
+
+    Args:
+        path: The saved state's directory.
+
+    Returns:
+        Whether :paramref:`path` holds a valid manifest and all of the
+            files it lists, each holding as many agents as listed
+            (and, for a ``"lineage"`` save point, whether its
+            ``"full"`` save point is complete).
+    """
+    try:
+        manifest = load_manifest(path=path)
+    except (FileNotFoundError, KeyError, ValueError):
+        return False
+    base_gen = manifest["base_gen"]
+    if base_gen is not None and not is_complete(
+        path=path.parent / str(base_gen),
+    ):
+        return False
+    pop_size = sum(manifest["shard_sizes"])
+    try:
+        return (
+            all(
+                is_shard_file_complete(
+                    path=path / "shards" / name,
+                    manifest=manifest,
+                    shard_idx=shard_idx,
+                )
+                for shard_idx in range(len(manifest["shard_sizes"]))
+                for name in get_shard_files(
+                    manifest=manifest,
+                    shard_idx=shard_idx,
+                )
+            )
+            and len(load_generation_results(path=path)) == pop_size
+            and (
+                manifest["layout"] == "pickle"
+                or (path / "templates.pkl").is_file()
+            )
+            and (
+                base_gen is None
+                or len(np.load(file=path / "genealogy.npy", mmap_mode="r"))
+                == int(path.name) - base_gen
+            )
+        )
+    except (OSError, ValueError):
+        return False
+
+
+def is_shard_file_complete(
+    path: Path,
+    manifest: dict[str, Any],
+    shard_idx: An[int, ge(0)],
+) -> bool:
+    """Returns whether a shard file holds all of its agents.
+
+    Args:
+        path: The shard file's path.
+        manifest: See return value of :func:`load_manifest`.
+        shard_idx: The shard index.
+
+    Returns:
+        Whether the ``.npy`` file has one row per agent of the shard,
+            or whether the ``.pkl`` file extends past the byte offset
+            of its last agent.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the ``.npy`` file is malformed or truncated.
+    """
+    shard_size = manifest["shard_sizes"][shard_idx]
+    if path.suffix == ".npy":
+        return len(np.load(file=path, mmap_mode="r")) == shard_size
+    offsets = manifest["shard_offsets"][shard_idx]
+    return path.stat().st_size > (offsets[-1] if shard_size else -1)
+
+
+def write_file(
+    path: Path,
+    content: list[bytes] | np.ndarray[Any, Any],
+) -> None:
+    """Durably writes a file.
+
+    The file only appears at :paramref:`path` once its content is
+    synced to disk, and its directory is synced after the rename.
+
+    Args:
+        path: The path to write the file at.
+        content: The content of the file, or an array to save in the
+            ``.npy`` format.
+    """
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open(mode="wb") as f:
+        if isinstance(content, np.ndarray):
+            np.save(file=f, arr=content)
+        else:
+            for chunk in content:
+                f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def snapshot(
+    arrays: list[np.ndarray[Any, Any]] | np.ndarray[Any, Any],
+    name: str,
+    buffers: dict[str, np.ndarray[Any, Any]] | None,
+) -> np.ndarray[Any, Any]:
+    """Stacks or copies arrays into a reusable buffer.
+
+    Args:
+        arrays: The arrays to stack, or the array to copy.
+        name: The buffer's name.
+        buffers: See return value of
+            :meth:`CheckpointWriter.get_buffers`. The buffer is
+            (re)allocated if missing or of the wrong shape. ``None``
+            means that a new array is returned.
+
+    Returns:
+        The buffer holding the stacked or copied arrays.
+
+    Raises:
+        ValueError: If the arrays to stack differ in shape.
+    """
+    shape, dtype = (
+        ((len(arrays), *arrays[0].shape), arrays[0].dtype)
+        if isinstance(arrays, list)
+        else (arrays.shape, arrays.dtype)
+    )
+    buffer = None if buffers is None else buffers.get(name)
+    if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+        buffer = np.empty(shape=shape, dtype=dtype)
+        if buffers is not None:
+            buffers[name] = buffer
+    if isinstance(arrays, list):
+        np.stack(arrays=arrays, out=buffer)
+    else:
+        np.copyto(dst=buffer, src=arrays)
+    return buffer
+
+
+class CheckpointWriter:
+    """Writes save points to disk on a background thread.
+
+    Processes snapshot their agents into buffers (see
+    :meth:`get_buffers`) that the thread serializes & writes, which
+    lets evolution resume (and modify the agents) while they are
+    being written. The manifest of a save point that all processes
+    write files of is only written once they all have. Exiting the
+    writer as a context manager calls :meth:`close`.
+
+    Args:
+        queue_size: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.save_queue_size`.
+
+    Attributes:
+        comm (mpi4py.MPI.Comm): A duplicate of the communicator in
+            use upon creation, which the thread synchronizes the
+            processes on.
+
+    Raises:
+        ValueError: If MPI does not support ``MPI.THREAD_MULTIPLE``.
+    """
+
+    def __init__(
+        self: "CheckpointWriter",
+        queue_size: An[int, ge(1)],
+    ) -> None:
+        if MPI.Query_thread() < MPI.THREAD_MULTIPLE:
+            error_msg = (
+                "`save_queue_size > 0` requires MPI to support "
+                "`MPI.THREAD_MULTIPLE`."
+            )
+            raise ValueError(error_msg)
+        comm, _, _ = get_mpi_variables()
+        self.comm = comm.Dup()
+        self.queue: queue.Queue[
+            tuple[
+                list[tuple[Path, list[bytes] | np.ndarray[Any, Any]]],
+                tuple[Path, list[bytes]] | None,
+                dict[str, np.ndarray[Any, Any]] | None,
+                bool,
+            ]
+            | None
+        ] = queue.Queue(maxsize=queue_size)
+        # One set of buffers per queued save point, plus one for the
+        # save point being written.
+        self.free_buffers: queue.Queue[dict[str, np.ndarray[Any, Any]]]
+        self.free_buffers = queue.Queue()
+        for _ in range(queue_size + 1):
+            self.free_buffers.put(item={})
+        self.error: BaseException | None = None
+        self.aborted = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self: "CheckpointWriter") -> "CheckpointWriter":
+        return self
+
+    def __exit__(
+        self: "CheckpointWriter",
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close(abort=exc_type is not None)
+
+    def run(self: "CheckpointWriter") -> None:
+        """Writes the queued save points until :meth:`close`."""
+        while (item := self.queue.get()) is not None:
+            files, manifest_file, buffers, synchronize = item
+            written = True
+            try:
+                for path, content in files:
+                    write_file(path=path, content=content)
+            except BaseException as error:  # noqa: BLE001
+                written = False
+                self.error = self.error or error
+            if synchronize:
+                written = self.all_written(written=written)
+            try:
+                if written and manifest_file is not None:
+                    write_file(path=manifest_file[0], content=manifest_file[1])
+            except BaseException as error:  # noqa: BLE001
+                self.error = self.error or error
+            if buffers is not None:
+                self.free_buffers.put(item=buffers)
+
+    def all_written(self: "CheckpointWriter", *, written: bool) -> bool:
+        """Returns whether all processes wrote their files.
+
+        Polls the reduction rather than blocking on it so that the
+        thread stops waiting once the writer is aborted (see
+        :meth:`close`).
+
+        Args:
+            written: Whether this process wrote its files.
+
+        Returns:
+            See above, ``False`` if the writer is aborted first.
+        """
+        sendbuf = np.array(written)
+        recvbuf = np.empty_like(sendbuf)
+        request = self.comm.Iallreduce(
+            sendbuf=sendbuf,
+            recvbuf=recvbuf,
+            op=MPI.LAND,
+        )
+        while not request.Test():
+            if self.aborted:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return bool(recvbuf)
+
+    def raise_error(self: "CheckpointWriter") -> None:
+        """Re-raises the first error raised by the writing thread."""
+        if self.error is not None:
+            raise self.error
+
+    def get_buffers(
+        self: "CheckpointWriter",
+    ) -> dict[str, np.ndarray[Any, Any]]:
+        """Returns buffers to snapshot a save point into.
+
+        Blocks until the thread releases a set of buffers. Buffers are
+        reused across save points (see :func:`snapshot`).
+
+        Returns:
+            The buffers, by name.
+        """
+        self.raise_error()
+        return self.free_buffers.get()
+
+    def put(
+        self: "CheckpointWriter",
+        files: list[tuple[Path, list[bytes] | np.ndarray[Any, Any]]],
+        manifest_file: tuple[Path, list[bytes]] | None,
+        buffers: dict[str, np.ndarray[Any, Any]] | None,
+        *,
+        synchronize: bool,
+    ) -> None:
+        """Queues a save point's files, blocks if the queue is full.
+
+        Args:
+            files: The paths & contents of the files to write, see
+                :func:`write_file`.
+            manifest_file: The path & content of the manifest, which
+                is written last. ``None`` if this process does not
+                write it.
+            buffers: The buffers (see :meth:`get_buffers`) that
+                :paramref:`files` were snapshotted into, which are
+                released once written.
+            synchronize: Whether all processes write files of the
+                save point, in which case the manifest is only written
+                once they all have.
+        """
+        self.raise_error()
+        self.queue.put(item=(files, manifest_file, buffers, synchronize))
+
+    def close(self: "CheckpointWriter", *, abort: bool = False) -> None:
+        """Waits for all queued files to be written to disk.
+
+        Args:
+            abort: Whether to stop waiting for the other processes
+                (and not write the manifests that depend on them),
+                e.g. after an error that they might not recover from.
+                Errors of the writing thread are then not raised.
+        """
+        self.aborted = abort
+        self.queue.put(item=None)
+        self.thread.join()
+        if not abort:
+            self.raise_error()
+
+
+class MaterializationCache:
+    """Least recently used parameters of materialized agents.
+
+    Args:
+        max_size: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.materialization_cache_size`.
+    """
+
+    def __init__(
+        self: "MaterializationCache",
+        max_size: An[int, ge(0)],
+    ) -> None:
+        self.max_size = max_size
+        self.params: OrderedDict[
+            tuple[int, int, int],
+            Float32[np.ndarray, " num_params"],
+        ] = OrderedDict()
+
+    def get(
+        self: "MaterializationCache",
+        key: tuple[int, int, int],
+    ) -> Float32[np.ndarray, " num_params"] | None:
+        """Returns cached parameters.
+
+        Args:
+            key: The agent's generation, population index & position
+                in the population.
+
+        Returns:
+            The agent's parameters, or ``None`` if they are not cached.
+        """
+        if key not in self.params:
+            return None
+        self.params.move_to_end(key=key)
+        return self.params[key]
+
+    def put(
+        self: "MaterializationCache",
+        key: tuple[int, int, int],
+        params: Float32[np.ndarray, " num_params"],
+    ) -> None:
+        """Caches parameters, evicting the least recently used ones.
+
+        Args:
+            key: See :paramref:`get.key`.
+            params: The agent's parameters.
+        """
+        if not self.max_size:
+            return
+        self.params[key] = params.copy()
+        if len(self.params) > self.max_size:
+            self.params.popitem(last=False)
+
+
+def load_manifest(path: Path) -> dict[str, Any]:
+    """Loads the manifest of a saved state.
+
+    Args:
+        path: The saved state's directory.
+
+    Returns:
+        The manifest, see the module docstring.
+
+    Raises:
+        FileNotFoundError: If :paramref:`path` holds no manifest.
+        ValueError: If the manifest has an unsupported format version.
+    """
+    if not (path / "manifest.json").exists():
+        error_msg = f"No saved state found at {path}."
+        raise FileNotFoundError(error_msg)
+    with (path / "manifest.json").open() as f:
+        manifest: dict[str, Any] = json.load(fp=f)
+    if manifest["version"] != FORMAT_VERSION:
+        error_msg = (
+            f"The state saved at {path} has format version "
+            f"{manifest['version']}, expected {FORMAT_VERSION}."
+        )
+        raise ValueError(error_msg)
+    return manifest
+
+
+def load_generation_results(path: Path) -> Generation_results_type:
+    """Loads (memory-maps) the generation results of a saved state.
+
+    Args:
+        path: The saved state's directory.
+
+    Returns:
+        See
+            :paramref:`~.compute_generation_results.generation_results`
+            (read-only).
+    """
+    generation_results: Generation_results_type = np.load(
+        file=path / "generation_results.npy",
+        mmap_mode="r",
+    )
+    return generation_results
+
+
+def load_rows(
+    path: Path,
+    manifest: dict[str, Any],
+    name: str,
+    indices: list[int],
+) -> np.ndarray[Any, Any]:
+    """Loads rows of a matrix split across the shards of a saved state.
+
+    Only the requested rows are read from the memory-mapped shards.
+
+    Args:
+        path: The saved state's directory.
+        manifest: See return value of :func:`load_manifest`.
+        name: The matrix name (e.g. ``"params_0"``).
+        indices: The positions of the agents whose rows to load in
+            the population. Must not be empty.
+
+    Returns:
+        The rows, in the order of :paramref:`indices`.
+    """
+    starts = np.cumsum([0, *manifest["shard_sizes"]])
+    indices_np = np.asarray(indices)
+    shard_indices = np.searchsorted(starts, indices_np, side="right") - 1
+    rows: np.ndarray[Any, Any] | None = None
+    for shard_idx in np.unique(shard_indices):
+        shard = np.load(
+            file=path / "shards" / f"{name}_{shard_idx}.npy",
+            mmap_mode="r",
+        )
+        if rows is None:
+            rows = np.empty(
+                shape=(len(indices), *shard.shape[1:]),
+                dtype=shard.dtype,
+            )
+        mask = shard_indices == shard_idx
+        rows[mask] = shard[indices_np[mask] - starts[shard_idx]]
+    # `rows` is only `None` when `indices` is empty. The following
+    # `assert` statement is for static type checking reasons and has
+    # no execution purposes.
+    assert rows is not None  # noqa: S101
+    return rows
+
+
+def load_params(
+    path: Path,
+    manifest: dict[str, Any],
+    pop_idx: An[int, ge(0)],
+    indices: list[int],
+) -> Float32[np.ndarray, "num_indices num_params"]:
+    """Loads the parameters of agents of a ``"columnar"`` saved state.
+
+    Args:
+        path: The saved state's directory.
+        manifest: See return value of :func:`load_manifest`.
+        pop_idx: The population index.
+        indices: See :paramref:`~.load_rows.indices`.
+
+    Returns:
+        The agents' flat parameters (see
+            :meth:`~.BaseAgent.get_params`).
+    """
+    return load_rows(
+        path=path,
+        manifest=manifest,
+        name=f"params_{pop_idx}",
+        indices=indices,
+    )
+
+
+def materialize_params(  # noqa: PLR0913
+    agent: BaseAgent,
+    path: Path,
+    manifest: dict[str, Any],
+    pop_idx: An[int, ge(0)],
+    idx: An[int, ge(0)],
+    genealogy: np.ndarray[Any, Any],
+    noise_table: NoiseTable | None,
+    cache: MaterializationCache,
+) -> None:
+    """Materializes an agent's parameters from a ``"lineage"`` state.
+
+    Args:
+        agent: The agent to overwrite the parameters of.
+        path: The ``"lineage"`` saved state's directory.
+        manifest: See return value of :func:`load_manifest`.
+        pop_idx: The agent's population index.
+        idx: The agent's position in the population.
+        genealogy: The saved state's ``genealogy.npy`` array.
+        noise_table: See :paramref:`~.mutate_agent.noise_table`.
+        cache: The cache to read & fill.
+    """
+    base_gen: int = manifest["base_gen"]
+    # Walks back the agent's ancestry, up to a cached ancestor or to
+    # its ancestor in the "full" save point.
+    mutations: list[tuple[int, int, int]] = []  # gen, position, seed
+    params = None
+    for k in reversed(range(len(genealogy))):
+        params = cache.get(key=(base_gen + 1 + k, pop_idx, idx))
+        if params is not None:
+            break
+        parent_idx, seed = genealogy[k, idx, pop_idx].tolist()
+        mutations.append((base_gen + 1 + k, idx, seed))
+        idx = parent_idx
+    if params is None:
+        base_path = path.parent / str(base_gen)
+        params = load_params(
+            path=base_path,
+            manifest=load_manifest(path=base_path),
+            pop_idx=pop_idx,
+            indices=[idx],
+        )[0]
+    agent.set_params(params=torch.from_numpy(params))
+    for gen, position, seed in reversed(mutations):
+        mutate_agent(agent=agent, seed=seed, noise_table=noise_table)
+        cache.put(
+            key=(gen, pop_idx, position),
+            params=agent.get_params().numpy(),
         )
+
+
+def load_agents(
+    path: Path,
+    manifest: dict[str, Any],
+    indices: list[int],
+    noise_table: NoiseTable | None = None,
+    cache: MaterializationCache | None = None,
+) -> list[list[BaseAgent]]:
+    """Loads agents from a saved state's shards.
+
+    Only the shards that hold the requested agents are opened, and
+    only the requested agents are read (or materialized).
+
+    Args:
+        path: The saved state's directory.
+        manifest: See return value of :func:`load_manifest`.
+        indices: See :paramref:`~.load_rows.indices`.
+        noise_table: See :paramref:`~.mutate_agent.noise_table`. Must
+            match the one used while saving ``"lineage"`` states.
+        cache: The cache to use while materializing agents from a
+            ``"lineage"`` saved state. ``None`` means no caching.
+
+    Returns:
+        The agents, in the order of :paramref:`indices`.
+    """
+    if not indices:
+        return []
+    if manifest["layout"] == "pickle":
+        starts = np.cumsum([0, *manifest["shard_sizes"]])
+        agents_batch: list[list[BaseAgent]] = []
+        for i in indices:
+            shard_idx = int(np.searchsorted(starts, i, side="right")) - 1
+            offset = manifest["shard_offsets"][shard_idx][
+                i - starts[shard_idx]
+            ]
+            shard_path = path / "shards" / f"agents_{shard_idx}.pkl"
+            with shard_path.open(mode="rb") as f:
+                f.seek(offset)
+                agents_batch.append(pickle.load(file=f))
+        return agents_batch
+    with (path / "templates.pkl").open(mode="rb") as f:
+        templates: list[BaseAgent] = pickle.load(file=f)
+    agents_batch = [
+        [copy.deepcopy(template) for template in templates] for _ in indices
     ]
+    genealogy = (
+        None
+        if manifest["base_gen"] is None
+        else np.load(file=path / "genealogy.npy")
+    )
+    for pop_idx in range(manifest["num_pops"]):
+        if genealogy is None:
+            params = load_params(
+                path=path,
+                manifest=manifest,
+                pop_idx=pop_idx,
+                indices=indices,
+            )
+            for agents, agent_params in zip(agents_batch, params, strict=True):
+                agents[pop_idx].set_params(
+                    params=torch.from_numpy(agent_params),
+                )
+        else:
+            for agents, idx in zip(agents_batch, indices, strict=True):
+                materialize_params(
+                    agent=agents[pop_idx],
+                    path=path,
+                    manifest=manifest,
+                    pop_idx=pop_idx,
+                    idx=idx,
+                    genealogy=genealogy,
+                    noise_table=noise_table,
+                    cache=cache or MaterializationCache(max_size=0),
+                )
+        state_buffers = load_rows(
+            path=path,
+            manifest=manifest,
+            name=f"state_{pop_idx}",
+            indices=indices,
+        )
+        for agents, state_buffer in zip(
+            agents_batch,
+            state_buffers,
+            strict=True,
+        ):
+            agents[pop_idx].set_state_buffer(state_buffer=state_buffer)
+    return agents_batch
 
 
-def load_state(
+def check_pop_size(
+    path: Path,
+    saved_pop_size: An[int, ge(0)],
+    len_agents_batch: An[int, ge(1)],
+) -> None:
+    """Makes sure that a saved state can be resumed from.
+
+    Args:
+        path: The saved state's directory.
+        saved_pop_size: The number of agents per population held by
+            the saved state.
+        len_agents_batch: See
+            :paramref:`~.initialize_agents.len_agents_batch`.
+
+    Raises:
+        ValueError: If the saved population size differs from the
+            current one.
+    """
+    _, _, size = get_mpi_variables()
+    if saved_pop_size != len_agents_batch * size:
+        error_msg = (
+            f"The state saved at {path} holds {saved_pop_size} agents "
+            f"per population but the current population size is "
+            f"{len_agents_batch * size}."
+        )
+        raise ValueError(error_msg)
+
+
+def load_state(  # noqa: PLR0913
     prev_num_gens: An[int, ge(0)],
     len_agents_batch: An[int, ge(1)],
     output_dir: str,
+    selection: An[str, one_of("centralized", "decentralized")],
+    noise_table: NoiseTable | None = None,
+    cache: MaterializationCache | None = None,
 ) -> tuple[
     list[list[BaseAgent]],  # agents_batch
     Generation_results_type | None,  # generation_results
@@ -49,6 +800,10 @@ def load_state(
             :paramref:`~.initialize_agents.len_agents_batch`.
         output_dir: See
             :paramref:`~.BaseSubtaskConfig.output_dir`.
+        selection: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.selection`.
+        noise_table: See :paramref:`~.load_agents.noise_table`.
+        cache: See :paramref:`~.load_agents.cache`.
 
     Returns:
         * See ~.compute_generation_results.agents_batch`.
@@ -56,39 +811,277 @@ def load_state(
             :paramref:`~.compute_generation_results.generation_results`.
         * See
             :paramref:`~.compute_total_num_env_steps_and_process_fitnesses.total_num_env_steps`.
+
+    Raises:
+        ValueError: See :func:`check_pop_size`.
     """
-    comm, rank, size = get_mpi_variables()
-    if rank == 0:
-        path = Path(f"{output_dir}/{prev_num_gens}/state.pkl")
-        if not path.exists():
-            error_msg = f"No saved state found at {path}."
-            raise FileNotFoundError(error_msg)
-        with path.open(mode="rb") as f:
-            state = pickle.load(file=f)
-        agents: list[list[BaseAgent]] = state[0]
-        generation_results: Generation_results_type = state[1]
-        total_num_env_steps: int = state[2]
-        batched_agents: list[list[list[BaseAgent]]] = [
-            agents[i * len_agents_batch : (i + 1) * len_agents_batch]
-            for i in range(size)
-        ]
-    # `comm.scatter` argument `sendobj` is wrongly typed. `[]` is the
-    # workaround for not being able to set it to `None`.
-    # See https://github.com/mpi4py/mpi4py/issues/434
-    agents_batch = comm.scatter(sendobj=[] if rank != 0 else batched_agents)
+    _, rank, _ = get_mpi_variables()
+    path = Path(f"{output_dir}/{prev_num_gens}")
+    manifest = load_manifest(path=path)
+    check_pop_size(
+        path=path,
+        saved_pop_size=sum(manifest["shard_sizes"]),
+        len_agents_batch=len_agents_batch,
+    )
+    agents_batch = load_agents(
+        path=path,
+        manifest=manifest,
+        indices=list(
+            range(rank * len_agents_batch, (rank + 1) * len_agents_batch),
+        ),
+        noise_table=noise_table,
+        cache=cache,
+    )
     return (
         agents_batch,
-        None if rank != 0 else generation_results,
-        None if rank != 0 else total_num_env_steps,
+        (
+            None
+            if rank != 0 and selection == "centralized"
+            # Copied as the memory-mapped array is read-only.
+            else np.array(load_generation_results(path=path))
+        ),
+        None if rank != 0 else manifest["total_num_env_steps"],
     )
 
 
-def save_state(
+def get_columns(
+    agents_batch: list[list[BaseAgent]],
+    buffers: dict[str, np.ndarray[Any, Any]] | None = None,
+) -> (
+    list[
+        tuple[
+            Float32[np.ndarray, "len_agents_batch num_params"],
+            np.ndarray[Any, Any],  # state buffers
+        ]
+    ]
+    | None
+):
+    """Stacks the agents' parameters & state buffers per population.
+
+    Args:
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        buffers: See :paramref:`~.snapshot.buffers`.
+
+    Returns:
+        The parameter & state buffer matrices of each population, or
+            ``None`` if the agents cannot be saved with the
+            ``"columnar"`` layout.
+    """
+    try:
+        return [
+            (
+                snapshot(
+                    arrays=[
+                        agents[j].get_params().numpy()
+                        for agents in agents_batch
+                    ],
+                    name=f"params_{j}",
+                    buffers=buffers,
+                ),
+                snapshot(
+                    arrays=[
+                        agents[j].get_state_buffer() for agents in agents_batch
+                    ],
+                    name=f"state_{j}",
+                    buffers=buffers,
+                ),
+            )
+            for j in range(len(agents_batch[0]))
+        ]
+    except (TypeError, ValueError):
+        return None
+
+
+def serialize_shard(
+    agents_batch: list[list[BaseAgent]],
+    shard_idx: An[int, ge(0)],
+    columns: (
+        list[
+            tuple[
+                Float32[np.ndarray, "len_agents_batch num_params"],
+                np.ndarray[Any, Any],
+            ]
+        ]
+        | None
+    ),
+    *,
+    save_params: bool = True,
+) -> tuple[list[tuple[str, list[bytes] | np.ndarray[Any, Any]]], list[int]]:
+    """Lists the files making up a shard.
+
+    Agents are only serialized here with the ``"pickle"`` layout, the
+    matrices of the ``"columnar"`` layout being serialized while they
+    are written (see :func:`write_file`).
+
+    Args:
+        agents_batch: See
+            :paramref:`~.compute_generation_results.agents_batch`.
+        shard_idx: The shard index.
+        columns: See return value of :func:`get_columns`. ``None``
+            means that the ``"pickle"`` layout is used.
+        save_params: Whether to save the parameter matrices with the
+            ``"columnar"`` layout (``False`` for ``"lineage"`` save
+            points).
+
+    Returns:
+        * The shard files, see :func:`get_shard_files`, and their
+            content, see :paramref:`~.write_file.content`.
+        * The byte offset of each agent in the shard's file (empty
+            with the ``"columnar"`` layout).
+    """
+    if columns is not None:
+        files: list[tuple[str, list[bytes] | np.ndarray[Any, Any]]] = []
+        for pop_idx, (params, state_buffers) in enumerate(columns):
+            if save_params:
+                files.append((f"params_{pop_idx}_{shard_idx}.npy", params))
+            files.append((f"state_{pop_idx}_{shard_idx}.npy", state_buffers))
+        return files, []
+    chunks = [pickle.dumps(obj=agents) for agents in agents_batch]
+    offsets = [0]
+    for chunk in chunks[:-1]:
+        offsets.append(offsets[-1] + len(chunk))
+    return [(f"agents_{shard_idx}.pkl", chunks)], offsets
+
+
+def serialize_manifest(  # noqa: PLR0913
+    layout: An[str, one_of("columnar", "pickle")],
+    num_pops: An[int, ge(1)],
+    shard_sizes: list[int],
+    shard_offsets: list[list[int]],
+    total_num_env_steps: An[int, ge(0)],
+    base_gen: An[int, ge(1)] | None = None,
+) -> bytes:
+    """Serializes a manifest, see the module docstring.
+
+    Args:
+        layout: The agents' layout.
+        num_pops: See :meth:`~.BaseSpace.num_pops`.
+        shard_sizes: The number of agents held by each shard.
+        shard_offsets: See return value of :func:`serialize_shard`,
+            for each shard.
+        total_num_env_steps: See
+            :paramref:`~.compute_total_num_env_steps_and_process_fitnesses.total_num_env_steps`.
+        base_gen: The generation of the ``"full"`` save point of a
+            ``"lineage"`` save point, ``None`` for ``"full"`` save
+            points.
+
+    Returns:
+        The content of ``manifest.json``.
+    """
+    manifest: dict[str, Any] = {
+        "version": FORMAT_VERSION,
+        "layout": layout,
+        "num_pops": num_pops,
+        "shard_sizes": shard_sizes,
+        "total_num_env_steps": total_num_env_steps,
+        "base_gen": base_gen,
+    }
+    if layout == "pickle":
+        manifest["shard_offsets"] = shard_offsets
+    return json.dumps(obj=manifest).encode()
+
+
+class GenealogyRecorder:
+    """Records genealogies for ``"lineage"`` save points.
+
+    The pairing & seeds of every generation are to be recorded (see
+    :meth:`record`) by all processes, whether or not the generation
+    is a save point. A ``"lineage"`` save point is only saved if every
+    generation since the previous ``"full"`` save point was recorded.
+
+    Args:
+        save_full_interval: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.save_full_interval`.
+
+    Attributes:
+        full_save_gen (int | None): The generation of the latest
+            ``"full"`` save point of the run.
+        genealogies (list[Genealogy_type]): The output of
+            :func:`.compute_genealogy` for every generation since
+            :attr:`full_save_gen` (only filled by the primary
+            process).
+        recorded_gen (int | None): The latest recorded generation.
+    """
+
+    def __init__(
+        self: "GenealogyRecorder",
+        save_full_interval: An[int, ge(1)],
+    ) -> None:
+        self.save_full_interval = save_full_interval
+        self.full_save_gen: int | None = None
+        self.genealogies: list[Genealogy_type] = []
+        self.recorded_gen: int | None = None
+
+    def record(
+        self: "GenealogyRecorder",
+        genealogy: Genealogy_type | None,
+        curr_gen: An[int, ge(1)],
+    ) -> None:
+        """Records a generation's genealogy.
+
+        Args:
+            genealogy: See return value of :func:`.compute_genealogy`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Raises:
+            ValueError: If the previous generation was not recorded
+                since the previous ``"full"`` save point.
+        """
+        if self.full_save_gen is not None and curr_gen - 1 != (
+            self.recorded_gen or self.full_save_gen
+        ):
+            error_msg = (
+                f"Recording the genealogy of generation {curr_gen} but "
+                f"the latest recorded generation is {self.recorded_gen}."
+            )
+            raise ValueError(error_msg)
+        if genealogy is not None:
+            self.genealogies.append(genealogy)
+        self.recorded_gen = curr_gen
+
+    def get_base_gen(
+        self: "GenealogyRecorder",
+        curr_gen: An[int, ge(1)],
+    ) -> int | None:
+        """Returns the base generation of a ``"lineage"`` save point.
+
+        Args:
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            :attr:`full_save_gen`, or ``None`` if a ``"full"`` save
+                point is due (or if :paramref:`curr_gen` was not
+                recorded).
+        """
+        if (
+            self.full_save_gen is None
+            or self.recorded_gen != curr_gen
+            or curr_gen - self.full_save_gen >= self.save_full_interval
+        ):
+            return None
+        return self.full_save_gen
+
+    def reset(self: "GenealogyRecorder", curr_gen: An[int, ge(1)]) -> None:
+        """Marks a ``"full"`` save point.
+
+        Args:
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+        """
+        self.full_save_gen = curr_gen
+        self.genealogies = []
+        self.recorded_gen = None
+
+
+def save_state(  # noqa: PLR0913
     agents_batch: list[list[BaseAgent]],
     generation_results: Generation_results_type | None,
     total_num_env_steps: An[int, ge(0)] | None,
     curr_gen: An[int, ge(1)],
     output_dir: str,
+    templates: list[BaseAgent],
+    writer: CheckpointWriter | None = None,
+    genealogy_recorder: GenealogyRecorder | None = None,
 ) -> None:
     """Dump the current experiment state to disk.
 
@@ -102,28 +1095,216 @@ def save_state(
         curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
         output_dir: See
             :paramref:`~.BaseSubtaskConfig.output_dir`.
+        templates: One agent per population, freshly built from the
+            agent configuration (see :func:`.initialize_agents`), to
+            complete the ``"columnar"`` layout with.
+        writer: The :class:`CheckpointWriter` to hand the serialized
+            state over to. ``None`` means that the state is written to
+            disk before returning.
+        genealogy_recorder: The :class:`GenealogyRecorder` to save a
+            ``"lineage"`` save point with (when due and unless the
+            agents are saved with the ``"pickle"`` layout). ``None``
+            means that a ``"full"`` save point is saved.
     """
     comm, rank, _ = get_mpi_variables()
-    batched_agents: list[list[list[BaseAgent]]] | None = comm.gather(
-        sendobj=agents_batch,
+    path = Path(f"{output_dir}/{curr_gen}")
+    (path / "shards").mkdir(parents=True, exist_ok=True)
+    buffers = None if writer is None else writer.get_buffers()
+    # The agents are snapshotted right away as they are modified by the
+    # next generation.
+    columns = get_columns(agents_batch=agents_batch, buffers=buffers)
+    if not comm.allreduce(sendobj=columns is not None, op=MPI.LAND):
+        columns = None
+    base_gen = (
+        None
+        if columns is None or genealogy_recorder is None
+        else genealogy_recorder.get_base_gen(curr_gen=curr_gen)
     )
-    if rank != 0:
+    shard_files, offsets = serialize_shard(
+        agents_batch=agents_batch,
+        shard_idx=rank,
+        columns=columns,
+        save_params=base_gen is None,
+    )
+    files = [
+        (path / "shards" / name, content) for name, content in shard_files
+    ]
+    shard_info: list[tuple[int, list[int]]] | None = comm.gather(
+        sendobj=(len(agents_batch), offsets),
+    )
+    manifest_file = None
+    if rank == 0:
+        # `shard_info`, `generation_results`, and `total_num_env_steps`
+        # are only `None` when `rank != 0`. The following `assert`
+        # statements are for static type checking reasons and have no
+        # execution purposes.
+        assert shard_info is not None  # noqa: S101
+        assert generation_results is not None  # noqa: S101
+        assert total_num_env_steps is not None  # noqa: S101
+        if columns is not None:
+            files.append(
+                (path / "templates.pkl", [pickle.dumps(obj=templates)]),
+            )
+        if base_gen is not None:
+            # `genealogy_recorder` is only `None` when `base_gen` is.
+            # The following `assert` statement is for static type
+            # checking reasons and has no execution purposes.
+            assert genealogy_recorder is not None  # noqa: S101
+            files.append(
+                (
+                    path / "genealogy.npy",
+                    np.stack(arrays=genealogy_recorder.genealogies),
+                ),
+            )
+        files.append(
+            (
+                path / "generation_results.npy",
+                # Copied as it is filled in place by the next
+                # generation.
+                snapshot(
+                    arrays=generation_results,
+                    name="generation_results",
+                    buffers=buffers,
+                ),
+            ),
+        )
+        manifest_file = (
+            path / "manifest.json",
+            [
+                serialize_manifest(
+                    layout="pickle" if columns is None else "columnar",
+                    num_pops=len(agents_batch[0]),
+                    shard_sizes=[shard_size for shard_size, _ in shard_info],
+                    shard_offsets=[
+                        shard_offsets for _, shard_offsets in shard_info
+                    ],
+                    total_num_env_steps=total_num_env_steps,
+                    base_gen=base_gen,
+                ),
+            ],
+        )
+    if writer is not None:
+        writer.put(
+            files=files,
+            manifest_file=manifest_file,
+            buffers=buffers,
+            synchronize=True,
+        )
+    else:
+        for file_path, content in files:
+            write_file(path=file_path, content=content)
+        # The manifest is only written once all of the shards are.
+        comm.Barrier()
+        if manifest_file is not None:
+            write_file(path=manifest_file[0], content=manifest_file[1])
+    if genealogy_recorder is not None and base_gen is None:
+        genealogy_recorder.reset(curr_gen=curr_gen)
+
+
+def write_state(  # noqa: PLR0913
+    path: Path,
+    agents_batch: list[list[BaseAgent]],
+    generation_results: Generation_results_type,
+    total_num_env_steps: An[int, ge(0)],
+    templates: list[BaseAgent] | None,
+    writer: CheckpointWriter | None = None,
+) -> None:
+    """Saves a state held by a single process (as a single shard).
+
+    Args:
+        path: The saved state's directory.
+        agents_batch: All of the agents, see
+            :paramref:`~.compute_generation_results.agents_batch`.
+        generation_results: See
+            :paramref:`~.compute_generation_results.generation_results`.
+        total_num_env_steps: See
+            :paramref:`~.compute_total_num_env_steps_and_process_fitnesses.total_num_env_steps`.
+        templates: See :paramref:`~.save_state.templates`. ``None``
+            means that the ``"pickle"`` layout is used.
+        writer: See :paramref:`~.save_state.writer`.
+    """
+    buffers = None if writer is None else writer.get_buffers()
+    columns = (
+        None
+        if templates is None
+        else get_columns(agents_batch=agents_batch, buffers=buffers)
+    )
+    shard_files, offsets = serialize_shard(
+        agents_batch=agents_batch,
+        shard_idx=0,
+        columns=columns,
+    )
+    (path / "shards").mkdir(parents=True, exist_ok=True)
+    files = [
+        (path / "shards" / name, content) for name, content in shard_files
+    ]
+    if columns is not None:
+        files.append((path / "templates.pkl", [pickle.dumps(obj=templates)]))
+    files.append((path / "generation_results.npy", generation_results))
+    manifest_file = (
+        path / "manifest.json",
+        [
+            serialize_manifest(
+                layout="pickle" if columns is None else "columnar",
+                num_pops=len(agents_batch[0]),
+                shard_sizes=[len(agents_batch)],
+                shard_offsets=[offsets],
+                total_num_env_steps=total_num_env_steps,
+            ),
+        ],
+    )
+    if writer is not None:
+        writer.put(
+            files=files,
+            manifest_file=manifest_file,
+            buffers=buffers,
+            synchronize=False,
+        )
         return
-    # `batched_agents`, `generation_results`, and `total_num_env_steps`
-    # are only  `None` when `rank != 0`. The following `assert`
-    # statements are for static type checking reasons and have no
-    # execution purposes.
-    assert batched_agents is not None  # noqa: S101
-    assert generation_results is not None  # noqa: S101
-    assert total_num_env_steps is not None  # noqa: S101
-    agents: list[list[BaseAgent]] = []
-    for agent_batch in batched_agents:
-        agents = agents + agent_batch
-    path = Path(f"{output_dir}/{curr_gen}/state.pkl")
-    if not path.parent.exists():
-        path.parent.mkdir(parents=True)
-    with path.open(mode="wb") as f:
-        pickle.dump(
-            obj=[agents, generation_results, total_num_env_steps],
+    for file_path, content in [*files, manifest_file]:
+        write_file(path=file_path, content=content)
+
+
+def convert_state(path: Path) -> None:
+    """Converts a state saved in the former format.
+
+    The converted state is saved as a single shard, with the
+    ``"pickle"`` layout as the agents are read back whole, next to the
+    original ``state.pkl`` file, which is left untouched.
+
+    Args:
+        path: The saved state's directory.
+    """
+    with (path / "state.pkl").open(mode="rb") as f:
+        agents_batch, generation_results, total_num_env_steps = pickle.load(
             file=f,
         )
+    write_state(
+        path=path,
+        agents_batch=agents_batch,
+        generation_results=generation_results,
+        total_num_env_steps=total_num_env_steps,
+        templates=None,
+    )
+
+
+def convert_states(output_dir: str) -> None:
+    """Converts all states saved in the former format.
+
+    Conversion is performed by the primary process, which all other
+    processes wait for.
+
+    Args:
+        output_dir: See
+            :paramref:`~.BaseSubtaskConfig.output_dir`.
+    """
+    comm, rank, _ = get_mpi_variables()
+    if rank == 0:
+        for save_path in Path(output_dir).glob(pattern="*"):
+            if (
+                save_path.name.isdigit()
+                and (save_path / "state.pkl").is_file()
+                and not is_complete(path=save_path)
+            ):
+                convert_state(path=save_path)
+    comm.Barrier()
@@ -0,0 +1,227 @@
+import copy
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+from torch import Tensor
+
+from common.optim.ne.agent import BaseAgent, BaseAgentConfig
+
+from .compute import compute_genealogy
+from .evolve import mutate_agent
+from .readwrite import (
+    GenealogyRecorder,
+    MaterializationCache,
+    get_columns,
+    is_complete,
+    load_agents,
+    load_manifest,
+    materialize_params,
+    serialize_manifest,
+    serialize_shard,
+    write_file,
+    write_state,
+)
+
+POP_SIZE = 8
+NUM_PARAMS = 5
+
+
+class VectorAgent(BaseAgent):
+    def __init__(self: "VectorAgent") -> None:
+        super().__init__(
+            config=BaseAgentConfig(
+                env_transfer=False,
+                fit_transfer=False,
+                mem_transfer=False,
+            ),
+            pop_idx=0,
+            pops_are_merged=False,
+        )
+        self.params = torch.zeros(NUM_PARAMS)
+
+    def get_params(self: "VectorAgent") -> Tensor:
+        return self.params.clone()
+
+    def set_params(self: "VectorAgent", params: Tensor) -> None:
+        self.params = params.clone()
+
+    def mutate(self: "VectorAgent") -> None:
+        self.params += torch.randn(NUM_PARAMS, generator=self.generator)
+
+    def mutate_with_noise(self: "VectorAgent", noise: Tensor) -> None:
+        self.params += noise
+
+    def reset(self: "VectorAgent") -> None:
+        pass
+
+    def __call__(self: "VectorAgent", x: Tensor) -> Tensor:
+        return x
+
+
+def evolve_generation(
+    agents: list[VectorAgent],
+    curr_gen: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    seeds = rng.integers(2**32, size=(POP_SIZE, 1), dtype=np.uint32)
+    exchange_and_mutate_info = np.zeros((POP_SIZE, 1, 4), dtype=np.uint32)
+    ranking = rng.permutation(POP_SIZE)
+    # The top half replaces the bottom half.
+    exchange_and_mutate_info[ranking[POP_SIZE // 2 :], 0, 2] = 1
+    exchange_and_mutate_info[ranking, 0, 1] = np.roll(ranking, POP_SIZE // 2)
+    genealogy = compute_genealogy(
+        exchange_and_mutate_info=exchange_and_mutate_info,
+        seeds=seeds,
+        curr_gen=curr_gen,
+    )
+    assert genealogy is not None
+    parents = [copy.deepcopy(agent) for agent in agents]
+    for i in range(POP_SIZE):
+        agents[i] = copy.deepcopy(parents[genealogy[i, 0, 0]])
+        mutate_agent(agent=agents[i], seed=int(seeds[i, 0]), noise_table=None)
+    return genealogy
+
+
+@pytest.mark.parametrize("cache_size", [0, 4 * POP_SIZE])
+def test_materialize_params_round_trip(
+    tmp_path: Path,
+    cache_size: int,
+) -> None:
+    rng = np.random.default_rng(seed=0)
+    agents = [VectorAgent() for _ in range(POP_SIZE)]
+    for agent in agents:
+        agent.set_params(params=torch.randn(NUM_PARAMS))
+    recorder = GenealogyRecorder(save_full_interval=10)
+    recorder.record(
+        genealogy=evolve_generation(agents=agents, curr_gen=1, rng=rng),
+        curr_gen=1,
+    )
+    (tmp_path / "1").mkdir()
+    write_state(
+        path=tmp_path / "1",
+        agents_batch=[[agent] for agent in agents],
+        generation_results=np.zeros((POP_SIZE, 1, 3), dtype=np.float32),
+        total_num_env_steps=0,
+        templates=[VectorAgent()],
+    )
+    recorder.reset(curr_gen=1)
+    for curr_gen in range(2, 5):
+        recorder.record(
+            genealogy=evolve_generation(
+                agents=agents,
+                curr_gen=curr_gen,
+                rng=rng,
+            ),
+            curr_gen=curr_gen,
+        )
+    assert recorder.get_base_gen(curr_gen=4) == 1
+    genealogy = np.stack(recorder.genealogies)
+    cache = MaterializationCache(max_size=cache_size)
+    for idx, agent in enumerate(agents):
+        materialized_agent = VectorAgent()
+        materialize_params(
+            agent=materialized_agent,
+            path=tmp_path / "4",
+            manifest=load_manifest(path=tmp_path / "1") | {"base_gen": 1},
+            pop_idx=0,
+            idx=idx,
+            genealogy=genealogy,
+            noise_table=None,
+            cache=cache,
+        )
+        assert torch.equal(materialized_agent.get_params(), agent.params)
+
+
+def test_genealogy_recorder_requires_every_generation() -> None:
+    recorder = GenealogyRecorder(save_full_interval=10)
+    recorder.reset(curr_gen=1)
+    recorder.record(genealogy=None, curr_gen=2)
+    assert recorder.get_base_gen(curr_gen=3) is None
+    with pytest.raises(ValueError, match="generation 4"):
+        recorder.record(genealogy=None, curr_gen=4)
+
+
+def save_shards(
+    path: Path,
+    agents: list[VectorAgent],
+    shard_sizes: list[int],
+    *,
+    columnar: bool,
+) -> None:
+    # Mirrors `save_state` run by `len(shard_sizes)` processes.
+    (path / "shards").mkdir(parents=True)
+    starts = np.cumsum([0, *shard_sizes])
+    shard_offsets = []
+    for shard_idx in range(len(shard_sizes)):
+        shard = [
+            [agent]
+            for agent in agents[starts[shard_idx] : starts[shard_idx + 1]]
+        ]
+        shard_files, offsets = serialize_shard(
+            agents_batch=shard,
+            shard_idx=shard_idx,
+            columns=get_columns(agents_batch=shard) if columnar else None,
+        )
+        for name, content in shard_files:
+            write_file(path=path / "shards" / name, content=content)
+        shard_offsets.append(offsets)
+    if columnar:
+        write_file(
+            path=path / "templates.pkl",
+            content=[pickle.dumps(obj=[VectorAgent()])],
+        )
+    write_file(
+        path=path / "generation_results.npy",
+        content=np.zeros((len(agents), 1, 3), dtype=np.float32),
+    )
+    write_file(
+        path=path / "manifest.json",
+        content=[
+            serialize_manifest(
+                layout="columnar" if columnar else "pickle",
+                num_pops=1,
+                shard_sizes=shard_sizes,
+                shard_offsets=shard_offsets,
+                total_num_env_steps=0,
+            ),
+        ],
+    )
+
+
+@pytest.mark.parametrize("columnar", [True, False])
+@pytest.mark.parametrize("num_loading_processes", [1, 2, 4, 8])
+def test_load_agents_resharded(
+    tmp_path: Path,
+    num_loading_processes: int,
+    *,
+    columnar: bool,
+) -> None:
+    agents = [VectorAgent() for _ in range(POP_SIZE)]
+    for agent in agents:
+        agent.set_params(params=torch.randn(NUM_PARAMS))
+        agent.total_num_steps = int(torch.randint(100, size=()))
+    # Saved by 3 processes, the last of which maintained fewer agents.
+    save_shards(
+        path=tmp_path,
+        agents=agents,
+        shard_sizes=[3, 3, 2],
+        columnar=columnar,
+    )
+    assert is_complete(path=tmp_path)
+    manifest = load_manifest(path=tmp_path)
+    len_agents_batch = POP_SIZE // num_loading_processes
+    for rank in range(num_loading_processes):
+        indices = list(
+            range(rank * len_agents_batch, (rank + 1) * len_agents_batch),
+        )
+        agents_batch = load_agents(
+            path=tmp_path,
+            manifest=manifest,
+            indices=indices,
+        )
+        for (loaded_agent,), idx in zip(agents_batch, indices, strict=True):
+            assert torch.equal(loaded_agent.params, agents[idx].params)
+            assert loaded_agent.total_num_steps == agents[idx].total_num_steps
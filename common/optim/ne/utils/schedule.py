@@ -0,0 +1,220 @@
+""":class:`.WorkStealingScheduler`."""
+
+import logging
+import time
+from collections import deque
+from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+from mpi4py import MPI
+
+from common.optim.ne.agent import BaseAgent
+from common.optim.ne.space.base import BaseSpace
+from common.optim.ne.utils.wandb import log_metrics
+from common.utils.beartype import ge
+from common.utils.mpi4py import get_mpi_variables
+
+log = logging.getLogger(__name__)
+
+STEAL_TAG = 0
+WORK_TAG = 1
+RESULT_TAG = 2
+
+
+class WorkStealingScheduler:
+    """Balances the evaluation of agents across processes.
+
+    Each process evaluates the agents it maintains one element of
+    :paramref:`~.compute_generation_results.agents_batch` at a time.
+    A process out of agents to evaluate asks the other processes, one
+    after the other, for one of the elements they have yet to start
+    evaluating, evaluates it and sends the evaluated agents &
+    their evaluation output back to the process maintaining them,
+    which keeps the generation from waiting on the process whose
+    agents happen to take the longest to evaluate. Processes answer
+    requests in between evaluations and the evaluation phase ends
+    once no process is left with agents to evaluate, which is
+    detected through a non-blocking barrier. The time each process
+    spends without agents to evaluate is logged every generation.
+
+    Args:
+        space: See :paramref:`~.evaluate_on_cpu.space`.
+
+    Attributes:
+        comm (mpi4py.MPI.Comm): A duplicate of the MPI communicator,
+            so that requests cannot be mistaken for messages exchanged
+            by the rest of the execution.
+    """
+
+    def __init__(self: "WorkStealingScheduler", space: BaseSpace) -> None:
+        comm, _, _ = get_mpi_variables()
+        self.comm = comm.Dup()
+        self.space = space
+
+    def evaluate(
+        self: "WorkStealingScheduler",
+        agents_batch: list[list[BaseAgent]],
+        curr_gen: An[int, ge(1)],
+    ) -> list[tuple[np.ndarray[np.float32, Any], float | None]]:
+        """Evaluates :paramref:`agents_batch` with the other processes.
+
+        Collective over all processes. Evaluated agents received from
+        other processes replace their counterpart in
+        :paramref:`agents_batch`.
+
+        Args:
+            agents_batch: See
+                :paramref:`~.compute_generation_results.agents_batch`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            See return value of :meth:`~.EvaluationThreadPool.evaluate`.
+        """
+        rank, size = self.comm.Get_rank(), self.comm.Get_size()
+        self.agents_batch = agents_batch
+        self.curr_gen = curr_gen
+        self.outputs: list[Any] = [None] * len(agents_batch)
+        # Indices of the elements of `agents_batch` left to evaluate.
+        self.pending = deque(range(len(agents_batch)))
+        self.victims = deque((rank + k) % size for k in range(1, size))
+        self.num_lent = 0
+        self.awaiting_reply = False
+        self.send_req: list[MPI.Request] = []
+        self.busy_time = 0.0
+        start_time = time.time()
+        # The values to log are returned to the processes maintaining
+        # the agents, which buffer them (see `evaluate_on_cpu`).
+        logging_enabled = self.space.config.logging
+        self.space.config.logging = False
+        barrier_req: MPI.Request | None = None
+        status = MPI.Status()
+        while barrier_req is None or not barrier_req.Test():
+            while self.comm.Iprobe(status=status):
+                self.serve(status=status)
+            if self.pending:
+                i = self.pending.popleft()
+                self.outputs[i] = self.evaluate_agents(agents_batch[i])
+            elif self.victims and not self.awaiting_reply:
+                self.send(obj=None, dest=self.victims.popleft(), tag=STEAL_TAG)
+                self.awaiting_reply = True
+            elif self.awaiting_reply or self.num_lent:
+                self.comm.Probe(status=status)
+            elif barrier_req is None:
+                # This process no longer needs any other process.
+                barrier_req = self.comm.Ibarrier()
+        MPI.Request.waitall(self.send_req)
+        self.space.config.logging = logging_enabled
+        self.report(idle_time=time.time() - start_time - self.busy_time)
+        return self.outputs
+
+    def evaluate_agents(
+        self: "WorkStealingScheduler",
+        agents: list[BaseAgent],
+    ) -> tuple[np.ndarray[np.float32, Any], float | None]:
+        """Evaluates :paramref:`agents`.
+
+        Args:
+            agents: See :paramref:`~.BaseSpace.evaluate.agents`.
+
+        Returns:
+            See return value of
+            :meth:`~.EvaluationThreadPool.evaluate_agents`.
+        """
+        start_time = time.time()
+        fitnesses_and_num_env_steps = self.space.evaluate(
+            agents=[agents],
+            curr_gen=self.curr_gen,
+        )
+        self.busy_time += time.time() - start_time
+        return fitnesses_and_num_env_steps, self.space.logged_score
+
+    def send(
+        self: "WorkStealingScheduler",
+        obj: Any,  # noqa: ANN401
+        dest: An[int, ge(0)],
+        tag: An[int, ge(0)],
+    ) -> None:
+        """Sends :paramref:`obj` without blocking.
+
+        Blocking sends could deadlock with a process sending to this
+        process at the same time.
+
+        Args:
+            obj: The object to send.
+            dest: The rank of the receiving process.
+            tag: The message's tag.
+        """
+        self.send_req.append(self.comm.isend(obj, dest=dest, tag=tag))
+
+    def serve(self: "WorkStealingScheduler", status: MPI.Status) -> None:
+        """Receives & handles a probed message.
+
+        Args:
+            status: The status of the probed message.
+        """
+        source, tag = status.Get_source(), status.Get_tag()
+        obj = self.comm.recv(source=source, tag=tag)
+        if tag == STEAL_TAG:
+            # Lends the element that this process would evaluate last.
+            i = self.pending.pop() if self.pending else None
+            self.send(
+                obj=(
+                    None
+                    if i is None
+                    else (
+                        i,
+                        self.agents_batch[i],
+                        # Generators are not pickled, see `BaseAgent`.
+                        [
+                            agent.generator.get_state()
+                            for agent in self.agents_batch[i]
+                        ],
+                    )
+                ),
+                dest=source,
+                tag=WORK_TAG,
+            )
+            self.num_lent += i is not None
+        elif tag == WORK_TAG:
+            self.awaiting_reply = False
+            if obj is None:
+                return
+            i, agents, generator_states = obj
+            for agent, generator_state in zip(
+                agents,
+                generator_states,
+                strict=True,
+            ):
+                agent.generator.set_state(generator_state)
+            self.send(
+                obj=(i, agents, self.evaluate_agents(agents)),
+                dest=source,
+                tag=RESULT_TAG,
+            )
+            # Further requests to the same process could succeed.
+            self.victims.appendleft(source)
+        else:
+            i, agents, output = obj
+            self.agents_batch[i] = agents
+            self.outputs[i] = output
+            self.num_lent -= 1
+
+    def report(self: "WorkStealingScheduler", idle_time: float) -> None:
+        """Logs the time each process spent without agents to evaluate.
+
+        Args:
+            idle_time: The time this process spent without agents to
+                evaluate during the generation's evaluation phase.
+        """
+        idle_times: list[float] | None = self.comm.gather(sendobj=idle_time)
+        if idle_times is None:
+            return
+        log.info(f"Idle time per process: {np.round(idle_times, 3)}")
+        log_metrics(
+            data={
+                "idle_time_mean": np.mean(idle_times),
+                "idle_time_max": np.max(idle_times),
+            },
+            commit=False,
+        )
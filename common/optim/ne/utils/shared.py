@@ -0,0 +1,231 @@
+""":class:`.SharedAgentBuffers`."""
+
+from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+import torch
+from mpi4py import MPI
+
+from common.optim.ne.agent import BaseAgent
+from common.utils.beartype import ge
+from common.utils.mpi4py import get_mpi_variables
+
+
+class SharedAgentBuffers:
+    """Node-wide shared memory through which agents are exchanged.
+
+    Selected agents paired with a non-selected agent maintained by
+    another process of the same node are written, as flat parameters
+    (see :meth:`~.BaseAgent.get_params`) and non-parameter state (see
+    :meth:`~.BaseAgent.get_state_buffer`), into MPI shared memory
+    windows that the receiving process reads from, which leaves
+    point-to-point messaging to inter-node exchanges. The windows are
+    allocated upon the first exchange, once the size of the agents'
+    state buffers is known, which must be the same for all agents of a
+    population on the node.
+
+    Args:
+        len_agents_batch: See
+            :paramref:`~.initialize_agents.len_agents_batch`.
+
+    Attributes:
+        node_ranks (dict[int, int]): Maps the rank of each process of
+            the node to its rank within the node.
+        params (list[numpy.ndarray]): One ``node_size`` x
+            ``len_agents_batch`` x ``num_params`` array per population.
+        state_buffers (list[numpy.ndarray]): One ``node_size`` x
+            ``len_agents_batch`` x ``n`` array per population.
+    """
+
+    def __init__(
+        self: "SharedAgentBuffers",
+        len_agents_batch: An[int, ge(1)],
+    ) -> None:
+        comm, rank, _ = get_mpi_variables()
+        self.node_comm = comm.Split_type(split_type=MPI.COMM_TYPE_SHARED)
+        self.node_ranks = {
+            node_member: node_rank
+            for node_rank, node_member in enumerate(
+                self.node_comm.allgather(rank),
+            )
+        }
+        self.len_agents_batch = len_agents_batch
+        # The windows must be kept alive for as long as the arrays are
+        # used.
+        self.wins: list[MPI.Win] = []
+        self.params: list[np.ndarray[Any, Any]] = []
+        self.state_buffers: list[np.ndarray[Any, Any]] = []
+
+    def allocate(
+        self: "SharedAgentBuffers",
+        agents_batch: list[list[BaseAgent]],
+    ) -> None:
+        """Allocates the windows if not already allocated.
+
+        Collective over the processes of the node.
+
+        Args:
+            agents_batch: See
+                :paramref:`~.compute_generation_results.agents_batch`.
+        """
+        if self.wins:
+            return
+        for j in range(len(agents_batch[0])):
+            self.params.append(
+                self.allocate_array(
+                    width=self.get_node_width(
+                        widths=[
+                            agents[j].get_params().numel()
+                            for agents in agents_batch
+                        ],
+                    ),
+                    dtype=np.float32,
+                ),
+            )
+            self.state_buffers.append(
+                self.allocate_array(
+                    width=self.get_node_width(
+                        widths=[
+                            len(agents[j].get_state_buffer())
+                            for agents in agents_batch
+                        ],
+                    ),
+                    dtype=np.float64,
+                ),
+            )
+
+    def get_node_width(
+        self: "SharedAgentBuffers",
+        widths: list[int],
+    ) -> int:
+        """Returns the number of values per agent shared by the node.
+
+        Collective over the processes of the node.
+
+        Args:
+            widths: The number of values of each agent of the process.
+
+        Returns:
+            The number of values of every agent of the node.
+
+        Raises:
+            ValueError: If agents of the node differ in their number
+                of values.
+        """
+        min_width, max_width = self.node_comm.allreduce(
+            sendobj=(min(widths), -max(widths)),
+            op=MPI.MIN,
+        )
+        if min_width != -max_width:
+            error_msg = (
+                "`exchange = buffer` requires all agents of a population "
+                f"to have as many values, found from {min_width} to "
+                f"{-max_width}."
+            )
+            raise ValueError(error_msg)
+        return int(min_width)
+
+    def allocate_array(
+        self: "SharedAgentBuffers",
+        width: An[int, ge(0)],
+        dtype: type[np.floating[Any]],
+    ) -> np.ndarray[Any, Any]:
+        """Allocates a window & returns it as an array.
+
+        Args:
+            width: Number of values per agent.
+            dtype: The type of the values.
+
+        Returns:
+            A ``node_size`` x ``len_agents_batch`` x :paramref:`width`
+                array backed by the window.
+        """
+        shape = (self.node_comm.Get_size(), self.len_agents_batch, width)
+        itemsize = np.dtype(dtype).itemsize
+        win = MPI.Win.Allocate_shared(
+            size=(
+                int(np.prod(shape)) * itemsize
+                if self.node_comm.Get_rank() == 0
+                else 0
+            ),
+            disp_unit=itemsize,
+            comm=self.node_comm,
+        )
+        self.wins.append(win)
+        buf, _ = win.Shared_query(rank=0)
+        return np.ndarray(buffer=buf, dtype=dtype, shape=shape)
+
+    def is_on_node(
+        self: "SharedAgentBuffers",
+        rank: An[int, ge(0)],
+    ) -> bool:
+        """Whether process :paramref:`rank` belongs to the node.
+
+        Args:
+            rank: A process rank.
+
+        Returns:
+            See above.
+        """
+        return rank in self.node_ranks
+
+    def write(
+        self: "SharedAgentBuffers",
+        agent: BaseAgent,
+        i: An[int, ge(0)],
+        j: An[int, ge(0)],
+    ) -> None:
+        """Writes a sent agent into the windows.
+
+        Args:
+            agent: The agent to send.
+            i: The agent's index in
+                :paramref:`~.compute_generation_results.agents_batch`.
+            j: The agent's population index.
+
+        Raises:
+            ValueError: If the agent's state buffer does not have the
+                size the windows were allocated with.
+        """
+        node_rank = self.node_comm.Get_rank()
+        state_buffer = agent.get_state_buffer()
+        if len(state_buffer) != self.state_buffers[j].shape[-1]:
+            error_msg = (
+                f"The agent's state buffer holds {len(state_buffer)} "
+                f"values, expected {self.state_buffers[j].shape[-1]}."
+            )
+            raise ValueError(error_msg)
+        self.params[j][node_rank, i] = agent.get_params().numpy()
+        self.state_buffers[j][node_rank, i] = state_buffer
+
+    def sync(self: "SharedAgentBuffers") -> None:
+        """Waits for all processes of the node to be done writing.
+
+        Processes cannot start writing the next generation's agents
+        before all processes are done reading since the generation
+        results gathering in between requires all processes.
+        """
+        self.node_comm.Barrier()
+
+    def read(
+        self: "SharedAgentBuffers",
+        agent: BaseAgent,
+        position: An[int, ge(0)],
+        j: An[int, ge(0)],
+    ) -> None:
+        """Copies a received agent from the windows.
+
+        Args:
+            agent: The agent to be replaced.
+            position: The position of the sent agent in the
+                population.
+            j: The agents' population index.
+        """
+        node_rank = self.node_ranks[position // self.len_agents_batch]
+        i = position % self.len_agents_batch
+        agent.set_params(params=torch.from_numpy(self.params[j][node_rank, i]))
+        # Copied since the loaded state can hold views of the buffer.
+        agent.set_state_buffer(
+            state_buffer=self.state_buffers[j][node_rank, i].copy(),
+        )
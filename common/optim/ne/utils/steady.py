@@ -0,0 +1,344 @@
+""":class:`.SteadyStateCoordinator` & :func:`.work`."""
+
+import logging
+import pickle
+import time
+from functools import partial
+from pathlib import Path
+from typing import Annotated as An
+
+import numpy as np
+from mpi4py import MPI
+
+from common.optim.ne.agent import BaseAgent
+from common.optim.ne.space.base import BaseSpace
+from common.optim.ne.utils.evolve import evaluate_on_cpu, mutate_agent
+from common.optim.ne.utils.noise import NoiseTable
+from common.optim.ne.utils.readwrite import (
+    CheckpointWriter,
+    MaterializationCache,
+    load_agents,
+    load_generation_results,
+    load_manifest,
+    write_file,
+    write_state,
+)
+from common.optim.ne.utils.wandb import log_metrics
+from common.utils.beartype import ge
+from common.utils.misc import seed_all
+from common.utils.mpi4py import get_mpi_variables
+
+log = logging.getLogger(__name__)
+
+
+class SteadyStateCoordinator:
+    """Maintains the population during steady-state evolution.
+
+    Run by the primary process, which hands the secondary processes
+    agents to mutate & evaluate (see :func:`work`) one at a time and
+    collects them back as soon as they are evaluated, without any
+    barrier. An evaluated agent replaces the worst agent of the
+    population (or joins the population until it holds
+    :paramref:`pop_size` agents, initially made of newly created
+    agents) and the process that evaluated it is handed a copy of an
+    agent picked through tournament selection. Every
+    :paramref:`pop_size` evaluations count as a generation for logging
+    & save points, which also hold the state of the random number
+    generator that tournaments draw from (``rng_state.pkl``).
+
+    Args:
+        pop_size: See
+            :paramref:`~.compute_start_time_and_seeds.pop_size`.
+        tournament_size: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.tournament_size`.
+        templates: See :paramref:`~.save_state.templates`.
+
+    Attributes:
+        population (list[BaseAgent]): The evaluated agents.
+        fitnesses (list[float]): The fitness of each agent of
+            :attr:`population`.
+        num_env_steps (list[float]): The number of environment steps
+            taken by each agent of :attr:`population` during its
+            evaluation.
+        sizes (list[float]): The size of the message each agent of
+            :attr:`population` was received through, which stands for
+            its serialized size.
+        total_num_env_steps (int): See
+            :paramref:`~.compute_total_num_env_steps_and_process_fitnesses.total_num_env_steps`.
+        new_agent_ranks (set[int]): The ranks of the processes
+            evaluating a newly created agent.
+    """
+
+    def __init__(
+        self: "SteadyStateCoordinator",
+        pop_size: An[int, ge(1)],
+        tournament_size: An[int, ge(1)],
+        templates: list[BaseAgent],
+    ) -> None:
+        self.pop_size = pop_size
+        self.tournament_size = tournament_size
+        self.templates = templates
+        self.population: list[BaseAgent] = []
+        self.fitnesses: list[float] = []
+        self.num_env_steps: list[float] = []
+        self.sizes: list[float] = []
+        self.total_num_env_steps = 0
+        self.new_agent_ranks: set[int] = set()
+
+    def load(
+        self: "SteadyStateCoordinator",
+        path: Path,
+        noise_table: NoiseTable | None,
+        cache: MaterializationCache,
+    ) -> None:
+        """Loads the population from a save point.
+
+        Args:
+            path: The saved state's directory.
+            noise_table: See :paramref:`~.load_agents.noise_table`.
+            cache: See :paramref:`~.load_agents.cache`.
+
+        Raises:
+            ValueError: If the saved population size differs from
+                :paramref:`pop_size`.
+        """
+        manifest = load_manifest(path=path)
+        saved_pop_size = sum(manifest["shard_sizes"])
+        if saved_pop_size != self.pop_size:
+            error_msg = (
+                f"The state saved at {path} holds {saved_pop_size} agents "
+                f"but the current population size is {self.pop_size}."
+            )
+            raise ValueError(error_msg)
+        self.population = [
+            agents[0]
+            for agents in load_agents(
+                path=path,
+                manifest=manifest,
+                indices=list(range(self.pop_size)),
+                noise_table=noise_table,
+                cache=cache,
+            )
+        ]
+        generation_results = load_generation_results(path=path)
+        self.fitnesses = generation_results[:, 0, 0].tolist()
+        self.num_env_steps = generation_results[:, 0, 1].tolist()
+        self.sizes = generation_results[:, 0, 2].tolist()
+        self.total_num_env_steps = manifest["total_num_env_steps"]
+        if (path / "rng_state.pkl").is_file():
+            with (path / "rng_state.pkl").open(mode="rb") as f:
+                np.random.set_state(pickle.load(file=f))
+
+    def dispatch(
+        self: "SteadyStateCoordinator",
+        dest: An[int, ge(1)],
+        curr_gen: An[int, ge(1)] | None,
+    ) -> None:
+        """Hands a process its next agent to mutate & evaluate.
+
+        Args:
+            dest: The rank of the process.
+            curr_gen: The generation the agent's evaluation counts
+                towards, ``None`` to instead signal the process to
+                stop.
+        """
+        comm, _, _ = get_mpi_variables()
+        if curr_gen is None:
+            comm.send(obj=None, dest=dest)
+            return
+        seed = int(np.random.randint(low=0, high=2**32, dtype=np.uint32))
+        if (
+            not self.population
+            or len(self.population) + len(self.new_agent_ranks) < self.pop_size
+        ):
+            self.new_agent_ranks.add(dest)
+            comm.send(obj=(None, seed, curr_gen), dest=dest)
+            return
+        # Tournament selection.
+        candidates = np.random.randint(
+            low=0,
+            high=len(self.population),
+            size=self.tournament_size,
+        )
+        parent_idx = candidates[np.argmax(np.take(self.fitnesses, candidates))]
+        # The parent is copied through pickling.
+        comm.send(obj=(self.population[parent_idx], seed, curr_gen), dest=dest)
+
+    def collect(self: "SteadyStateCoordinator") -> int:
+        """Receives an evaluated agent & inserts it in the population.
+
+        Returns:
+            The rank of the process that evaluated the agent.
+        """
+        comm, _, _ = get_mpi_variables()
+        status = MPI.Status()
+        comm.probe(source=MPI.ANY_SOURCE, status=status)
+        source = status.Get_source()
+        agent, (fitness, num_env_steps) = comm.recv(source=source)
+        self.new_agent_ranks.discard(source)
+        self.total_num_env_steps += int(num_env_steps)
+        if len(self.population) < self.pop_size:
+            self.population.append(agent)
+            self.fitnesses.append(float(fitness))
+            self.num_env_steps.append(float(num_env_steps))
+            self.sizes.append(float(status.Get_count()))
+            return source
+        worst_idx = int(np.argmin(self.fitnesses))
+        self.population[worst_idx] = agent
+        self.fitnesses[worst_idx] = float(fitness)
+        self.num_env_steps[worst_idx] = float(num_env_steps)
+        self.sizes[worst_idx] = float(status.Get_count())
+        return source
+
+    def run(
+        self: "SteadyStateCoordinator",
+        prev_num_gens: An[int, ge(0)],
+        total_num_gens: An[int, ge(1)],
+        save_points: list[int],
+        output_dir: str,
+        writer: CheckpointWriter | None = None,
+    ) -> None:
+        """Runs steady-state evolution until its last evaluation.
+
+        Args:
+            prev_num_gens: See
+                :paramref:`~.NeuroevolutionSubtaskConfig.prev_num_gens`.
+            total_num_gens: See
+                :paramref:`~.NeuroevolutionSubtaskConfig.total_num_gens`.
+            save_points: The generations to save the state at.
+            output_dir: See
+                :paramref:`~.BaseSubtaskConfig.output_dir`.
+            writer: See :paramref:`~.save_state.writer`.
+        """
+        _, _, size = get_mpi_variables()
+        total_num_evals = (total_num_gens - prev_num_gens) * self.pop_size
+        num_dispatched = num_evals = 0
+        start_time = time.time()
+        for dest in range(1, size):
+            self.dispatch(
+                dest=dest,
+                curr_gen=(
+                    prev_num_gens + num_dispatched // self.pop_size + 1
+                    if num_dispatched < total_num_evals
+                    else None
+                ),
+            )
+            num_dispatched = min(num_dispatched + 1, total_num_evals)
+        while num_evals < total_num_evals:
+            source = self.collect()
+            num_evals += 1
+            self.dispatch(
+                dest=source,
+                curr_gen=(
+                    prev_num_gens + num_dispatched // self.pop_size + 1
+                    if num_dispatched < total_num_evals
+                    else None
+                ),
+            )
+            num_dispatched = min(num_dispatched + 1, total_num_evals)
+            if num_evals % self.pop_size:
+                continue
+            curr_gen = prev_num_gens + num_evals // self.pop_size
+            self.log(
+                curr_gen=curr_gen,
+                num_evals=prev_num_gens * self.pop_size + num_evals,
+                elapsed_time=time.time() - start_time,
+            )
+            start_time = time.time()
+            if curr_gen in save_points:
+                self.save(path=Path(f"{output_dir}/{curr_gen}"), writer=writer)
+
+    def log(
+        self: "SteadyStateCoordinator",
+        curr_gen: An[int, ge(1)],
+        num_evals: An[int, ge(1)],
+        elapsed_time: float,
+    ) -> None:
+        """Logs the population's fitnesses.
+
+        Args:
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+            num_evals: The total number of evaluations completed
+                during the entire experiment.
+            elapsed_time: The time taken by the generation's
+                evaluations.
+        """
+        fitnesses_mean = np.mean(self.fitnesses)
+        fitnesses_max = np.max(self.fitnesses)
+        log.info(f"{curr_gen} ({num_evals} evaluations): {elapsed_time}")
+        log.info(f"{fitnesses_mean}\n{fitnesses_max}\n")
+        log_metrics(
+            data={
+                "gen": curr_gen,
+                "num_evals": num_evals,
+                "fitnesses_mean": fitnesses_mean,
+                "fitnesses_max": fitnesses_max,
+                "elapsed_time": elapsed_time,
+                "total_num_env_steps": self.total_num_env_steps,
+            },
+        )
+
+    def save(
+        self: "SteadyStateCoordinator",
+        path: Path,
+        writer: CheckpointWriter | None,
+    ) -> None:
+        """Saves the population.
+
+        Args:
+            path: The saved state's directory.
+            writer: See :paramref:`~.save_state.writer`.
+        """
+        generation_results = np.stack(
+            [self.fitnesses, self.num_env_steps, self.sizes],
+            axis=-1,
+        ).astype(np.float32)[:, None]
+        # Written before the manifest, hence part of the save point.
+        path.mkdir(parents=True, exist_ok=True)
+        write_file(
+            path=path / "rng_state.pkl",
+            content=[pickle.dumps(obj=np.random.get_state())],
+        )
+        write_state(
+            path=path,
+            agents_batch=[[agent] for agent in self.population],
+            generation_results=generation_results,
+            total_num_env_steps=self.total_num_env_steps,
+            templates=self.templates,
+            writer=writer,
+        )
+
+
+def work(
+    agent: partial[BaseAgent],
+    space: BaseSpace,
+    noise_table: NoiseTable | None,
+) -> None:
+    """Mutates & evaluates agents handed by the coordinator.
+
+    Run by the secondary processes during steady-state evolution (see
+    :class:`SteadyStateCoordinator`) until signaled to stop.
+
+    Args:
+        agent: See :paramref:`~.initialize_agents.agent`.
+        space: See :paramref:`~.evaluate_on_cpu.space`.
+        noise_table: See :paramref:`~.mutate_agent.noise_table`.
+    """
+    comm, _, _ = get_mpi_variables()
+    # Logged values are only reduced during generational evolution.
+    space.config.logging = False
+    while (work_item := comm.recv(source=0)) is not None:
+        parent, seed, curr_gen = work_item
+        if parent is None:
+            seed_all(0)
+            parent = agent(pop_idx=0, pops_are_merged=False)
+        mutate_agent(agent=parent, seed=seed, noise_table=noise_table)
+        fitnesses_and_num_env_steps_batch = evaluate_on_cpu(
+            agents_batch=[[parent]],
+            space=space,
+            curr_gen=curr_gen,
+        )
+        comm.send(
+            obj=(parent, fitnesses_and_num_env_steps_batch[0, 0]),
+            dest=0,
+        )
@@ -0,0 +1,122 @@
+""":class:`.EvaluationThreadPool`."""
+
+import copy
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+import torch
+
+from common.optim.ne.agent import BaseAgent
+from common.optim.ne.space.base import BaseSpace
+from common.utils.beartype import ge
+
+
+class EvaluationThreadPool:
+    """Evaluates the agents of a process on a pool of threads.
+
+    Each thread evaluates agents on its own copy of the space (and
+    therefore of its environment), with logging disabled since the
+    values to log are returned to & buffered by the calling thread
+    (see :func:`.evaluate_on_cpu`). Torch intra-op
+    parallelism is disabled (for the entire process) so that threads
+    do not compete with one another for cores.
+
+    Args:
+        space: The :class:`.BaseSpace` instance used throughout the
+            execution.
+        num_threads: Number of worker threads.
+    """
+
+    def __init__(
+        self: "EvaluationThreadPool",
+        space: BaseSpace,
+        num_threads: An[int, ge(1)],
+    ) -> None:
+        torch.set_num_threads(1)
+        self.space = space
+        self.executor = ThreadPoolExecutor(max_workers=num_threads)
+        self.spaces: queue.SimpleQueue[BaseSpace] = queue.SimpleQueue()
+        for _ in range(num_threads):
+            space_copy = copy.deepcopy(space)
+            space_copy.config.logging = False
+            self.spaces.put(space_copy)
+
+    def evaluate_agents(
+        self: "EvaluationThreadPool",
+        agents: list[BaseAgent],
+        curr_gen: An[int, ge(1)],
+    ) -> tuple[np.ndarray[np.float32, Any], float | None]:
+        """Evaluates :paramref:`agents` on an available space copy.
+
+        Args:
+            agents: See :paramref:`~.BaseSpace.evaluate.agents`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            * See return value of :meth:`~.BaseSpace.evaluate`.
+            * See :attr:`~.BaseSpace.logged_score`.
+        """
+        space = self.spaces.get()
+        # See `BaseSpace.selection_cutoff`, updated every generation.
+        space.selection_cutoff = self.space.selection_cutoff
+        try:
+            fitnesses_and_num_env_steps = space.evaluate(
+                agents=[agents],
+                curr_gen=curr_gen,
+            )
+            return fitnesses_and_num_env_steps, space.logged_score
+        finally:
+            self.spaces.put(space)
+
+    def submit(
+        self: "EvaluationThreadPool",
+        agents: list[BaseAgent],
+        curr_gen: An[int, ge(1)],
+    ) -> Future[tuple[np.ndarray[np.float32, Any], float | None]]:
+        """Schedules the evaluation of :paramref:`agents`.
+
+        Args:
+            agents: See :paramref:`evaluate_agents.agents`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            A future holding the output of :meth:`evaluate_agents`.
+        """
+        return self.executor.submit(
+            self.evaluate_agents,
+            agents=agents,
+            curr_gen=curr_gen,
+        )
+
+    def evaluate(
+        self: "EvaluationThreadPool",
+        agents_batch: list[list[BaseAgent]],
+        curr_gen: An[int, ge(1)],
+    ) -> list[tuple[np.ndarray[np.float32, Any], float | None]]:
+        """Evaluates :paramref:`agents_batch` on the worker threads.
+
+        Args:
+            agents_batch: See
+                :paramref:`~.compute_generation_results.agents_batch`.
+            curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
+
+        Returns:
+            The output of :meth:`evaluate_agents` for each element of
+                :paramref:`agents_batch`, in order.
+        """
+        return list(
+            self.executor.map(
+                lambda agents: self.evaluate_agents(
+                    agents=agents,
+                    curr_gen=curr_gen,
+                ),
+                agents_batch,
+            ),
+        )
+
+    def shutdown(self: "EvaluationThreadPool") -> None:
+        """Waits for & terminates the worker threads."""
+        self.executor.shutdown()
@@ -40,3 +40,11 @@ Seeds_batch_type = np.ndarray[
     Shape["Len_agents_batch, Num_pops"],
     np.dtype[np.uint32],
 ]
+Lineage_bases_type = np.ndarray[
+    Shape["Pop_size, Num_params"],
+    np.dtype[np.float32],
+]
+Genealogy_type = np.ndarray[
+    Shape["Pop_size, Num_pops, [parent_position, seed]"],
+    np.dtype[np.uint32],
+]
@@ -1,16 +1,30 @@
 """Run validation for Neuroevolution fitting."""
 
 from common.optim.ne.space.base import BaseSpace
+from common.optim.ne.space.reinforcement import BaseReinforcementSpace
 from common.optim.utils.hydra import get_launcher_config
 
 
-def validate_space(space: BaseSpace, *, pop_merge: bool) -> None:
+def validate_space(
+    space: BaseSpace,
+    *,
+    pop_merge: bool,
+    exchange: str,
+    env_transfer: bool,
+    eval_mode: str,
+) -> None:
     """Makes sure that the Space is valid given config values.
 
     Args:
         space: See :paramref:`~.evaluate_on_cpu.space`.
         pop_merge: See
             :paramref:`~.NeuroevolutionSubtaskConfig.pop_merge`.
+        exchange: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.exchange`.
+        env_transfer: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.env_transfer`.
+        eval_mode: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.eval_mode`.
     """
     launcher_config = get_launcher_config()
     if pop_merge and space.num_pops != 2:  # noqa: PLR2004
@@ -22,3 +36,17 @@ def validate_space(space: BaseSpace, *, pop_merge: bool) -> None:
             "specified in the launcher config or set to 0."
         )
         raise ValueError(error_msg)
+    if (
+        exchange == "buffer"
+        and env_transfer
+        and not (
+            isinstance(space, BaseReinforcementSpace)
+            and space.saves_env_snapshots(batched=eval_mode == "batched")
+        )
+    ):
+        error_msg = (
+            '`exchange = "buffer"` only supports `env_transfer = True` '
+            "for environments saved as snapshots (see "
+            "`BaseBatchedEnv.save`), e.g. with `skip_tensordict = True`."
+        )
+        raise ValueError(error_msg)
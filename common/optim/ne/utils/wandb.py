@@ -1,79 +1,470 @@
 """`W&B <https://wandb.ai/>`_ utilities for Neuroevolution fitting."""
 
+import json
+import logging
+import queue
+import threading
 from collections.abc import Callable
+from pathlib import Path
+from typing import Annotated as An
 from typing import Any
 
 import numpy as np
 import wandb
+from mpi4py import MPI
 from omegaconf import OmegaConf
 
+from common.optim.ne.utils.island import IslandModel
+from common.utils.beartype import ge
 from common.utils.mpi4py import get_mpi_variables
 
+log = logging.getLogger(__name__)
 
-def setup_wandb(logger: Callable[..., Any], output_dir: str) -> None:
+NUM_HISTOGRAM_BINS = 64
+
+
+class MetricsLogger:
+    """Logs metrics, optionally to W&B on a background thread.
+
+    Metrics logged without being committed (see :func:`log_metrics`)
+    are merged into the next committed step, which is appended as a
+    single record to the local metrics file (if any) before evolution
+    resumes, then queued for the background thread to log to W&B. When
+    the queue is full, the step is not queued but coalesced with the
+    next one (the latest value of each metric is kept), so that
+    evolution never waits on W&B. The number of coalesced steps is
+    logged to W&B as ``num_coalesced_steps``. Every step reaches the
+    metrics file regardless.
+
+    Failing to log a step to W&B does not interrupt evolution: the
+    error is logged & counted in :attr:`num_failed_logs`, and the first
+    one is re-raised by :meth:`close`.
+
+    With islands, the primary process of each island sends its steps,
+    with every metric prefixed by ``island_<idx>/``, to the primary
+    process of the first island without waiting for it to receive
+    them. There, a receiving thread merges the ``i``-th step of every
+    island into the ``i``-th record, which is written once complete.
+    Islands thus never wait on each other to log metrics.
+
+    Args:
+        queue_size: See
+            :paramref:`~.NeuroevolutionSubtaskConfig.metrics_queue_size`.
+        path: The local metrics file (see
+            :paramref:`~.NeuroevolutionSubtaskConfig.metrics_sink`),
+            ``None`` to only log to W&B.
+        primaries_comm: The communicator spanning the primary
+            processes of all islands, ranked by island index. ``None``
+            if not running islands.
+
+    Attributes:
+        is_primary (bool): Whether this logger writes the records.
+        num_failed_logs (int): The number of steps that could not be
+            logged to W&B.
+
+    Raises:
+        ValueError: If running islands & MPI does not support
+            ``MPI.THREAD_MULTIPLE``.
+    """
+
+    def __init__(
+        self: "MetricsLogger",
+        queue_size: An[int, ge(0)],
+        path: Path | None,
+        primaries_comm: MPI.Comm | None = None,
+    ) -> None:
+        if (
+            primaries_comm is not None
+            and MPI.Query_thread() < MPI.THREAD_MULTIPLE
+        ):
+            error_msg = (
+                "Logging islands requires MPI to support "
+                "`MPI.THREAD_MULTIPLE`."
+            )
+            raise ValueError(error_msg)
+        self.path = path
+        self.primaries_comm = primaries_comm
+        self.island_idx = (
+            0 if primaries_comm is None else primaries_comm.Get_rank()
+        )
+        self.is_primary = self.island_idx == 0
+        self.step: dict[str, Any] = {}
+        self.pending: dict[str, Any] = {}
+        self.num_coalesced_steps = 0
+        self.num_failed_logs = 0
+        self.error: Exception | None = None
+        self.queue: queue.Queue[dict[str, Any] | None] | None = None
+        if queue_size and self.is_primary:
+            self.queue = queue.Queue(maxsize=queue_size)
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        # Island steps, see `add`.
+        self.lock = threading.Lock()
+        self.records: dict[int, dict[str, Any]] = {}
+        self.num_parts: dict[int, int] = {}
+        self.next_record_idx = 0
+        self.closed = False
+        self.send_requests: list[MPI.Request] = []
+        if primaries_comm is not None and self.is_primary:
+            self.num_island_steps = [0] * primaries_comm.Get_size()
+            self.receiver = threading.Thread(target=self.receive, daemon=True)
+            self.receiver.start()
+
+    def run(self: "MetricsLogger") -> None:
+        """Sends the queued records until :meth:`close` is called."""
+        # `queue` is only `None` when no thread is started. The
+        # following `assert` statement is for static type checking
+        # reasons and has no execution purposes.
+        assert self.queue is not None  # noqa: S101
+        while (record := self.queue.get()) is not None:
+            self.send(record=record)
+
+    def receive(self: "MetricsLogger") -> None:
+        """Adds the other islands' steps until they all close."""
+        # `primaries_comm` is only `None` when no thread is started.
+        # The following `assert` statement is for static type checking
+        # reasons and has no execution purposes.
+        assert self.primaries_comm is not None  # noqa: S101
+        status = MPI.Status()
+        num_open_islands = self.primaries_comm.Get_size() - 1
+        while num_open_islands:
+            step = self.primaries_comm.recv(
+                source=MPI.ANY_SOURCE,
+                status=status,
+            )
+            if step is None:
+                num_open_islands -= 1
+                continue
+            try:
+                self.add(island_idx=status.Get_source(), step=step)
+            except Exception as error:
+                if self.error is None:
+                    self.error = error
+                log.exception("Failed to write island metrics.")
+
+    def write(self: "MetricsLogger", record: dict[str, Any]) -> None:
+        """Appends a record to the metrics file, if any.
+
+        Args:
+            record: The metrics of a step.
+        """
+        if self.path is None:
+            return
+        with self.path.open(mode="a") as f:
+            f.write(json.dumps(obj=record, default=to_json) + "\n")
+
+    def send(self: "MetricsLogger", record: dict[str, Any]) -> None:
+        """Logs a record to W&B, recording rather than raising errors.
+
+        Args:
+            record: See :paramref:`write.record`.
+        """
+        try:
+            wandb.log(data=record)
+        except Exception as error:
+            self.num_failed_logs += 1
+            if self.error is None:
+                self.error = error
+            log.exception("Failed to log metrics to W&B.")
+
+    def commit(self: "MetricsLogger", record: dict[str, Any]) -> None:
+        """Writes a record & queues it for W&B.
+
+        Args:
+            record: See :paramref:`write.record`.
+        """
+        self.write(record=record)
+        self.pending |= record
+        if self.queue is None:
+            self.send(record=self.pending)
+        else:
+            try:
+                self.queue.put_nowait(item=self.pending)
+            except queue.Full:
+                self.num_coalesced_steps += 1
+                self.pending["num_coalesced_steps"] = self.num_coalesced_steps
+                log.warning("Metrics queue full, coalescing steps.")
+                return
+        self.pending = {}
+
+    def add(
+        self: "MetricsLogger",
+        island_idx: An[int, ge(0)],
+        step: dict[str, Any],
+    ) -> None:
+        """Merges an island's step into its record.
+
+        Records are committed in order, once every island's step is
+        merged into them.
+
+        Args:
+            island_idx: See :attr:`~.IslandModel.idx`.
+            step: See :paramref:`write.record`.
+        """
+        # `primaries_comm` is only `None` when not running islands.
+        # The following `assert` statement is for static type checking
+        # reasons and has no execution purposes.
+        assert self.primaries_comm is not None  # noqa: S101
+        with self.lock:
+            if self.closed:
+                return
+            record_idx = self.num_island_steps[island_idx]
+            self.num_island_steps[island_idx] += 1
+            self.records.setdefault(record_idx, {}).update(step)
+            self.num_parts[record_idx] = self.num_parts.get(record_idx, 0) + 1
+            while (
+                self.num_parts.get(self.next_record_idx)
+                == self.primaries_comm.Get_size()
+            ):
+                del self.num_parts[self.next_record_idx]
+                self.commit(record=self.records.pop(self.next_record_idx))
+                self.next_record_idx += 1
+
+    def put(
+        self: "MetricsLogger",
+        data: dict[str, Any],
+        *,
+        commit: bool,
+    ) -> None:
+        """Merges metrics into the current step & writes it if done.
+
+        Args:
+            data: See :paramref:`log_metrics.data`.
+            commit: See :paramref:`log_metrics.commit`.
+        """
+        self.step |= data
+        if not commit:
+            return
+        step, self.step = self.step, {}
+        if self.primaries_comm is None:
+            self.commit(record=step)
+            return
+        step = {
+            f"island_{self.island_idx}/{name}": value
+            for name, value in step.items()
+        }
+        if self.is_primary:
+            self.add(island_idx=self.island_idx, step=step)
+            return
+        self.send_requests = [
+            request for request in self.send_requests if not request.Test()
+        ]
+        self.send_requests.append(self.primaries_comm.isend(step, dest=0))
+
+    def close_islands(self: "MetricsLogger", *, abort: bool) -> None:
+        """Sends or receives the last island steps.
+
+        Args:
+            abort: See :paramref:`close.abort`.
+        """
+        # `primaries_comm` is only `None` when not running islands.
+        # The following `assert` statement is for static type checking
+        # reasons and has no execution purposes.
+        assert self.primaries_comm is not None  # noqa: S101
+        if not self.is_primary:
+            self.send_requests.append(self.primaries_comm.isend(None, dest=0))
+            if not abort:
+                MPI.Request.waitall(self.send_requests)
+        elif not abort:
+            self.receiver.join()
+        if not abort:
+            self.primaries_comm.Free()
+        # Records missing the steps of failed islands.
+        with self.lock:
+            self.closed = True
+            for record_idx in sorted(self.records):
+                self.commit(record=self.records[record_idx])
+
+    def close(self: "MetricsLogger", *, abort: bool = False) -> None:
+        """Waits for all queued records to be sent.
+
+        Args:
+            abort: Whether evolution failed, in which case errors
+                raised while logging to W&B are only logged so as not
+                to replace the evolution error. The other islands are
+                then not waited on either.
+
+        Raises:
+            Exception: The first error raised while logging to W&B,
+                unless :paramref:`abort` is ``True``.
+        """
+        if self.primaries_comm is not None:
+            self.close_islands(abort=abort)
+        if self.queue is not None:
+            if self.pending:
+                self.queue.put(item=self.pending)
+            self.queue.put(item=None)
+            self.thread.join()
+        if self.error is None:
+            return
+        log.error(f"{self.num_failed_logs} steps not logged to W&B.")
+        if not abort:
+            raise self.error
+
+
+# The metrics logger of the primary process, see `setup_wandb`.
+METRICS_LOGGERS: list[MetricsLogger] = []
+
+
+def to_json(value: Any) -> Any:  # noqa: ANN401
+    """Converts a metric value :func:`json.dumps` cannot serialize.
+
+    Args:
+        value: The metric value.
+
+    Returns:
+        A JSON serializable equivalent of :paramref:`value`.
+    """
+    if isinstance(value, wandb.Histogram):
+        return {"counts": value.histogram, "bin_edges": value.bins}
+    if isinstance(value, np.ndarray | np.generic):
+        return value.tolist()
+    return str(value)
+
+
+def setup_wandb(
+    logger: Callable[..., Any],
+    output_dir: str,
+    metrics_queue_size: An[int, ge(0)] = 0,
+    metrics_path: Path | None = None,
+    islands: IslandModel | None = None,
+) -> None:
     """Sets up `W&B <https://wandb.ai/>`_ logging for all MPI processes.
 
+    Only the primary process of the first island (the primary process
+    outside of the island model) starts a W&B run.
+
     Args:
         logger: See :func:`wandb.init`.
         output_dir: See :paramref:`~.BaseSubtaskConfig.output_dir`.
+        metrics_queue_size: See :paramref:`MetricsLogger.queue_size`.
+        metrics_path: See :paramref:`MetricsLogger.path`.
+        islands: See :paramref:`~.migrate_agents.islands`. Collective
+            over :attr:`~.IslandModel.world_comm` if not ``None``.
     """
-    comm, rank, _ = get_mpi_variables()
+    _, rank, _ = get_mpi_variables()
+    primaries_comm = (
+        None
+        if islands is None
+        else islands.world_comm.Split(
+            color=0 if rank == 0 else MPI.UNDEFINED,
+            key=islands.idx,
+        )
+    )
     if rank != 0:
         return
-    logger(
-        config=OmegaConf.to_container(
-            OmegaConf.load(f"{output_dir}/.hydra/config.yaml"),
-            resolve=True,
-            throw_on_missing=True,
-        ),
+    metrics_logger = MetricsLogger(
+        queue_size=metrics_queue_size,
+        path=metrics_path,
+        primaries_comm=primaries_comm,
     )
+    if metrics_logger.is_primary:
+        logger(
+            config=OmegaConf.to_container(
+                OmegaConf.load(f"{output_dir}/.hydra/config.yaml"),
+                resolve=True,
+                throw_on_missing=True,
+            ),
+        )
+    METRICS_LOGGERS.append(metrics_logger)
 
 
-def terminate_wandb() -> None:
-    """Terminates `W&B <https://wandb.ai/>`_ logging."""
-    comm, rank, _ = get_mpi_variables()
-    if rank != 0:
+def terminate_wandb(*, abort: bool = False) -> None:
+    """Terminates `W&B <https://wandb.ai/>`_ logging.
+
+    A no-op on processes that did not call :func:`setup_wandb`.
+
+    Args:
+        abort: See :paramref:`MetricsLogger.close.abort`.
+    """
+    if not METRICS_LOGGERS:
         return
-    wandb.finish()
+    metrics_logger = METRICS_LOGGERS.pop()
+    try:
+        metrics_logger.close(abort=abort)
+    finally:
+        if metrics_logger.is_primary:
+            wandb.finish()
 
 
-def gather(
-    logged_score: float | None,
-    curr_gen: int,
-    agent_total_num_steps: int,
-) -> None:
-    """Gathers logged scores from all MPI processes.
+def log_metrics(data: dict[str, Any], *, commit: bool = True) -> None:
+    """Logs metrics through the primary process' :class:`MetricsLogger`.
+
+    Metrics are logged to W&B right away if :func:`setup_wandb` was
+    not called.
+
+    Args:
+        data: The metrics to log.
+        commit: Whether :paramref:`data` completes the current step
+            (see :func:`wandb.log`).
+    """
+    if not METRICS_LOGGERS:
+        wandb.log(data=data, commit=commit)
+        return
+    METRICS_LOGGERS[-1].put(data=data, commit=commit)
+
+
+def reduce_logs(log_buffer: list[tuple[float | None, int]]) -> None:
+    """Reduces the values buffered by all MPI processes & logs them.
+
+    Collective over all processes, called once per generation. Rather
+    than every buffered value, each process contributes a fixed-size
+    summary (number, sum & histogram of the logged scores, number of
+    evaluations & sum of the agents' total numbers of steps) through
+    two buffer-based reductions, the first of which computes the
+    histogram range. :paramref:`log_buffer` is emptied.
 
     Args:
-        logged_score: A value logged during evaluation. If ``None``,
-            then no value was logged during evaluation.
-        curr_gen: See :paramref:`~.BaseSpace.curr_gen`.
-        agent_total_num_steps: See
-            :attr:`~.BaseAgent.total_num_steps`.
+        log_buffer: See :attr:`~.BaseSpace.log_buffer`.
     """
     comm, rank, _ = get_mpi_variables()
-    logged_scores: list[float | None] | None = comm.gather(
-        sendobj=logged_score,
+    scores = np.array(
+        [score for score, _ in log_buffer if score is not None],
+        dtype=np.float64,
+    )
+    # Negated minimum & maximum, reduced with a single `MPI.MAX`.
+    bounds = np.array(
+        [-scores.min(initial=np.inf), scores.max(initial=-np.inf)],
     )
-    logged_agent_total_num_steps: list[int] | None = comm.gather(
-        sendobj=agent_total_num_steps,
+    comm.Allreduce(sendbuf=MPI.IN_PLACE, recvbuf=bounds, op=MPI.MAX)
+    score_min, score_max = -bounds[0], bounds[1]
+    bin_edges = np.histogram_bin_edges(
+        a=scores,
+        bins=NUM_HISTOGRAM_BINS,
+        # Identical on all processes.
+        range=(score_min, score_max) if score_min <= score_max else None,
     )
+    summary = np.concatenate(
+        (
+            [
+                len(scores),
+                scores.sum(),
+                len(log_buffer),
+                sum(num_steps for _, num_steps in log_buffer),
+            ],
+            np.histogram(a=scores, bins=bin_edges)[0],
+        ),
+    ).astype(np.float64)
+    log_buffer.clear()
+    total_summary = np.empty_like(summary) if rank == 0 else None
+    comm.Reduce(sendbuf=summary, recvbuf=total_summary, op=MPI.SUM)
     if rank != 0:
         return
-    # `logged_scores` & `logged_agent_total_num_steps` are only `None`
-    # when `rank != 0`. The following `assert` statements are for static
-    # type checking reasons and have no execution purposes.
-    assert logged_scores is not None  # noqa: S101
-    assert logged_agent_total_num_steps is not None  # noqa: S101
-    non_none_logged_scores: list[float] = list(filter(None, logged_scores))
-    non_none_logged_scores_mean = np.mean(a=non_none_logged_scores)
-    logged_agent_total_num_steps_mean = np.mean(
-        a=logged_agent_total_num_steps,
-    )
-    wandb.log(
-        data={
-            "score": non_none_logged_scores_mean,
-            "num_steps": logged_agent_total_num_steps_mean,
-            "gen": curr_gen,
-        },
-    )
+    # `total_summary` is only `None` when `rank != 0`. The following
+    # `assert` statement is for static type checking reasons and has no
+    # execution purposes.
+    assert total_summary is not None  # noqa: S101
+    num_scores, scores_sum, num_evals, num_steps_sum = total_summary[:4]
+    if not num_evals:
+        return
+    data = {"num_steps": num_steps_sum / num_evals}
+    if num_scores:
+        data |= {
+            "score": scores_sum / num_scores,
+            "score_min": score_min,
+            "score_max": score_max,
+            "score_histogram": wandb.Histogram(
+                np_histogram=(total_summary[4:], bin_edges),
+            ),
+        }
+    log_metrics(data=data, commit=False)
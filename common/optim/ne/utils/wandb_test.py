@@ -0,0 +1,160 @@
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+import wandb
+from mpi4py import MPI
+
+from .wandb import NUM_HISTOGRAM_BINS, MetricsLogger, reduce_logs
+
+
+@pytest.fixture
+def logged(monkeypatch: pytest.MonkeyPatch) -> list[dict[str, Any]]:
+    logged: list[dict[str, Any]] = []
+    monkeypatch.setattr(
+        wandb,
+        "log",
+        lambda data, commit=True: logged.append(data),  # noqa: ARG005
+    )
+    return logged
+
+
+def test_reduce_logs(logged: list[dict[str, Any]]) -> None:
+    # Episodes cut short by early stopping have no score.
+    log_buffer: list[tuple[float | None, int]] = [
+        (1.0, 10),
+        (None, 5),
+        (3.0, 20),
+        (5.0, 25),
+    ]
+    reduce_logs(log_buffer=log_buffer)
+    assert not log_buffer
+    (data,) = logged
+    assert data["num_steps"] == 15
+    assert data["score"] == 3
+    assert data["score_min"] == 1
+    assert data["score_max"] == 5
+    histogram = data["score_histogram"]
+    assert len(histogram.bins) == NUM_HISTOGRAM_BINS + 1
+    assert histogram.bins[0] == 1
+    assert histogram.bins[-1] == 5
+    assert sum(histogram.histogram) == 3
+
+
+def test_reduce_logs_without_scores(logged: list[dict[str, Any]]) -> None:
+    reduce_logs(log_buffer=[(None, 4), (None, 6)])
+    assert logged == [{"num_steps": 5}]
+
+
+def test_reduce_logs_empty(logged: list[dict[str, Any]]) -> None:
+    reduce_logs(log_buffer=[])
+    assert not logged
+
+
+def read_metrics(path: Path) -> list[dict[str, Any]]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_metrics_logger_coalescing(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    logged: list[dict[str, Any]] = []
+    started, release = threading.Event(), threading.Event()
+
+    def log(data: dict[str, Any]) -> None:
+        started.set()
+        release.wait()
+        logged.append(data)
+
+    monkeypatch.setattr(wandb, "log", log)
+    path = tmp_path / "metrics.jsonl"
+    metrics_logger = MetricsLogger(queue_size=1, path=path)
+    metrics_logger.put(data={"gen": 1}, commit=True)
+    # W&B is now stuck on the 1st step, the 2nd one fills the queue.
+    started.wait()
+    metrics_logger.put(data={"gen": 2}, commit=True)
+    metrics_logger.put(data={"score": 3}, commit=False)
+    metrics_logger.put(data={"gen": 3}, commit=True)
+    metrics_logger.put(data={"gen": 4}, commit=True)
+    assert metrics_logger.num_coalesced_steps == 2
+    # The metrics file does not wait on W&B.
+    assert read_metrics(path=path) == [
+        {"gen": 1},
+        {"gen": 2},
+        {"score": 3, "gen": 3},
+        {"gen": 4},
+    ]
+    release.set()
+    metrics_logger.close()
+    assert logged == [
+        {"gen": 1},
+        {"gen": 2},
+        {"score": 3, "gen": 4, "num_coalesced_steps": 2},
+    ]
+
+
+@pytest.mark.parametrize("queue_size", [0, 2])
+def test_metrics_logger_failed_logs(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    queue_size: int,
+) -> None:
+    logged: list[dict[str, Any]] = []
+
+    def log(data: dict[str, Any]) -> None:
+        if data["gen"] == 1:
+            error_msg = "W&B is unreachable."
+            raise ConnectionError(error_msg)
+        logged.append(data)
+
+    monkeypatch.setattr(wandb, "log", log)
+    path = tmp_path / "metrics.jsonl"
+    metrics_logger = MetricsLogger(queue_size=queue_size, path=path)
+    metrics_logger.put(data={"gen": 1}, commit=True)
+    metrics_logger.put(data={"gen": 2}, commit=True)
+    with pytest.raises(ConnectionError, match="unreachable"):
+        metrics_logger.close()
+    assert metrics_logger.num_failed_logs == 1
+    assert logged == [{"gen": 2}]
+    assert read_metrics(path=path) == [{"gen": 1}, {"gen": 2}]
+
+
+def test_metrics_logger_failed_logs_abort(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def log(data: dict[str, Any]) -> None:  # noqa: ARG001
+        error_msg = "W&B is unreachable."
+        raise ConnectionError(error_msg)
+
+    monkeypatch.setattr(wandb, "log", log)
+    metrics_logger = MetricsLogger(
+        queue_size=0,
+        path=tmp_path / "metrics.jsonl",
+    )
+    metrics_logger.put(data={"gen": 1}, commit=True)
+    # Evolution failed, its error is the one to propagate.
+    metrics_logger.close(abort=True)
+    assert metrics_logger.num_failed_logs == 1
+
+
+def test_metrics_logger_islands(
+    tmp_path: Path,
+    logged: list[dict[str, Any]],
+) -> None:
+    path = tmp_path / "metrics.jsonl"
+    metrics_logger = MetricsLogger(
+        queue_size=0,
+        path=path,
+        primaries_comm=MPI.COMM_SELF.Dup(),
+    )
+    metrics_logger.put(data={"score": 1}, commit=False)
+    metrics_logger.put(data={"gen": 1}, commit=True)
+    metrics_logger.put(data={"gen": 2}, commit=True)
+    metrics_logger.close()
+    expected = [{"island_0/score": 1, "island_0/gen": 1}, {"island_0/gen": 2}]
+    assert read_metrics(path=path) == expected
+    assert logged == expected
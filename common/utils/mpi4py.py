@@ -1,21 +1,63 @@
 """:mod:`mpi4py` utilities."""
 
+from collections.abc import Iterator
+from contextlib import contextmanager
 from typing import Annotated as An
 
 from mpi4py import MPI
 
 from common.utils.beartype import ge
 
+# The communicator returned by `get_mpi_variables` is the last one.
+COMM_STACK: list[MPI.Comm] = [MPI.COMM_WORLD]
+
 
 def get_mpi_variables() -> tuple[MPI.Comm, An[int, ge(0)], An[int, ge(1)]]:
     """Retrieves MPI variables from the MPI runtime.
 
     Returns:
-        * The MPI communicator.
+        * The MPI communicator (``MPI.COMM_WORLD`` unless overridden
+          through :func:`use_mpi_comm`).
         * The rank of the current process.
         * The total number of processes.
     """
-    comm = MPI.COMM_WORLD
+    comm = COMM_STACK[-1]
     rank = comm.Get_rank()
     size = comm.Get_size()
     return comm, rank, size
+
+
+def get_node_size() -> An[int, ge(1)]:
+    """Returns the number of processes per node.
+
+    Collective over the communicator returned by
+    :func:`get_mpi_variables`.
+
+    Returns:
+        The smallest number of processes of that communicator sharing
+            a node (processes are expected to be evenly spread across
+            nodes, in contiguous blocks of ranks).
+    """
+    comm, _, _ = get_mpi_variables()
+    node_comm = comm.Split_type(split_type=MPI.COMM_TYPE_SHARED)
+    node_size: int = comm.allreduce(sendobj=node_comm.Get_size(), op=MPI.MIN)
+    node_comm.Free()
+    return node_size
+
+
+@contextmanager
+def use_mpi_comm(comm: MPI.Comm) -> Iterator[None]:
+    """Has :func:`get_mpi_variables` return :paramref:`comm`.
+
+    Args:
+        comm: The MPI communicator to run the enclosed code on (e.g. a
+            subset of the processes).
+
+    Yields:
+        Nothing.
+    """
+    COMM_STACK.append(comm)
+    try:
+        yield
+    finally:
+        COMM_STACK.pop()
@@ -43,3 +43,48 @@ class RunningStandardization:
             self.std + self.std.eq(0)
         )
         return standardized_x
+
+    @staticmethod
+    def call_batch(
+        standardizers: list["RunningStandardization"],
+        x: Float32[Tensor, " batch_size x_size"],
+    ) -> Float32[Tensor, " batch_size x_size"]:
+        """Calls each of :paramref:`standardizers` on its row of ``x``.
+
+        Equivalent to calling the standardizers one after the other but
+        computed in a single batched pass.
+
+        Args:
+            standardizers: The standardizers to call.
+            x: One input tensor per standardizer.
+
+        Returns:
+            The standardized tensors.
+        """
+        mean: Float32[Tensor, " batch_size x_size"] = torch.stack(
+            [standardizer.mean for standardizer in standardizers],
+        )
+        var: Float32[Tensor, " batch_size x_size"] = torch.stack(
+            [standardizer.var for standardizer in standardizers],
+        )
+        n: Float32[Tensor, " batch_size 1"] = torch.stack(
+            [standardizer.n for standardizer in standardizers],
+        ) + torch.ones(size=(1,))
+        new_mean: Float32[Tensor, " batch_size x_size"] = mean + (x - mean) / n
+        new_var: Float32[Tensor, " batch_size x_size"] = var + (x - mean) * (
+            x - new_mean
+        )
+        new_std: Float32[Tensor, " batch_size x_size"] = torch.sqrt(
+            new_var / n,
+        )
+        # Rows are cloned so that each standardizer owns its attributes
+        # (pickling a view pickles its entire underlying storage).
+        for i, standardizer in enumerate(standardizers):
+            standardizer.n = n[i].clone()
+            standardizer.mean = new_mean[i].clone()
+            standardizer.var = new_var[i].clone()
+            standardizer.std = new_std[i].clone()
+        standardized_x: Float32[Tensor, " batch_size x_size"] = (
+            x - new_mean
+        ) / (new_std + new_std.eq(0))
+        return standardized_x
@@ -1,16 +1,22 @@
 # mypy: disable-error-code="no-redef"
 from dataclasses import dataclass
 from typing import Annotated as An
+from typing import Any, ClassVar
 
 import torch
 import torch.nn.functional as f
 from jaxtyping import Float32, Int64
 from torch import Tensor
+from torch.nn.utils import parameters_to_vector
 from torchrl.data.tensor_specs import ContinuousBox
 from torchrl.envs.libs.gym import GymEnv
 
 from common.optim.ne.agent import BaseAgent, BaseAgentConfig
-from common.optim.ne.net.cpu.static import CPUStaticRNNFC, CPUStaticRNNFCConfig
+from common.optim.ne.net.cpu.static import (
+    CPUStaticRNNFC,
+    CPUStaticRNNFCConfig,
+    CPUStaticRNNFCPopulation,
+)
 from common.utils.beartype import ge, le, one_of
 from common.utils.torch import RunningStandardization
 
@@ -21,10 +27,17 @@ class GymAgentConfig(BaseAgentConfig):
     env_name: str = "${space.config.env_name}"
     hidden_size: int = 50
     mutation_std: float = 0.01
+    flat_params: bool = False
 
 
 class GymAgent(BaseAgent):
 
+    # Per-process stacked networks used by `call_batch`, keyed by
+    # network sizes.
+    net_populations: ClassVar[
+        dict[tuple[int, int, int], CPUStaticRNNFCPopulation]
+    ] = {}
+
     def __init__(
         self: "GymAgent",
         config: GymAgentConfig,
@@ -47,6 +60,7 @@ class GymAgent(BaseAgent):
                 ].shape.numel(),
                 hidden_size=config.hidden_size,
                 output_size=self.num_actions,
+                flat_params=config.flat_params,
             ),
         )
         self.output_mode: An[
@@ -61,9 +75,56 @@ class GymAgent(BaseAgent):
 
     def mutate(self: "GymAgent") -> None:
         for param in self.net.parameters():
-            param.data += self.config.mutation_std * torch.randn_like(
-                input=param.data,
+            param.data += self.config.mutation_std * torch.randn(
+                size=param.shape,
+                generator=self.generator,
+            )
+
+    def mutate_with_noise(
+        self: "GymAgent",
+        noise: Float32[Tensor, " num_params"],
+    ) -> None:
+        start = 0
+        for param in self.net.parameters():
+            param.data.add_(
+                noise[start : start + param.numel()].view_as(param),
+                alpha=self.config.mutation_std,
+            )
+            start += param.numel()
+
+    def get_state(self: "GymAgent") -> dict[str, Any]:
+        state = super().get_state()
+        state["standardizer"] = vars(self.standardizer).copy()
+        if self.config.mem_transfer:
+            state["h"] = self.net.h
+        return state
+
+    def set_state(self: "GymAgent", state: dict[str, Any]) -> None:
+        state = state.copy()
+        vars(self.standardizer).update(state.pop("standardizer"))
+        if self.config.mem_transfer:
+            self.net.h = state.pop("h")
+        super().set_state(state=state)
+
+    def get_params(self: "GymAgent") -> Float32[Tensor, " num_params"]:
+        if self.config.flat_params:
+            return self.net.flat_params
+        return parameters_to_vector(parameters=self.net.parameters())
+
+    def set_params(
+        self: "GymAgent",
+        params: Float32[Tensor, " num_params"],
+    ) -> None:
+        if self.config.flat_params:
+            # No-op if `params` was obtained through `get_params`.
+            self.net.flat_params.copy_(params)
+            return
+        start = 0
+        for param in self.net.parameters():
+            param.data.copy_(
+                params[start : start + param.numel()].view_as(param),
             )
+            start += param.numel()
 
     def reset(self: "GymAgent") -> None:
         self.net.reset()
@@ -79,6 +140,47 @@ class GymAgent(BaseAgent):
         )
         return x
 
+    @classmethod
+    def call_batch(
+        cls: type["GymAgent"],
+        agents: list["GymAgent"],  # type: ignore[override]
+        x: Float32[Tensor, " num_agents num_obs"],
+    ) -> (
+        Float32[Tensor, " num_agents num_actions"]
+        | Int64[Tensor, " num_agents num_actions"]
+    ):
+        x: Float32[Tensor, " num_agents num_obs"] = (
+            RunningStandardization.call_batch(
+                standardizers=[agent.standardizer for agent in agents],
+                x=x,
+            )
+        )
+        net_config = agents[0].net.config
+        key = (
+            net_config.input_size,
+            net_config.hidden_size,
+            net_config.output_size,
+        )
+        if key not in cls.net_populations:
+            cls.net_populations[key] = CPUStaticRNNFCPopulation(
+                config=net_config,
+            )
+        x: Float32[Tensor, " num_agents num_actions"] = cls.net_populations[
+            key
+        ](nets=[agent.net for agent in agents], x=x)
+        if agents[0].output_mode == "discrete":
+            # Each agent samples its action from its own generator.
+            return torch.stack(
+                [
+                    agent.net_to_env(x=agent_x)
+                    for agent, agent_x in zip(agents, x, strict=True)
+                ],
+            )
+        x: Float32[Tensor, " num_agents num_actions"] = agents[0].net_to_env(
+            x=x,
+        )
+        return x
+
     def env_to_net(
         self: "GymAgent",
         x: Float32[Tensor, " num_obs"],
@@ -88,23 +190,32 @@ class GymAgent(BaseAgent):
 
     def net_to_env(
         self: "GymAgent",
-        x: Float32[Tensor, " num_actions"],
-    ) -> Float32[Tensor, " num_actions"] | Int64[Tensor, " num_actions"]:
+        x: Float32[Tensor, " *batch_size num_actions"],
+    ) -> (
+        Float32[Tensor, " *batch_size num_actions"]
+        | Int64[Tensor, " *batch_size num_actions"]
+    ):
         if self.output_mode == "discrete":
-            x: Float32[Tensor, " num_actions"] = torch.softmax(input=x, dim=0)
-            x: Int64[Tensor, " "] = torch.multinomial(
+            x: Float32[Tensor, " *batch_size num_actions"] = torch.softmax(
+                input=x,
+                dim=-1,
+            )
+            x: Int64[Tensor, " *batch_size"] = torch.multinomial(
                 input=x,
                 num_samples=1,
-            ).squeeze()
+                generator=self.generator,
+            ).squeeze(dim=-1)
             # Turn the integer into a one-hot vector.
-            x: Int64[Tensor, " num_actions"] = f.one_hot(
+            x: Int64[Tensor, " *batch_size num_actions"] = f.one_hot(
                 x,
                 num_classes=self.num_actions,
             )
             return x
         else:  # self.output_mode == "continuous"  # noqa: RET505
-            x: Float32[Tensor, " num_actions"] = torch.tanh(input=x)
-            x: Float32[Tensor, " num_actions"] = (
+            x: Float32[Tensor, " *batch_size num_actions"] = torch.tanh(
+                input=x,
+            )
+            x: Float32[Tensor, " *batch_size num_actions"] = (
                 x * (self.output_high - self.output_low) / 2
                 + (self.output_high + self.output_low) / 2
             )
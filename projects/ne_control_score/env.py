@@ -0,0 +1,421 @@
+from abc import abstractmethod
+from typing import Annotated as An
+from typing import Any
+
+import numpy as np
+import torch
+from jaxtyping import Bool, Float32, Float64
+from torch import Tensor
+
+from common.optim.ne.space.env import BaseBatchedEnv
+from common.utils.beartype import ge
+
+
+class NumPyClassicControlEnv(BaseBatchedEnv):
+    """Slots are rows of a single NumPy state array.
+
+    Dynamics, initial states, observations, rewards & episode lengths
+    mirror `gymnasium <https://gymnasium.farama.org/>`_'s classic
+    control environments. :meth:`reset` reproduces torchrl's
+    ``env.set_seed(seed)`` followed by ``env.reset()``, which resets
+    the underlying gymnasium environment twice.
+    """
+
+    saves_snapshots = True
+    state_size: int
+    max_episode_steps: int
+    step_reward_bounds: tuple[float, float]
+
+    def __init__(
+        self: "NumPyClassicControlEnv",
+        num_envs: An[int, ge(1)],
+    ) -> None:
+        super().__init__(num_envs=num_envs)
+        self.state: Float64[np.ndarray, " num_envs state_size"] = np.zeros(
+            shape=(num_envs, self.state_size),
+        )
+        self.num_steps = np.zeros(shape=num_envs, dtype=np.int64)
+        self.obs: list[Float32[Tensor, " obs_size"] | None] = [None] * num_envs
+
+    @abstractmethod
+    def sample_initial_state(
+        self: "NumPyClassicControlEnv",
+        rng: np.random.Generator,
+    ) -> np.ndarray[Any, Any]: ...
+
+    @abstractmethod
+    def get_obs(
+        self: "NumPyClassicControlEnv",
+        state: np.ndarray[Any, Any],
+    ) -> Float32[np.ndarray, " num_idx obs_size"]: ...
+
+    @abstractmethod
+    def transition(
+        self: "NumPyClassicControlEnv",
+        state: Float64[np.ndarray, " num_idx state_size"],
+        actions: Tensor,
+    ) -> tuple[
+        Float64[np.ndarray, " num_idx state_size"],  # new state
+        np.ndarray[Any, Any],  # rewards
+        Bool[np.ndarray, " num_idx"],  # terminated
+    ]: ...
+
+    def reset(
+        self: "NumPyClassicControlEnv",
+        idx: An[int, ge(0)],
+        seed: int,
+    ) -> Float32[Tensor, " obs_size"]:
+        # Same generator as `gymnasium.utils.seeding.np_random`.
+        rng = np.random.default_rng(seed=seed)
+        self.sample_initial_state(rng=rng)
+        initial_state = self.sample_initial_state(rng=rng)
+        self.state[idx] = initial_state
+        self.num_steps[idx] = 0
+        # Observations are computed from the initial state in its
+        # original dtype.
+        obs = torch.from_numpy(self.get_obs(state=initial_state[None])[0])
+        self.obs[idx] = obs
+        return obs
+
+    def step(
+        self: "NumPyClassicControlEnv",
+        idx: list[int],
+        actions: Tensor,
+    ) -> tuple[
+        Float32[Tensor, " num_idx obs_size"],
+        Float32[np.ndarray, " num_idx"],
+        Bool[np.ndarray, " num_idx"],
+    ]:
+        state, rewards, terminated = self.transition(
+            state=self.state[idx],
+            actions=actions,
+        )
+        self.state[idx] = state
+        self.num_steps[idx] += 1
+        truncated = self.num_steps[idx] >= self.max_episode_steps
+        obs = torch.from_numpy(self.get_obs(state=state))
+        for k, i in enumerate(idx):
+            self.obs[i] = obs[k]
+        return obs, rewards.astype(np.float32), terminated | truncated
+
+    def save(
+        self: "NumPyClassicControlEnv",
+        idx: An[int, ge(0)],
+    ) -> tuple[
+        Float64[Tensor, " snapshot_size"],
+        Float32[Tensor, " obs_size"] | None,
+    ]:
+        obs = self.obs[idx]
+        return (
+            torch.from_numpy(np.append(self.num_steps[idx], self.state[idx])),
+            None if obs is None else obs.clone(),
+        )
+
+    def load(
+        self: "NumPyClassicControlEnv",
+        idx: An[int, ge(0)],
+        saved_env: Float64[Tensor, " snapshot_size"],
+        saved_env_out: Float32[Tensor, " obs_size"],
+    ) -> Float32[Tensor, " obs_size"]:
+        snapshot = saved_env.numpy()
+        self.num_steps[idx], self.state[idx] = int(snapshot[0]), snapshot[1:]
+        self.obs[idx] = saved_env_out.clone()
+        return self.obs[idx]
+
+
+class NumPyCartPoleEnv(NumPyClassicControlEnv):
+
+    state_size = 4
+    max_episode_steps = 500
+    step_reward_bounds = (1.0, 1.0)
+    gravity = 9.8
+    masscart = 1.0
+    masspole = 0.1
+    total_mass = masspole + masscart
+    length = 0.5
+    polemass_length = masspole * length
+    force_mag = 10.0
+    tau = 0.02
+    theta_threshold_radians = 12 * 2 * np.pi / 360
+    x_threshold = 2.4
+
+    def sample_initial_state(
+        self: "NumPyCartPoleEnv",
+        rng: np.random.Generator,
+    ) -> Float64[np.ndarray, " 4"]:
+        return rng.uniform(low=-0.05, high=0.05, size=(4,))
+
+    def get_obs(
+        self: "NumPyCartPoleEnv",
+        state: Float64[np.ndarray, " num_idx 4"],
+    ) -> Float32[np.ndarray, " num_idx 4"]:
+        return state.astype(np.float32)
+
+    def transition(
+        self: "NumPyCartPoleEnv",
+        state: Float64[np.ndarray, " num_idx 4"],
+        actions: Tensor,
+    ) -> tuple[
+        Float64[np.ndarray, " num_idx 4"],
+        Float64[np.ndarray, " num_idx"],
+        Bool[np.ndarray, " num_idx"],
+    ]:
+        x, x_dot, theta, theta_dot = state.T
+        force = np.where(
+            actions.argmax(dim=-1).numpy() == 1,
+            self.force_mag,
+            -self.force_mag,
+        )
+        costheta = np.cos(theta)
+        sintheta = np.sin(theta)
+        temp = (
+            force + self.polemass_length * np.square(theta_dot) * sintheta
+        ) / self.total_mass
+        thetaacc = (self.gravity * sintheta - costheta * temp) / (
+            self.length
+            * (
+                4.0 / 3.0
+                - self.masspole * np.square(costheta) / self.total_mass
+            )
+        )
+        xacc = (
+            temp - self.polemass_length * thetaacc * costheta / self.total_mass
+        )
+        x = x + self.tau * x_dot
+        x_dot = x_dot + self.tau * xacc
+        theta = theta + self.tau * theta_dot
+        theta_dot = theta_dot + self.tau * thetaacc
+        terminated = (
+            (x < -self.x_threshold)
+            | (x > self.x_threshold)
+            | (theta < -self.theta_threshold_radians)
+            | (theta > self.theta_threshold_radians)
+        )
+        return (
+            np.stack((x, x_dot, theta, theta_dot), axis=1),
+            np.ones(shape=len(state)),
+            terminated,
+        )
+
+
+class NumPyAcrobotEnv(NumPyClassicControlEnv):
+
+    state_size = 4
+    max_episode_steps = 500
+    step_reward_bounds = (-1.0, 0.0)
+    dt = 0.2
+    link_length_1 = 1.0
+    link_mass_1 = 1.0
+    link_mass_2 = 1.0
+    link_com_pos_1 = 0.5
+    link_com_pos_2 = 0.5
+    link_moi = 1.0
+    max_vel_1 = 4 * np.pi
+    max_vel_2 = 9 * np.pi
+    avail_torque = np.array([-1.0, 0.0, 1.0])
+
+    def sample_initial_state(
+        self: "NumPyAcrobotEnv",
+        rng: np.random.Generator,
+    ) -> Float32[np.ndarray, " 4"]:
+        return rng.uniform(low=-0.1, high=0.1, size=(4,)).astype(np.float32)
+
+    def get_obs(
+        self: "NumPyAcrobotEnv",
+        state: np.ndarray[Any, Any],
+    ) -> Float32[np.ndarray, " num_idx 6"]:
+        return np.stack(
+            (
+                np.cos(state[:, 0]),
+                np.sin(state[:, 0]),
+                np.cos(state[:, 1]),
+                np.sin(state[:, 1]),
+                state[:, 2],
+                state[:, 3],
+            ),
+            axis=1,
+        ).astype(np.float32)
+
+    def dsdt(
+        self: "NumPyAcrobotEnv",
+        s: Float64[np.ndarray, " num_idx 4"],
+        a: Float64[np.ndarray, " num_idx"],
+    ) -> Float64[np.ndarray, " num_idx 4"]:
+        m1, m2 = self.link_mass_1, self.link_mass_2
+        l1 = self.link_length_1
+        lc1, lc2 = self.link_com_pos_1, self.link_com_pos_2
+        i1 = i2 = self.link_moi
+        g = 9.8
+        theta1, theta2, dtheta1, dtheta2 = s.T
+        d1 = (
+            m1 * lc1**2
+            + m2 * (l1**2 + lc2**2 + 2 * l1 * lc2 * np.cos(theta2))
+            + i1
+            + i2
+        )
+        d2 = m2 * (lc2**2 + l1 * lc2 * np.cos(theta2)) + i2
+        phi2 = m2 * lc2 * g * np.cos(theta1 + theta2 - np.pi / 2.0)
+        phi1 = (
+            -m2 * l1 * lc2 * dtheta2**2 * np.sin(theta2)
+            - 2 * m2 * l1 * lc2 * dtheta2 * dtheta1 * np.sin(theta2)
+            + (m1 * lc1 + m2 * l1) * g * np.cos(theta1 - np.pi / 2)
+            + phi2
+        )
+        # "book" dynamics (gymnasium's default).
+        ddtheta2 = (
+            a
+            + d2 / d1 * phi1
+            - m2 * l1 * lc2 * dtheta1**2 * np.sin(theta2)
+            - phi2
+        ) / (m2 * lc2**2 + i2 - d2**2 / d1)
+        ddtheta1 = -(d2 * ddtheta2 + phi1) / d1
+        return np.stack((dtheta1, dtheta2, ddtheta1, ddtheta2), axis=1)
+
+    def transition(
+        self: "NumPyAcrobotEnv",
+        state: Float64[np.ndarray, " num_idx 4"],
+        actions: Tensor,
+    ) -> tuple[
+        Float64[np.ndarray, " num_idx 4"],
+        Float64[np.ndarray, " num_idx"],
+        Bool[np.ndarray, " num_idx"],
+    ]:
+        a = self.avail_torque[actions.argmax(dim=-1).numpy()]
+        # Single 4th order Runge-Kutta step over `dt`.
+        dt2 = self.dt / 2.0
+        k1 = self.dsdt(s=state, a=a)
+        k2 = self.dsdt(s=state + dt2 * k1, a=a)
+        k3 = self.dsdt(s=state + dt2 * k2, a=a)
+        k4 = self.dsdt(s=state + self.dt * k3, a=a)
+        ns = state + self.dt / 6.0 * (k1 + 2 * k2 + 2 * k3 + k4)
+        for j in (0, 1):
+            while (above := ns[:, j] > np.pi).any():
+                ns[above, j] -= 2 * np.pi
+            while (below := ns[:, j] < -np.pi).any():
+                ns[below, j] += 2 * np.pi
+        ns[:, 2] = np.clip(ns[:, 2], -self.max_vel_1, self.max_vel_1)
+        ns[:, 3] = np.clip(ns[:, 3], -self.max_vel_2, self.max_vel_2)
+        terminated = -np.cos(ns[:, 0]) - np.cos(ns[:, 1] + ns[:, 0]) > 1.0
+        return ns, np.where(terminated, 0.0, -1.0), terminated
+
+
+class NumPyMountainCarEnv(NumPyClassicControlEnv):
+
+    state_size = 2
+    max_episode_steps = 200
+    step_reward_bounds = (-1.0, -1.0)
+    min_position = -1.2
+    max_position = 0.6
+    max_speed = 0.07
+    goal_position = 0.5
+    goal_velocity = 0
+    force = 0.001
+    gravity = 0.0025
+
+    def sample_initial_state(
+        self: "NumPyMountainCarEnv",
+        rng: np.random.Generator,
+    ) -> Float64[np.ndarray, " 2"]:
+        return np.array([rng.uniform(low=-0.6, high=-0.4), 0])
+
+    def get_obs(
+        self: "NumPyMountainCarEnv",
+        state: Float64[np.ndarray, " num_idx 2"],
+    ) -> Float32[np.ndarray, " num_idx 2"]:
+        return state.astype(np.float32)
+
+    def transition(
+        self: "NumPyMountainCarEnv",
+        state: Float64[np.ndarray, " num_idx 2"],
+        actions: Tensor,
+    ) -> tuple[
+        Float64[np.ndarray, " num_idx 2"],
+        Float64[np.ndarray, " num_idx"],
+        Bool[np.ndarray, " num_idx"],
+    ]:
+        position, velocity = state.T
+        action = actions.argmax(dim=-1).numpy()
+        velocity = velocity + (
+            (action - 1) * self.force + np.cos(3 * position) * (-self.gravity)
+        )
+        velocity = np.clip(velocity, -self.max_speed, self.max_speed)
+        position = position + velocity
+        position = np.clip(position, self.min_position, self.max_position)
+        velocity[(position == self.min_position) & (velocity < 0)] = 0
+        terminated = (position >= self.goal_position) & (
+            velocity >= self.goal_velocity
+        )
+        return (
+            np.stack((position, velocity), axis=1),
+            np.full(shape=len(state), fill_value=-1.0),
+            terminated,
+        )
+
+
+class NumPyPendulumEnv(NumPyClassicControlEnv):
+
+    state_size = 2
+    max_episode_steps = 200
+    max_speed = 8
+    max_torque = 2.0
+    dt = 0.05
+    g = 10.0
+    m = 1.0
+    l = 1.0  # noqa: E741
+    step_reward_bounds = (
+        -(np.pi**2 + 0.1 * max_speed**2 + 0.001 * max_torque**2),
+        0.0,
+    )
+
+    def sample_initial_state(
+        self: "NumPyPendulumEnv",
+        rng: np.random.Generator,
+    ) -> Float64[np.ndarray, " 2"]:
+        high = np.array([np.pi, 1.0])
+        return rng.uniform(low=-high, high=high)
+
+    def get_obs(
+        self: "NumPyPendulumEnv",
+        state: Float64[np.ndarray, " num_idx 2"],
+    ) -> Float32[np.ndarray, " num_idx 3"]:
+        return np.stack(
+            (np.cos(state[:, 0]), np.sin(state[:, 0]), state[:, 1]),
+            axis=1,
+        ).astype(np.float32)
+
+    def transition(
+        self: "NumPyPendulumEnv",
+        state: Float64[np.ndarray, " num_idx 2"],
+        actions: Tensor,
+    ) -> tuple[
+        Float64[np.ndarray, " num_idx 2"],
+        np.ndarray[Any, Any],
+        Bool[np.ndarray, " num_idx"],
+    ]:
+        th, thdot = state.T
+        g, m, l, dt = self.g, self.m, self.l, self.dt  # noqa: E741
+        u = np.clip(actions.numpy(), -self.max_torque, self.max_torque)[:, 0]
+        # Gymnasium operates on the action as a NumPy scalar, which
+        # NumPy < 2 promotes to float64 when combined with Python
+        # floats.
+        u = u.astype(type(np.float32(0) * 1.0))
+        normalized_th = ((th + np.pi) % (2 * np.pi)) - np.pi
+        costs = normalized_th**2 + 0.1 * thdot**2 + 0.001 * (u**2)
+        newthdot = (
+            thdot + (3 * g / (2 * l) * np.sin(th) + 3.0 / (m * l**2) * u) * dt
+        )
+        newthdot = np.clip(newthdot, -self.max_speed, self.max_speed)
+        newth = th + newthdot * dt
+        return (
+            np.stack((newth, newthdot), axis=1),
+            -costs,
+            np.zeros(shape=len(state), dtype=bool),
+        )
+
+
+NUMPY_CLASSIC_CONTROL_ENVS: dict[str, type[NumPyClassicControlEnv]] = {
+    "Acrobot-v1": NumPyAcrobotEnv,
+    "CartPole-v1": NumPyCartPoleEnv,
+    "MountainCar-v0": NumPyMountainCarEnv,
+    "Pendulum-v1": NumPyPendulumEnv,
+}
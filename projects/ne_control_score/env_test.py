@@ -0,0 +1,48 @@
+import pytest
+import torch
+import torch.nn.functional as f
+from torchrl.envs.libs.gym import GymEnv
+
+from .env import NUMPY_CLASSIC_CONTROL_ENVS
+
+NUM_ENVS = 4
+
+
+@pytest.mark.parametrize("env_name", NUMPY_CLASSIC_CONTROL_ENVS)
+def test_matches_torchrl(env_name: str) -> None:
+    envs = [GymEnv(env_name=env_name) for _ in range(NUM_ENVS)]
+    numpy_env = NUMPY_CLASSIC_CONTROL_ENVS[env_name](num_envs=NUM_ENVS)
+    generator = torch.Generator().manual_seed(0)
+    outs = []
+    for i, env in enumerate(envs):
+        env.set_seed(seed=i + 1)
+        outs.append(env.reset())
+        obs = numpy_env.reset(idx=i, seed=i + 1)
+        assert torch.equal(obs, outs[i]["observation"])
+    action_spec = envs[0].action_spec
+    running = list(range(NUM_ENVS))
+    while running:
+        if action_spec.domain == "discrete":
+            actions = f.one_hot(
+                torch.randint(
+                    high=action_spec.shape[-1],
+                    size=(len(running),),
+                    generator=generator,
+                ),
+                num_classes=action_spec.shape[-1],
+            )
+        else:
+            actions = (
+                torch.rand(size=(len(running), 1), generator=generator) * 5
+                - 2.5
+            )
+        obs, rewards, dones = numpy_env.step(idx=running, actions=actions)
+        next_running = []
+        for k, i in enumerate(running):
+            outs[i] = envs[i].step(outs[i].set("action", actions[k]))["next"]
+            assert torch.equal(obs[k], outs[i]["observation"])
+            assert rewards[k] == outs[i]["reward"].item()
+            assert dones[k] == outs[i]["done"].item()
+            if not dones[k]:
+                next_running.append(i)
+        running = next_running
@@ -1,15 +1,22 @@
 from dataclasses import dataclass
+from typing import Annotated as An
 
 from omegaconf import MISSING
 from torchrl.envs.libs.gym import GymEnv
 
 from common.optim.ne.space import BaseReinforcementSpace, BaseSpaceConfig
+from common.optim.ne.space.env import BaseBatchedEnv, GymnasiumBatchedEnv
+from common.utils.beartype import ge
+
+from .env import NUMPY_CLASSIC_CONTROL_ENVS
 
 
 @dataclass
 class GymReinforcementSpaceConfig(BaseSpaceConfig):
 
     env_name: str = MISSING
+    numpy_envs: bool = False
+    skip_tensordict: bool = False
 
 
 class GymReinforcementSpace(BaseReinforcementSpace):
@@ -18,4 +25,36 @@ class GymReinforcementSpace(BaseReinforcementSpace):
         self: "GymReinforcementSpace",
         config: GymReinforcementSpaceConfig,
     ) -> None:
-        super().__init__(config=config, env=GymEnv(env_name=config.env_name))
+        numpy_env = NUMPY_CLASSIC_CONTROL_ENVS.get(config.env_name)
+        super().__init__(
+            config=config,
+            env=GymEnv(env_name=config.env_name),
+            step_reward_bounds=(
+                numpy_env.step_reward_bounds if numpy_env else None
+            ),
+            max_episode_num_steps=(
+                numpy_env.max_episode_steps if numpy_env else None
+            ),
+        )
+
+    def make_batched_env(
+        self: "GymReinforcementSpace",
+        num_envs: An[int, ge(1)],
+    ) -> BaseBatchedEnv:
+        self.config: GymReinforcementSpaceConfig
+        if (
+            self.config.numpy_envs
+            and self.config.env_name in NUMPY_CLASSIC_CONTROL_ENVS
+        ):
+            return NUMPY_CLASSIC_CONTROL_ENVS[self.config.env_name](
+                num_envs=num_envs,
+            )
+        if self.config.skip_tensordict:
+            return GymnasiumBatchedEnv(env=self.env, num_envs=num_envs)
+        return super().make_batched_env(num_envs=num_envs)
+
+    def make_fast_env(self: "GymReinforcementSpace") -> BaseBatchedEnv | None:
+        self.config: GymReinforcementSpaceConfig
+        if self.config.skip_tensordict:
+            return GymnasiumBatchedEnv(env=self.env, num_envs=1)
+        return super().make_fast_env()
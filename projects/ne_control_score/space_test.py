@@ -0,0 +1,238 @@
+import copy
+import time
+from typing import Any
+
+import numpy as np
+import pytest
+import torch
+import wandb
+
+from common.optim.ne.utils.compute import (
+    compute_total_num_env_steps_and_process_fitnesses,
+)
+from common.optim.ne.utils.race import Racer
+
+from .agent import GymAgent, GymAgentConfig
+from .space import GymReinforcementSpace, GymReinforcementSpaceConfig
+
+ENV_NAME = "CartPole-v1"
+EVAL_NUM_STEPS = 20
+NUM_AGENTS = 3
+
+
+def make_space(
+    *,
+    skip_tensordict: bool = False,
+    numpy_envs: bool = False,
+    early_stopping: bool = False,
+    logging: bool = False,
+) -> GymReinforcementSpace:
+    return GymReinforcementSpace(
+        config=GymReinforcementSpaceConfig(
+            env_name=ENV_NAME,
+            eval_num_steps=EVAL_NUM_STEPS,
+            logging=logging,
+            early_stopping=early_stopping,
+            skip_tensordict=skip_tensordict,
+            numpy_envs=numpy_envs,
+        ),
+    )
+
+
+def make_agent(*, env_transfer: bool = False) -> GymAgent:
+    return GymAgent(
+        config=GymAgentConfig(
+            env_name=ENV_NAME,
+            env_transfer=env_transfer,
+            fit_transfer=False,
+            mem_transfer=False,
+        ),
+        pop_idx=0,
+        pops_are_merged=False,
+    )
+
+
+@pytest.mark.parametrize(
+    ("skip_tensordict", "numpy_envs", "batched", "expected"),
+    [
+        (False, False, False, False),
+        (False, False, True, False),
+        (False, True, False, False),
+        (False, True, True, True),
+        (True, False, False, True),
+        (True, False, True, True),
+    ],
+)
+def test_saves_env_snapshots(
+    *,
+    skip_tensordict: bool,
+    numpy_envs: bool,
+    batched: bool,
+    expected: bool,
+) -> None:
+    space = make_space(skip_tensordict=skip_tensordict, numpy_envs=numpy_envs)
+    assert space.saves_env_snapshots(batched=batched) == expected
+
+
+@pytest.mark.parametrize("skip_tensordict", [False, True])
+def test_state_buffer_env_transfer(*, skip_tensordict: bool) -> None:
+    space = make_space(skip_tensordict=skip_tensordict)
+    agent = make_agent(env_transfer=True)
+    space.evaluate(agents=[[agent]], curr_gen=1)
+    if not skip_tensordict:
+        # Environments stepped through TensorDicts are saved as copies.
+        with pytest.raises(TypeError, match="saved_env"):
+            agent.get_state_buffer()
+        return
+    other_agent = make_agent(env_transfer=True)
+    make_space(skip_tensordict=True).evaluate(
+        agents=[[other_agent]],
+        curr_gen=1,
+    )
+    other_agent.set_state_buffer(state_buffer=agent.get_state_buffer())
+    # CartPole's unset `steps_beyond_terminated` is snapshotted as NaN.
+    torch.testing.assert_close(
+        actual=other_agent.saved_env,
+        expected=agent.saved_env,
+        rtol=0,
+        atol=0,
+        equal_nan=True,
+    )
+
+
+@pytest.mark.parametrize(
+    ("skip_tensordict", "numpy_envs", "batched"),
+    [
+        (False, False, False),
+        (False, False, True),
+        (False, True, True),
+        (True, False, False),
+        (True, False, True),
+    ],
+)
+@pytest.mark.parametrize(
+    ("selection_cutoff", "num_saved_steps"),
+    [
+        # CartPole rewards every step with 1: after their 1st step,
+        # agents can reach at most `EVAL_NUM_STEPS`.
+        (EVAL_NUM_STEPS + 1, EVAL_NUM_STEPS - 1),
+        (EVAL_NUM_STEPS, 0),
+        (None, 0),
+    ],
+)
+def test_early_stopping(  # noqa: PLR0913
+    monkeypatch: pytest.MonkeyPatch,
+    selection_cutoff: float | None,
+    num_saved_steps: int,
+    *,
+    skip_tensordict: bool,
+    numpy_envs: bool,
+    batched: bool,
+) -> None:
+    space = make_space(
+        skip_tensordict=skip_tensordict,
+        numpy_envs=numpy_envs,
+        early_stopping=True,
+    )
+    space.selection_cutoff = selection_cutoff
+    agents = [make_agent() for _ in range(NUM_AGENTS)]
+    if batched:
+        fitnesses_and_num_env_steps = space.evaluate_batch(
+            agents_batch=[[agent] for agent in agents],
+            curr_gen=1,
+        )
+    else:
+        fitnesses_and_num_env_steps = np.stack(
+            [space.evaluate(agents=[[agent]], curr_gen=1) for agent in agents],
+        )[:, None]
+    fitnesses, num_env_steps = fitnesses_and_num_env_steps[:, 0].T
+    assert (fitnesses == num_env_steps).all()
+    if num_saved_steps:
+        assert (num_env_steps == 1).all()
+    else:
+        # CartPole cannot terminate on its 1st step.
+        assert (num_env_steps > 1).all()
+    assert [agent.curr_eval_num_saved_steps for agent in agents] == [
+        num_saved_steps,
+    ] * NUM_AGENTS
+    logged: list[dict[str, Any]] = []
+    monkeypatch.setattr(
+        wandb,
+        "log",
+        lambda data, commit=True: logged.append(data),  # noqa: ARG005
+    )
+    compute_total_num_env_steps_and_process_fitnesses(
+        generation_results=np.concatenate(
+            (
+                fitnesses_and_num_env_steps,
+                np.zeros_like(fitnesses_and_num_env_steps[..., :1]),
+            ),
+            axis=-1,
+        ),
+        total_num_env_steps=0,
+        curr_gen=1,
+        start_time=time.time(),
+        num_saved_env_steps=sum(
+            agent.curr_eval_num_saved_steps for agent in agents
+        ),
+        pop_merge=False,
+    )
+    assert logged[0] == {"num_saved_env_steps": num_saved_steps * NUM_AGENTS}
+
+
+@pytest.mark.parametrize("skip_tensordict", [False, True])
+def test_racer_evaluate(
+    monkeypatch: pytest.MonkeyPatch,
+    *,
+    skip_tensordict: bool,
+) -> None:
+    space = make_space(skip_tensordict=skip_tensordict, logging=True)
+    seeds: list[int] = []
+
+    def get_env_seed(curr_gen: int) -> int:
+        seed = GymReinforcementSpace.get_env_seed(
+            self=space,
+            curr_gen=curr_gen,
+        )
+        seeds.append(seed)
+        return seed
+
+    monkeypatch.setattr(space, "get_env_seed", get_env_seed)
+    agents = [make_agent() for _ in range(NUM_AGENTS)]
+    # Agents sample their actions, replay copies of them.
+    agent_copies = copy.deepcopy(agents)
+    # Confidence intervals are unbounded after a single episode: every
+    # agent is raced over a 2nd & last episode.
+    racer = Racer(
+        space=space,
+        num_initial_episodes=1,
+        max_num_episodes=2,
+        z_score=1.96,
+        budget=0,
+    )
+    fitnesses_and_num_env_steps = racer.evaluate(
+        agents_batch=[[agent] for agent in agents],
+        curr_gen=1,
+    )
+    assert seeds == [1] * NUM_AGENTS + [1 + 2**32] * NUM_AGENTS
+    replay_space = make_space(skip_tensordict=skip_tensordict)
+    for agent_copy, (fitness, num_env_steps) in zip(
+        agent_copies,
+        fitnesses_and_num_env_steps[:, 0],
+        strict=True,
+    ):
+        episode_scores, episode_num_env_steps = [], []
+        for episode in range(2):
+            replay_space.eval_episode = episode
+            score, num_steps = replay_space.evaluate(
+                agents=[[agent_copy]],
+                curr_gen=1,
+            )
+            episode_scores.append(score)
+            episode_num_env_steps.append(num_steps)
+        assert fitness == np.mean(episode_scores)
+        assert num_env_steps == sum(episode_num_env_steps)
+    # Only the first episode of each agent is logged.
+    assert len(space.log_buffer) == NUM_AGENTS
+    assert space.config.logging
+    assert space.eval_episode == 0